@@ -5,10 +5,16 @@ from .crop import router as crop_router
 from .fertilizer import router as fertilizer_router
 from .yield_pred import router as yield_router
 from .health import router as health_router
+from .admin import router as admin_router
+from .history import router as history_router
+from .metrics import router as metrics_router
 
 __all__ = [
     "crop_router",
     "fertilizer_router",
     "yield_router",
-    "health_router"
+    "health_router",
+    "admin_router",
+    "history_router",
+    "metrics_router"
 ]
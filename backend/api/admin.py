@@ -0,0 +1,137 @@
+"""
+Admin endpoints (model reload, slow-request log, profiler).
+Disabled (404) unless AGROSMART_ADMIN_TOKEN is set; every request must then
+carry that token in the X-Admin-Token header.
+"""
+import hmac
+import os
+import signal
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+import config
+from models.loading import MODELS
+from services import readiness, reload_models, tracing
+from services import profiler
+from services.memory import MASTER_PID_ENV
+
+from .routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Reject the request unless it carries the configured admin token."""
+    if not config.ADMIN_TOKEN:
+        # No token configured: the admin endpoints do not exist
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (set AGROSMART_ADMIN_TOKEN)")
+    if not hmac.compare_digest(x_admin_token or "", config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid or missing admin token")
+
+
+def _master_pid() -> Optional[int]:
+    """PID of the serve.py master when this worker was forked by it."""
+    master = os.getenv(MASTER_PID_ENV)
+    if master and int(master) == os.getppid():
+        return int(master)
+    return None
+
+
+@router.post("/admin/reload", dependencies=[Depends(require_admin)])
+async def reload_models_endpoint(
+    models: Optional[List[str]] = Query(None, description="Models to reload (default: all)"),
+    force: bool = Query(False, description="Reload even if the model files are unchanged")
+):
+    """
+    Hot-reload models from trained_models/ without restarting the API.
+    
+    Each model is loaded in the background next to the active version and
+    smoke-tested with a few predictions; only then is it swapped in. Requests
+    already in flight finish on the version they started with, and a model
+    that fails validation keeps serving its current version. Progress and
+    the outcome of the last reload are reported by GET /api/ready.
+    
+    Under serve.py the master process is signalled instead, so every worker
+    (and the master, for workers forked later) reloads every model whose
+    files changed.
+    """
+    unknown = sorted(set(models or []) - set(MODELS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown models: {', '.join(unknown)}")
+
+    master = _master_pid()
+    if master is not None:
+        os.kill(master, signal.SIGHUP)
+        return JSONResponse(
+            status_code=202,
+            content={"scope": "all workers", "models": readiness()["models"]}
+        )
+
+    return JSONResponse(
+        status_code=202,
+        content={"scope": "this process", **reload_models(models, force)}
+    )
+
+
+@router.get("/admin/slow-requests", dependencies=[Depends(require_admin)])
+async def slow_requests_endpoint(
+    limit: int = Query(50, ge=1, le=1000, description="Most recent slow requests to return"),
+    clear: bool = Query(False, description="Empty the log after reading it")
+):
+    """
+    Stage breakdown of the most recent slow requests, newest first.
+    
+    Requests that took at least AGROSMART_SLOW_REQUEST_MS keep the time they
+    spent parsing, waiting for a micro-batch, in each model stage (features,
+    scaling, inference, postprocess), in the endpoint and serializing the
+    response. The log is kept per worker process: under serve.py each call
+    reads the worker that happened to accept it (see `pid`).
+    """
+    log = tracing.slow_requests
+    requests = log.entries(limit)
+    if clear:
+        log.clear()
+    return {**log.stats(), "requests": requests}
+
+
+@router.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_endpoint(
+    seconds: float = Query(10.0, gt=0, description="How long to sample"),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000, description="Time between samples (default: AGROSMART_PROFILER_INTERVAL_MS)"),
+    format: Literal["collapsed", "json"] = Query("collapsed", description="collapsed: flame graph input; json: stacks with metadata"),
+    idle: bool = Query(False, description="Include threads blocked waiting for work")
+):
+    """
+    Sample the stacks of every thread in this worker for `seconds`.
+    
+    Returns collapsed stacks ("thread;outer;...;inner count" per line) for
+    flamegraph.pl, speedscope or inferno, or the same stacks as JSON together
+    with the sample count and the sampler's own overhead. Threads parked in
+    a wait (idle pool threads, the event loop's select) are left out unless
+    `idle=true`. The worker keeps serving requests while it is being
+    profiled. Only one profile runs per worker at a time (409 otherwise);
+    under serve.py the request profiles whichever worker accepts it (the
+    `X-Profile-Pid` header).
+    """
+    if not config.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    if seconds > config.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {config.PROFILER_MAX_SECONDS:g}"
+        )
+    try:
+        result = await profiler.profile(seconds, interval_ms, idle)
+    except profiler.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    headers = {
+        "X-Profile-Pid": str(result["pid"]),
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Overhead": f"{result['overhead']:.4f}"
+    }
+    if format == "json":
+        return JSONResponse(content=result, headers=headers)
+    return PlainTextResponse(profiler.collapsed(result), headers=headers)
@@ -2,10 +2,26 @@
 Crop prediction API endpoint.
 """
 from fastapi import APIRouter, HTTPException
-from schemas.requests import CropPredictionRequest, CropPredictionResponse, AlternativeCrop
-from models import predict_crop
+from schemas.requests import (
+    CropPredictionRequest,
+    CropPredictionResponse,
+    AlternativeCrop,
+    CropBatchPredictionRequest,
+    CropBatchPredictionResponse
+)
+from services import (
+    InferenceUnavailableError,
+    collapse,
+    history,
+    is_degraded,
+    record_crop_prediction,
+    run_crop_prediction,
+    run_crop_prediction_batch
+)
 
-router = APIRouter()
+from .routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/predict-crop", response_model=CropPredictionResponse)
@@ -23,18 +39,22 @@ async def predict_crop_endpoint(request: CropPredictionRequest):
     - **ph_level**: Soil pH level (0-14)
     - **region**: Geographic region
     
-    Returns the predicted crop with confidence score and alternatives.
+    Returns the predicted crop with confidence score and alternatives. If
+    the model cannot answer within its deadline, the rule-based predictor
+    answers instead and `degraded` is true. Identical requests in flight at
+    the same time share one prediction.
     """
-    try:
+    async def predict():
         # Call ML prediction model (only uses NPK, temp, humidity, ph, rainfall)
-        predicted_crop, confidence_score, alternative_crops_list = predict_crop(
+        predicted_crop, confidence_score, alternative_crops_list = await run_crop_prediction(
             n_level=request.n_level,
             p_level=request.p_level,
             k_level=request.k_level,
             temperature=request.temperature,
             humidity=request.humidity,
             ph_level=request.ph_level,
-            rainfall=request.rainfall
+            rainfall=request.rainfall,
+            fallback_inputs=request
         )
         
         # Format response
@@ -45,11 +65,99 @@ async def predict_crop_endpoint(request: CropPredictionRequest):
         return CropPredictionResponse(
             predicted_crop=predicted_crop,
             confidence_score=confidence_score,
-            alternative_crops=alternative_crops
+            alternative_crops=alternative_crops,
+            degraded=is_degraded('crop')
         )
+    
+    try:
+        response = await collapse('crop', request, predict)
         
+        # Rule-based suitability is not a model confidence
+        confidence = None if response.degraded else response.confidence_score
+        record_crop_prediction(response.predicted_crop, confidence)
+        
+        # Queue for the history database (written in the background)
+        history.record('crop', request, response.predicted_crop, confidence)
+        
+        return response
+        
+    except InferenceUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Prediction error: {str(e)}"
         )
+
+
+@router.post("/predict-crop/batch", response_model=CropBatchPredictionResponse)
+async def predict_crop_batch_endpoint(request: CropBatchPredictionRequest):
+    """
+    Predict the most suitable crop for many soil samples in one call.
+    
+    - **samples**: List of crop prediction requests (1-10000)
+    - **top_k**: Ranked crops per sample, including the prediction (default 4;
+      larger values than the model's crop count return every crop)
+    
+    All samples are scored with a single forest pass, so this is much
+    faster than posting each sample to /predict-crop separately. If the
+    model cannot answer within its deadline, the rule-based predictor scores
+    the batch and `degraded` is true.
+    """
+    try:
+        results = await run_crop_prediction_batch(
+            [
+                {
+                    'n_level': sample.n_level,
+                    'p_level': sample.p_level,
+                    'k_level': sample.k_level,
+                    'temperature': sample.temperature,
+                    'humidity': sample.humidity,
+                    'ph_level': sample.ph_level,
+                    'rainfall': sample.rainfall
+                }
+                for sample in request.samples
+            ],
+            top_k=request.top_k,
+            fallback_inputs=request.samples
+        )
+        
+        degraded = is_degraded('crop')
+        
+        # Rule-based suitability is not a model confidence
+        history.record_many('crop_batch', [
+            (sample, predicted_crop, None if degraded else confidence_score, None)
+            for sample, (predicted_crop, confidence_score, _) in zip(request.samples, results)
+        ])
+        
+        predictions = [
+            CropPredictionResponse(
+                predicted_crop=predicted_crop,
+                confidence_score=confidence_score,
+                alternative_crops=[AlternativeCrop(**crop) for crop in alternatives],
+                degraded=degraded
+            )
+            for predicted_crop, confidence_score, alternatives in results
+        ]
+        
+        return CropBatchPredictionResponse(
+            predictions=predictions,
+            count=len(predictions),
+            degraded=degraded
+        )
+        
+    except InferenceUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch prediction error: {str(e)}"
+        )
@@ -3,9 +3,18 @@ Fertilizer recommendation API endpoint.
 """
 from fastapi import APIRouter, HTTPException
 from schemas.requests import FertilizerRequest, FertilizerResponse, NPKRatio
-from models import recommend_fertilizer
+from services import (
+    InferenceUnavailableError,
+    collapse,
+    history,
+    is_degraded,
+    record_fertilizer_recommendation,
+    run_fertilizer_recommendation
+)
 
-router = APIRouter()
+from .routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/recommend-fertilizer", response_model=FertilizerResponse)
@@ -21,10 +30,13 @@ async def recommend_fertilizer_endpoint(request: FertilizerRequest):
     - **soil_type**: Type of soil
     
     Returns fertilizer recommendation with NPK ratio, quantity, and application timing.
+    If the model cannot answer within its deadline, the rule-based recommender
+    answers instead and `degraded` is true. Identical requests in flight at
+    the same time share one recommendation.
     """
-    try:
+    async def recommend():
         # Call ML recommendation model
-        result = recommend_fertilizer(
+        result = await run_fertilizer_recommendation(
             soil_type=request.soil_type,
             crop_type=request.crop_type,
             n_level=request.current_n,
@@ -32,13 +44,25 @@ async def recommend_fertilizer_endpoint(request: FertilizerRequest):
             k_level=request.current_k,
             temperature=25.0,  # Default temperature
             humidity=70.0,     # Default humidity
-            moisture=50.0      # Default moisture
+            moisture=50.0,     # Default moisture
+            fallback_inputs=request
         )
         
         # Extract fertilizer name and application rate
         fertilizer_name = result['fertilizer_name']
         application_rate = result['application_rate']
         
+        if is_degraded('fertilizer'):
+            # The rule-based recommender gives its own ratio, timing and notes
+            return FertilizerResponse(
+                recommended_fertilizer=fertilizer_name,
+                npk_ratio=NPKRatio(**result['npk_ratio']),
+                quantity_per_hectare=application_rate,
+                application_timing=result['application_timing'],
+                notes=result['notes'],
+                degraded=True
+            ), None
+        
         # Create default NPK ratio based on fertilizer type
         npk_ratio = NPKRatio(n=0, p=0, k=0)
         if 'urea' in fertilizer_name.lower():
@@ -50,15 +74,30 @@ async def recommend_fertilizer_endpoint(request: FertilizerRequest):
         else:
             npk_ratio = NPKRatio(n=10, p=10, k=10)
         
-        # Format response
+        # Format response (and the model confidence, for the history)
         return FertilizerResponse(
             recommended_fertilizer=fertilizer_name,
             npk_ratio=npk_ratio,
             quantity_per_hectare=application_rate,
             application_timing="Apply at planting and during growth stages",
             notes=f"Recommendation based on ML model (confidence: {result.get('confidence', 1.0):.2%})"
-        )
+        ), result.get('confidence')
+    
+    try:
+        response, confidence = await collapse('fertilizer', request, recommend)
+        record_fertilizer_recommendation(response.recommended_fertilizer, confidence)
+        
+        # Queue for the history database (written in the background)
+        history.record('fertilizer', request, response.recommended_fertilizer, confidence)
+        
+        return response
         
+    except InferenceUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=400,
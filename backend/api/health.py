@@ -2,9 +2,24 @@
 Health check and utility endpoints.
 """
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from schemas.requests import HealthResponse, StatisticsResponse
+from services import (
+    batching_stats,
+    cache_stats,
+    clear_caches,
+    executor_stats,
+    fallback_stats,
+    model_versions,
+    prediction_statistics,
+    readiness,
+    singleflight_stats
+)
+from services.memory import memory_report
 
-router = APIRouter()
+from .routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.get("/health", response_model=HealthResponse)
@@ -12,26 +27,124 @@ async def health_check():
     """
     Health check endpoint to verify the API is running.
     
-    Returns server status and version information.
+    Returns server status, API version and the active version of each
+    model (null while a model is not loaded).
     """
     return HealthResponse(
         status="healthy",
         message="AgroSmart API is running successfully",
-        version="1.0.0"
+        version="1.0.0",
+        model_versions=model_versions()
     )
 
 
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once every model is loaded and warmed up, 503 before.
+    
+    Reports each model's state (pending, loading, warming, ready, failed),
+    load and warm-up time in seconds and the load error, if any. Prediction
+    requests for a model that is not ready are answered by the rule-based
+    engines (degraded) or, with the fallback off, with 503 right away.
+    """
+    report = readiness()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
 @router.get("/statistics", response_model=StatisticsResponse)
 async def get_statistics():
     """
-    Get prediction statistics (optional endpoint for dashboard).
+    Get prediction statistics for the dashboard.
     
-    Note: This is a placeholder. In a real application with database,
-    this would query actual prediction history.
+    Returns prediction totals (batch samples count individually), requests
+    per endpoint, the predicted crop and fertilizer distributions, mean model
+    confidence, mean and most recent yield estimates and requests per endpoint
+    over the last `window_minutes`. Totals include every worker and survive
+    restarts; other workers' latest predictions appear after their next
+    snapshot (AGROSMART_STATS_FLUSH_SECONDS).
     """
-    return StatisticsResponse(
-        total_predictions=0,
-        crops=0,
-        fertilizers=0,
-        yields=0
-    )
+    return StatisticsResponse(**prediction_statistics())
+
+
+@router.get("/batching/stats")
+async def get_batching_stats():
+    """
+    Micro-batching metrics for each model.
+    
+    Reports request and batch counts, rejected requests, the batch-size
+    histogram and mean/max queue wait time, plus the active window settings.
+    """
+    return batching_stats()
+
+
+@router.get("/executor/stats")
+async def get_executor_stats():
+    """
+    Inference executor metrics.
+    
+    Reports pool size, running/queued calls, completed/failed calls and
+    the number of requests rejected with 503 because the pool was saturated.
+    """
+    return executor_stats()
+
+
+@router.get("/fallback/stats")
+async def get_fallback_stats():
+    """
+    Rule-based fallback metrics for each prediction endpoint.
+    
+    Reports requests, answers given by the rules (total, rate and by reason:
+    timeout, error, overloaded, not_ready, circuit_open), fallbacks the rules
+    could not answer either, the circuit breaker state and the deadline.
+    Counts are for this worker; /metrics has them for all workers.
+    """
+    return fallback_stats()
+
+
+@router.get("/singleflight/stats")
+async def get_singleflight_stats():
+    """
+    Single-flight metrics for each prediction endpoint.
+    
+    Reports requests, inferences actually run, requests collapsed into an
+    identical one already in flight, the collapse rate and the most requests
+    that shared one inference. Counts are for this worker; /metrics has
+    agrosmart_collapsed_requests_total for all workers.
+    """
+    return singleflight_stats()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Prediction cache metrics for each model.
+    
+    Reports entries, hits, misses, hit rate, LRU evictions, TTL expirations
+    and invalidations (model reloads or manual clears).
+    """
+    return cache_stats()
+
+
+@router.post("/cache/clear")
+async def clear_cache():
+    """
+    Drop every cached prediction.
+    
+    Model reloads clear the caches automatically; use this after changing
+    model files or encoders in place.
+    """
+    clear_caches()
+    return cache_stats()
+
+
+@router.get("/memory")
+async def get_memory():
+    """
+    Shared and private memory of this worker.
+    
+    Under serve.py (models preloaded before fork) the master and every
+    worker are listed too; `shared` is model memory inherited from the master,
+    `private` is what each worker holds on its own.
+    """
+    return memory_report()
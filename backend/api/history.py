@@ -0,0 +1,67 @@
+"""
+Prediction history endpoints.
+"""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from schemas.requests import HistoryCounts, HistoryPage
+from services import history
+
+from .routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+Endpoint = Literal['crop', 'crop_batch', 'fertilizer', 'yield']
+
+
+def _require_history() -> None:
+    if not history.store.running:
+        raise HTTPException(status_code=404, detail="Prediction history is disabled")
+
+
+@router.get("/history", response_model=HistoryPage)
+async def get_history(
+    endpoint: Optional[Endpoint] = Query(None, description="Only predictions from this endpoint"),
+    predicted: Optional[str] = Query(None, description="Only this predicted crop or fertilizer"),
+    since: Optional[float] = Query(None, description="Unix time, inclusive"),
+    until: Optional[float] = Query(None, description="Unix time, exclusive"),
+    cursor: Optional[str] = Query(None, pattern=r'^[0-9.e+-]+:[0-9]+$', description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """
+    Stored predictions, newest first.
+    
+    Pass `next_cursor` from a page as `cursor` to get the next one; it is
+    null on the last page. Predictions are written in the background, so
+    the latest ones appear after up to AGROSMART_HISTORY_FLUSH_INTERVAL
+    seconds.
+    """
+    _require_history()
+    return await history.store.query(
+        endpoint=endpoint, predicted=predicted, since=since, until=until, cursor=cursor, limit=limit
+    )
+
+
+@router.get("/history/counts", response_model=HistoryCounts)
+async def get_history_counts(
+    endpoint: Optional[Endpoint] = Query(None, description="Only predictions from this endpoint"),
+    since: Optional[float] = Query(None, description="Unix time, inclusive"),
+    until: Optional[float] = Query(None, description="Unix time, exclusive")
+):
+    """
+    Number of stored predictions per predicted crop or fertilizer.
+    """
+    _require_history()
+    counts = await history.store.counts(endpoint=endpoint, since=since, until=until)
+    return HistoryCounts(counts=counts, total=sum(counts.values()))
+
+
+@router.get("/history/stats")
+async def get_history_stats():
+    """
+    Background writer metrics.
+    
+    Reports records queued, written, dropped (queue full) and failed, the
+    number of write batches and the duration of the last one.
+    """
+    return history.history_stats()
@@ -0,0 +1,20 @@
+"""
+Prometheus scrape endpoint.
+"""
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from services.metrics import render
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Request, stage, error and prediction metrics in the Prometheus text format.
+    
+    With several worker processes the values are summed over all of them.
+    """
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
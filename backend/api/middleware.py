@@ -0,0 +1,87 @@
+"""
+ASGI middleware shared by every endpoint.
+"""
+from starlette.datastructures import MutableHeaders
+
+import config
+from services import model_versions, track_versions, tracing
+from services.inference import served_versions
+
+# Response header naming the model versions behind a response
+MODEL_VERSION_HEADER = "X-Model-Version"
+
+# Response header with the per-stage durations of the request
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+def _format_versions(versions) -> str:
+    return ", ".join(f"{name}={version}" for name, version in versions.items() if version)
+
+
+class ModelVersionMiddleware:
+    """
+    Add the X-Model-Version header to every response.
+
+    Prediction responses name the model version that actually scored the
+    request (which may be the previous one if a reload finished meanwhile);
+    every other response lists the active version of each model.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        served = track_versions()
+
+        async def send_with_version(message):
+            if message["type"] == "http.response.start":
+                header = _format_versions(served or model_versions())
+                if header:
+                    MutableHeaders(scope=message).append(MODEL_VERSION_HEADER, header)
+            await send(message)
+
+        await self.app(scope, receive, send_with_version)
+
+
+class ServerTimingMiddleware:
+    """
+    Time every request stage (see services/tracing.py).
+
+    Adds the Server-Timing header (when AGROSMART_SERVER_TIMING is on) and
+    keeps the breakdown of requests slower than AGROSMART_SLOW_REQUEST_MS.
+    Must sit inside ModelVersionMiddleware to see the served model versions.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing.ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace = tracing.start()
+        status = 500
+        total = None
+
+        async def send_with_timing(message):
+            nonlocal status, total
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total = trace.elapsed()
+                if config.SERVER_TIMING:
+                    MutableHeaders(scope=message).append(SERVER_TIMING_HEADER, tracing.server_timing(trace, total))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            tracing.slow_requests.observe(
+                scope["method"], scope["path"], status,
+                total if total is not None else trace.elapsed(),
+                trace, served_versions()
+            )
@@ -0,0 +1,122 @@
+"""
+Route class that times every request.
+Splits each request into parse (body parsing and validation), endpoint and
+serialization (response validation and rendering) stages for the Prometheus
+metrics and the request trace (Server-Timing), and counts responses, errors
+and requests in flight per route.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+import config
+from services import tracing
+from services.metrics import RouteMetrics
+
+
+class _Marks:
+    """When the endpoint function of the current request started and returned."""
+
+    __slots__ = ('started', 'finished')
+
+    def __init__(self):
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+
+_marks: ContextVar[Optional[_Marks]] = ContextVar('route_marks', default=None)
+
+
+def _error_kind(exc: Exception) -> str:
+    """Name of the error behind a failed request."""
+    if isinstance(exc, RequestValidationError):
+        return 'RequestValidationError'
+    if isinstance(exc, HTTPException):
+        # Endpoints turn service errors into HTTPException inside an except
+        # block, so the original error is the context
+        cause = exc.__cause__ or exc.__context__
+        return type(cause).__name__ if cause is not None else f'HTTP{exc.status_code}'
+    return type(exc).__name__
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    """Wrap an async endpoint function so the request records when it ran."""
+    async def endpoint(*args, **kwargs):
+        marks = _marks.get()
+        if marks is not None:
+            marks.started = time.perf_counter()
+        try:
+            return await call(*args, **kwargs)
+        finally:
+            if marks is not None:
+                marks.finished = time.perf_counter()
+    return endpoint
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that records request metrics (see services/metrics.py) and stage timings."""
+
+    def get_route_handler(self) -> Callable:
+        if not (config.METRICS_ENABLED or tracing.ENABLED):
+            return super().get_route_handler()
+
+        # Swap in the timed endpoint before FastAPI builds the handler around it
+        if asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+        route = self.path_format
+        metrics: Optional[RouteMetrics] = None
+
+        async def instrumented_handler(request: Request) -> Response:
+            nonlocal metrics
+            # Resolved on first use: include_router copies every route, and
+            # only the copies with the full path ever serve requests
+            if metrics is None and config.METRICS_ENABLED:
+                metrics = RouteMetrics(route)
+            marks = _Marks()
+            token = _marks.set(marks)
+            if metrics is not None:
+                metrics.in_flight.inc()
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except Exception as exc:
+                if isinstance(exc, HTTPException):
+                    status = exc.status_code
+                elif isinstance(exc, RequestValidationError):
+                    status = 422
+                if metrics is not None:
+                    metrics.error(_error_kind(exc))
+                raise
+            finally:
+                finished = time.perf_counter()
+                _marks.reset(token)
+                if marks.started is not None:
+                    stages = [('parse', marks.started - started), ('endpoint', marks.finished - marks.started)]
+                    if status < 400:
+                        stages.append(('serialization', finished - marks.finished))
+                else:
+                    # Rejected before the endpoint ran (validation error)
+                    stages = [('parse', finished - started)]
+                if metrics is not None:
+                    metrics.in_flight.dec()
+                    metrics.duration.observe(finished - started)
+                    metrics.responses(status).inc()
+                    for stage, seconds in stages:
+                        metrics.stage(stage).observe(seconds)
+                trace = tracing.current()
+                if trace is not None:
+                    for stage, seconds in stages:
+                        trace.add(stage, seconds)
+
+        return instrumented_handler
@@ -3,9 +3,18 @@ Yield estimation API endpoint.
 """
 from fastapi import APIRouter, HTTPException
 from schemas.requests import YieldRequest, YieldResponse, ConfidenceInterval
-from models import estimate_yield
+from services import (
+    InferenceUnavailableError,
+    collapse,
+    history,
+    is_degraded,
+    record_yield_estimation,
+    run_yield_estimation
+)
 
-router = APIRouter()
+from .routing import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.post("/estimate-yield", response_model=YieldResponse)
@@ -25,16 +34,20 @@ async def estimate_yield_endpoint(request: YieldRequest):
     - **k_level**: Potassium level in ppm (0-200)
     
     Returns yield estimation with confidence interval and regional comparison.
+    If the model cannot answer within its deadline, the rule-based estimator
+    answers instead and `degraded` is true. Identical requests in flight at
+    the same time share one estimate.
     """
-    try:
+    async def estimate():
         # Call ML estimation model (it only needs specific parameters)
-        estimated_yield_kg_ha = estimate_yield(
+        estimated_yield_kg_ha = await run_yield_estimation(
             crop_type=request.crop_type,
             area_hectares=request.area_hectares,
             season=request.season,
             rainfall=request.rainfall,
             temperature=request.temperature,
-            fertilizer_used=float(request.n_level + request.p_level + request.k_level)
+            fertilizer_used=float(request.n_level + request.p_level + request.k_level),
+            fallback_inputs=request
         )
         
         # Calculate confidence interval (±10%)
@@ -52,9 +65,25 @@ async def estimate_yield_endpoint(request: YieldRequest):
             estimated_yield=estimated_yield_kg_ha,
             confidence_interval=ConfidenceInterval(lower=lower, upper=upper),
             regional_average=regional_avg,
-            optimal_yield=optimal
+            optimal_yield=optimal,
+            degraded=is_degraded('yield')
         )
+    
+    try:
+        response = await collapse('yield', request, estimate)
+        record_yield_estimation(request.crop_type, response.estimated_yield)
         
+        # Queue for the history database (written in the background)
+        history.record('yield', request, value=response.estimated_yield)
+        
+        return response
+        
+    except InferenceUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=400,
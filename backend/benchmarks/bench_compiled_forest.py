@@ -0,0 +1,106 @@
+"""
+AgroSmart Compiled Forest Benchmark
+Checks that the compiled NumPy forest (with and without the StandardScaler
+folded into its thresholds) matches scaler + sklearn exactly, and compares
+their latency across batch sizes.
+
+Usage (from backend/, after train_models.py):
+    python benchmarks/bench_compiled_forest.py [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from models.compiled_forest import (  # noqa: E402
+    CompiledForest,
+    ScaledModel,
+    boundary_probe,
+    matches_sklearn
+)
+
+# The scalers were fitted on DataFrames; plain arrays are expected here
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'trained_models')
+MODELS = [
+    ('crop', 'crop_model.pkl', 'crop_scaler.pkl', 'predict_proba'),
+    ('fertilizer', 'fertilizer_model.pkl', 'fertilizer_scaler.pkl', 'predict_proba'),
+    ('yield', 'yield_model.pkl', 'yield_scaler.pkl', 'predict'),
+]
+BATCH_SIZES = [1, 16, 256, 4096]
+
+
+def best_time(fn, X, repeat):
+    """Best wall time of `repeat` runs, in seconds."""
+    fn(X)  # warm-up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    print("=" * 80)
+    print("⚡ Compiled forest vs scaler + sklearn")
+    print("=" * 80)
+
+    all_match = True
+    for name, model_file, scaler_file, method in MODELS:
+        model = joblib.load(os.path.join(MODEL_DIR, model_file))
+        model.n_jobs = 1
+        scaler = joblib.load(os.path.join(MODEL_DIR, scaler_file))
+
+        start = time.perf_counter()
+        compiled = CompiledForest.from_sklearn(model)
+        compile_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        folded = compiled.fold_scaler(scaler)
+        fold_ms = (time.perf_counter() - start) * 1000
+
+        engines = {
+            'sklearn': ScaledModel(model, scaler),
+            'compiled': ScaledModel(compiled, scaler),
+            'folded': folded
+        }
+
+        # Raw inputs spread well beyond the training range, plus rows sitting
+        # exactly on (and one ulp past) folded split thresholds
+        X_check = scaler.inverse_transform(rng.standard_normal((5000, model.n_features_in_)) * 3)
+        X_boundary = boundary_probe(folded, X_check, n_nodes=2500)
+
+        print(f"\n{name}: {compiled.n_estimators} trees, {compiled.node_count} nodes, "
+              f"depth {compiled.max_depth}, compiled in {compile_ms:.1f} ms, folded in {fold_ms:.1f} ms")
+        for label in ('compiled', 'folded'):
+            match = (matches_sklearn(engines[label], model, scaler, X_check)
+                     and matches_sklearn(engines[label], model, scaler, X_boundary))
+            all_match &= match
+            print(f"{label} exact match on {len(X_check)} random + {len(X_boundary)} boundary rows: "
+                  f"{'✅' if match else '❌'}")
+
+        print(f"{'rows':>8} {'sklearn ms':>12} {'compiled ms':>12} {'folded ms':>10} {'speedup':>9}")
+        for size in BATCH_SIZES:
+            X = scaler.inverse_transform(rng.standard_normal((size, model.n_features_in_)))
+            t = {label: best_time(getattr(engine, method), X, args.repeat) for label, engine in engines.items()}
+            print(f"{size:>8} {t['sklearn'] * 1000:>12.3f} {t['compiled'] * 1000:>12.3f} "
+                  f"{t['folded'] * 1000:>10.3f} {t['sklearn'] / t['folded']:>8.1f}x")
+
+    sys.exit(0 if all_match else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""
+AgroSmart API Load Benchmark
+Drives the prediction endpoints at fixed concurrency levels and reports
+throughput and p50/p95/p99 latency. By default the app is called in-process
+over ASGI (no sockets, no server); --mode socket starts a local uvicorn and
+sends real HTTP requests (or use --url for a server that is already running).
+
+Results can be saved as a JSON baseline and compared against a previous one;
+the exit status is 1 when throughput drops or p95 latency grows by more than
+--threshold.
+
+Usage (from backend/, after train_models.py):
+    python benchmarks/bench_load.py [--concurrency 1,8,32] [--requests 2000]
+    python benchmarks/bench_load.py --mode socket --save baseline.json
+    python benchmarks/bench_load.py --baseline baseline.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+ENDPOINTS = {
+    'crop': '/api/predict-crop',
+    'fertilizer': '/api/recommend-fertilizer',
+    'yield': '/api/estimate-yield',
+}
+
+
+def crop_body(rng: random.Random) -> Dict[str, Any]:
+    return {
+        'soil_type': rng.choice(['Alluvial Soil', 'Black Soil', 'Red Soil', 'Clay Soil']),
+        'n_level': rng.randint(0, 140),
+        'p_level': rng.randint(5, 100),
+        'k_level': rng.randint(5, 200),
+        'temperature': round(rng.uniform(10, 40), 2),
+        'humidity': round(rng.uniform(15, 95), 2),
+        'rainfall': round(rng.uniform(20, 300), 2),
+        'ph_level': round(rng.uniform(4.5, 8.5), 2),
+        'region': 'North India'
+    }
+
+
+def fertilizer_body(rng: random.Random) -> Dict[str, Any]:
+    return {
+        'crop_type': rng.choice(['Rice', 'Wheat', 'Maize', 'Cotton', 'Sugarcane']),
+        'current_n': rng.randint(0, 140),
+        'current_p': rng.randint(5, 100),
+        'current_k': rng.randint(5, 200),
+        'soil_ph': round(rng.uniform(4.5, 8.5), 2),
+        'soil_type': rng.choice(['Alluvial Soil', 'Black Soil', 'Red Soil', 'Clay Soil'])
+    }
+
+
+def yield_body(rng: random.Random) -> Dict[str, Any]:
+    return {
+        'crop_type': rng.choice(['Rice', 'Wheat', 'Maize', 'Cotton', 'Sugarcane']),
+        'area_hectares': round(rng.uniform(0.5, 20), 2),
+        'season': rng.choice(['Kharif', 'Rabi', 'Zaid']),
+        'temperature': round(rng.uniform(10, 40), 2),
+        'humidity': round(rng.uniform(15, 95), 2),
+        'rainfall': round(rng.uniform(20, 300), 2),
+        'soil_type': 'Alluvial Soil',
+        'soil_ph': round(rng.uniform(4.5, 8.5), 2),
+        'n_level': rng.randint(0, 140),
+        'p_level': rng.randint(5, 100),
+        'k_level': rng.randint(5, 200)
+    }
+
+
+BODIES = {'crop': crop_body, 'fertilizer': fertilizer_body, 'yield': yield_body}
+
+
+def make_bodies(endpoint: str, count: int, distinct: int, seed: int) -> List[Dict[str, Any]]:
+    """Request bodies; with `distinct` > 0 only that many different ones, repeated (cache hits)."""
+    rng = random.Random(seed)
+    unique = [BODIES[endpoint](rng) for _ in range(distinct or count)]
+    return [unique[i % len(unique)] for i in range(count)]
+
+
+async def run_load(client: httpx.AsyncClient, path: str, bodies: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """Send every body with `concurrency` requests in flight; latency and status of each."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < len(bodies):
+            body = bodies[next_index]
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': len(bodies),
+        'errors': len(bodies) - statuses.get('200', 0),
+        'statuses': statuses,
+        'seconds': elapsed,
+        'throughput': len(bodies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max())
+    }
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get('/api/ready')).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("API did not become ready")
+
+
+async def run_suite(client: httpx.AsyncClient, args) -> Dict[str, Any]:
+    await wait_ready(client)
+    results = {}
+    for endpoint in args.endpoints:
+        path = ENDPOINTS[endpoint]
+        # Warm-up: first-call costs and connection setup stay out of the numbers
+        await run_load(client, path, make_bodies(endpoint, args.warmup, args.distinct, seed=1), max(args.concurrency))
+        for concurrency in args.concurrency:
+            bodies = make_bodies(endpoint, args.requests, args.distinct, seed=args.seed)
+            run = await run_load(client, path, bodies, concurrency)
+            results[f'{endpoint}@{concurrency}'] = run
+            print(f"{endpoint:>11} {concurrency:>5} {run['throughput']:>10.0f} {run['p50_ms']:>9.2f} "
+                  f"{run['p95_ms']:>9.2f} {run['p99_ms']:>9.2f} {run['max_ms']:>9.2f} {run['errors']:>7}")
+    return results
+
+
+async def run_in_process(args) -> Dict[str, Any]:
+    from main import app
+    # main.py logs at INFO; one httpx line per request would drown the report
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=60) as client:
+            return await run_suite(client, args)
+
+
+async def run_over_socket(args) -> Dict[str, Any]:
+    server = None
+    url = args.url
+    if url is None:
+        url = f'http://127.0.0.1:{args.port}'
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+             '--port', str(args.port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR
+        )
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+            return await run_suite(client, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Runs whose throughput fell or p95 latency rose by more than `threshold`."""
+    regressions = []
+    for key, run in results.items():
+        before = baseline.get('results', {}).get(key)
+        if before is None:
+            continue
+        throughput = run['throughput'] / before['throughput'] - 1
+        p95 = run['p95_ms'] / before['p95_ms'] - 1
+        flags = []
+        if throughput < -threshold:
+            flags.append(f"throughput {throughput:+.0%}")
+        if p95 > threshold:
+            flags.append(f"p95 {p95:+.0%}")
+        marker = '❌' if flags else '✅'
+        print(f"{marker} {key:>16}: throughput {before['throughput']:.0f} -> {run['throughput']:.0f} req/s, "
+              f"p95 {before['p95_ms']:.2f} -> {run['p95_ms']:.2f} ms")
+        if flags:
+            regressions.append(f"{key}: {', '.join(flags)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['asgi', 'socket'], default='asgi',
+                        help='asgi: call the app in-process; socket: HTTP to a local uvicorn')
+    parser.add_argument('--url', help='With --mode socket, benchmark this running server instead')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the uvicorn started by --mode socket')
+    parser.add_argument('--endpoints', default='crop,fertilizer,yield', help='Comma-separated: crop, fertilizer, yield')
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma-separated requests in flight')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=int, default=100, help='Untimed requests per endpoint')
+    parser.add_argument('--distinct', type=int, default=0,
+                        help='Different request bodies to cycle through (0 = all different, no cache hits)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against results saved with --save')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative slowdown (0.10 = 10%%)')
+    args = parser.parse_args()
+    args.endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    args.concurrency = [int(level) for level in args.concurrency.split(',')]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    # Keep the benchmark's predictions out of the real history and statistics
+    scratch = tempfile.mkdtemp(prefix='agrosmart-bench-')
+    os.environ.setdefault('AGROSMART_HISTORY_DB', os.path.join(scratch, 'history.db'))
+    os.environ.setdefault('AGROSMART_STATS_FILE', os.path.join(scratch, 'statistics.json'))
+
+    print("=" * 80)
+    print(f"🚦 AgroSmart load benchmark ({args.mode}{', ' + args.url if args.url else ''}), "
+          f"{args.requests} requests per run")
+    print("=" * 80)
+    print(f"{'endpoint':>11} {'conc':>5} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+
+    runner = run_in_process if args.mode == 'asgi' else run_over_socket
+    try:
+        results = asyncio.run(runner(args))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'commit': git_commit(),
+            'mode': args.mode,
+            'url': args.url,
+            'requests': args.requests,
+            'distinct': args.distinct,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved results to {args.save}")
+
+    failed = any(run['errors'] for run in results.values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n📏 Against {args.baseline} (commit {baseline['meta'].get('commit')}, "
+              f"threshold {args.threshold:.0%})")
+        if baseline['meta'].get('mode') != args.mode:
+            print(f"⚠️  Baseline was measured in {baseline['meta'].get('mode')} mode, this run in {args.mode} mode")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n❌ Regressions: " + "; ".join(regressions))
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+AgroSmart Model Load Benchmark
+Measures what loading the three models costs a worker process in each storage
+format: joblib pickles, bundles read into memory, and memory-mapped bundles
+(the default). Every run is a fresh Python process, so import time and
+resident memory are not shared between formats.
+
+For each format it reports the time to import the model modules, the time to
+build the crop, fertilizer and yield handles (what models/loading.py does at
+startup and on reload), the time of the first prediction on each model, and
+the process RSS after loading and after those predictions. Mapped bundle
+pages only count towards RSS once they are touched, and they are shared with
+every other worker mapping the same file.
+
+Usage (from backend/, after train_models.py and python -m models.bundle):
+    python benchmarks/bench_load_models.py [--repeat 5]
+    python benchmarks/bench_load_models.py --formats bundle+mmap --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Format -> environment for config.py
+FORMATS = {
+    'pickle': {'AGROSMART_MODEL_FORMAT': 'pickle'},
+    'bundle': {'AGROSMART_MODEL_FORMAT': 'bundle', 'AGROSMART_MODEL_MMAP': 'False'},
+    'bundle+mmap': {'AGROSMART_MODEL_FORMAT': 'bundle', 'AGROSMART_MODEL_MMAP': 'True'},
+}
+METRICS = [
+    ('import_ms', 'import ms'),
+    ('load_ms', 'load ms'),
+    ('first_predict_ms', '1st predict ms'),
+    ('rss_loaded_mb', 'RSS loaded MB'),
+    ('rss_served_mb', 'RSS served MB'),
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process, in MB."""
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # No /proc (macOS): fall back to the peak, in bytes there
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024
+
+
+def measure() -> dict:
+    """Load every model in this process and return the timings (child side)."""
+    sys.path.insert(0, BACKEND_DIR)
+    result = {'rss_start_mb': rss_mb()}
+
+    started = time.perf_counter()
+    import numpy as np
+    from models import crop_model_ml, fertilizer_model_ml, yield_model_ml
+    result['import_ms'] = (time.perf_counter() - started) * 1000
+
+    handles = {}
+    started = time.perf_counter()
+    for name, module in (('crop', crop_model_ml), ('fertilizer', fertilizer_model_ml), ('yield', yield_model_ml)):
+        handles[name] = module.build_handle()
+    result['load_ms'] = (time.perf_counter() - started) * 1000
+    result['rss_loaded_mb'] = rss_mb()
+
+    started = time.perf_counter()
+    for handle in handles.values():
+        handle.engine.predict(np.zeros((1, len(handle.features))))
+    result['first_predict_ms'] = (time.perf_counter() - started) * 1000
+    result['rss_served_mb'] = rss_mb()
+
+    result['sources'] = {name: handle.source for name, handle in handles.items()}
+    result['sklearn_imported'] = 'sklearn' in sys.modules
+    return result
+
+
+def run_child(fmt: str) -> dict:
+    env = dict(os.environ, **FORMATS[fmt])
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child'],
+        env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    # The loaders may log; the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh processes per format (median is reported)')
+    parser.add_argument('--formats', default=','.join(FORMATS), help='Comma-separated formats to measure')
+    parser.add_argument('--json', action='store_true', help='Print the medians as JSON instead of a table')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure()))
+        return
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+
+    medians = {}
+    for fmt in formats:
+        # Warm the page cache so every format reads the files from memory
+        run_child(fmt)
+        runs = [run_child(fmt) for _ in range(args.repeat)]
+        sources = set(source for run in runs for source in run['sources'].values())
+        expected = 'pickle' if fmt == 'pickle' else 'bundle'
+        if sources != {expected}:
+            sys.exit(f"❌ {fmt}: models loaded from {sorted(sources)}, expected {expected} "
+                     f"(run python -m models.bundle first?)")
+        medians[fmt] = {key: statistics.median(run[key] for run in runs) for key, _ in METRICS}
+        medians[fmt]['sklearn_imported'] = all(run['sklearn_imported'] for run in runs)
+
+    if args.json:
+        print(json.dumps(medians, indent=2))
+        return
+
+    print("=" * 80)
+    print(f"📦 Model load cost per worker process (median of {args.repeat} runs)")
+    print("=" * 80)
+    print(f"{'format':<12}" + ''.join(f"{label:>15}" for _, label in METRICS) + f"{'sklearn':>9}")
+    for fmt, result in medians.items():
+        print(f"{fmt:<12}" + ''.join(f"{result[key]:>15.1f}" for key, _ in METRICS)
+              + f"{'yes' if result['sklearn_imported'] else 'no':>9}")
+
+
+if __name__ == '__main__':
+    main()
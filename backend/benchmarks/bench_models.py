@@ -0,0 +1,374 @@
+"""
+AgroSmart Model Micro-Benchmarks
+Times the model-layer hot paths one at a time, at batch sizes from 1 to 100k
+rows: the ML entry points (predict_crop, recommend_fertilizer, estimate_yield
+and their batch versions), the scaler transforms, feature assembly
+(FeatureTemplate.row and .matrix) and the rule-based CropPredictor.predict,
+FertilizerRecommender.recommend and YieldEstimator.estimate, with their
+vectorized batch versions.
+
+Small forests are trained on the bundled CSVs in data/raw at startup (same
+preprocessing as train_models.py, fewer and shallower trees), so the numbers
+do not depend on which models happen to be in trained_models/.
+
+Results are stored in a JSON file keyed by git commit (a tree with
+uncommitted changes is recorded as "<commit>-dirty"). Each run is compared
+with the most recent other commit in the file, or with --baseline; the exit
+status is 1 when any benchmark got slower per row by more than --threshold.
+
+Usage (from backend/):
+    python benchmarks/bench_models.py [--sizes 1,10,100,1000,10000,100000]
+    python benchmarks/bench_models.py --only crop. --threshold 0.15
+    python benchmarks/bench_models.py --baseline 3f2a9c1 --no-save
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import warnings
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from models import crop_model_ml, fertilizer_model_ml, yield_model_ml  # noqa: E402
+from models.compiled_forest import compile_for_inference  # noqa: E402
+from models.crop_model import CropPredictor  # noqa: E402
+from models.features import FeatureTemplate  # noqa: E402
+from models.fertilizer_model import FertilizerRecommender  # noqa: E402
+from models.handle import ModelHandle  # noqa: E402
+from models.scoring import ClassIndex  # noqa: E402
+from models.yield_model import YieldEstimator  # noqa: E402
+
+# The scalers are fitted on DataFrames, like train_models.py; plain arrays are expected here
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+DATA_DIR = os.path.join(BACKEND_DIR, 'data', 'raw')
+RESULTS_FILE = os.path.join(BACKEND_DIR, 'benchmarks', 'results', 'bench_models.json')
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+SOIL_TYPES = ['Alluvial Soil', 'Black Soil', 'Red Soil', 'Clay Soil', 'Sandy Soil', 'Loamy Soil']
+REGIONS = ['North India', 'South India', 'East India', 'West India', 'Central India']
+SEASONS = ['Kharif', 'Rabi', 'Zaid']
+
+
+# ==================== Models ====================
+
+def _encode(data: pd.DataFrame, target: str) -> Dict[str, LabelEncoder]:
+    """Label-encode the object columns other than `target`, in place (as train_models.py does)."""
+    encoders = {}
+    for col in data.columns:
+        if data[col].dtype == 'object' and col != target:
+            encoders[col] = LabelEncoder()
+            data[col] = encoders[col].fit_transform(data[col].astype(str))
+    return encoders
+
+
+def _handle(name: str, estimator, X: pd.DataFrame, y: pd.Series, spec: Dict[str, Any],
+            encoders: Optional[Dict[str, LabelEncoder]] = None) -> ModelHandle:
+    scaler = StandardScaler()
+    model = estimator.fit(scaler.fit_transform(X), y)
+    features = list(X.columns)
+    return ModelHandle(
+        name, 'bench', 'memory',
+        model=model,
+        scaler=scaler,
+        features=features,
+        encoders=encoders,
+        engine=compile_for_inference(model, scaler, name),
+        classes=ClassIndex(model.classes_) if hasattr(model, 'classes_') else None,
+        template=FeatureTemplate(features, spec, encoders)
+    )
+
+
+def train_models(trees: int, max_depth: int, seed: int) -> Dict[str, ModelHandle]:
+    """Small crop, fertilizer and yield models trained on the bundled CSVs."""
+    handles = {}
+
+    crop = pd.read_csv(os.path.join(DATA_DIR, 'Crop_recommendation.csv'))
+    crop.fillna(crop.median(numeric_only=True), inplace=True)
+    handles['crop'] = _handle(
+        'crop', RandomForestClassifier(n_estimators=trees, max_depth=max_depth, random_state=seed),
+        crop.drop('label', axis=1), crop['label'], crop_model_ml.FEATURE_SPEC
+    )
+
+    fert = pd.read_csv(os.path.join(DATA_DIR, 'fertilizer_recommendation_dataset.csv'))
+    target = next((col for col in fert.columns if 'fertilizer' in col.lower()), fert.columns[-1])
+    fert.fillna(fert.median(numeric_only=True), inplace=True)
+    fert.fillna(fert.mode().iloc[0], inplace=True)
+    encoders = _encode(fert, target)
+    handles['fertilizer'] = _handle(
+        'fertilizer', RandomForestClassifier(n_estimators=trees, max_depth=max_depth, random_state=seed),
+        fert.drop(target, axis=1), fert[target], fertilizer_model_ml.FEATURE_SPEC, encoders
+    )
+
+    yields = pd.read_csv(os.path.join(DATA_DIR, 'yield_df.csv'))
+    target = next((col for col in yields.columns if 'yield' in col.lower() or 'hg/ha' in col.lower()),
+                  yields.columns[-1])
+    yields = yields.dropna(subset=[target])
+    yields = yields.fillna(yields.median(numeric_only=True))
+    encoders = _encode(yields, target)
+    handles['yield'] = _handle(
+        'yield', RandomForestRegressor(n_estimators=trees, max_depth=max_depth, random_state=seed),
+        yields.drop(target, axis=1).select_dtypes(include=[np.number]), yields[target],
+        yield_model_ml.FEATURE_SPEC, encoders
+    )
+    return handles
+
+
+# ==================== Inputs ====================
+
+def make_samples(handles: Dict[str, ModelHandle], count: int, seed: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Seeded request fields for every model, `count` rows each."""
+    rng = np.random.default_rng(seed)
+
+    def uniform(low, high):
+        return rng.uniform(low, high, count).round(2).tolist()
+
+    def integers(low, high):
+        return rng.integers(low, high, count).tolist()
+
+    def choice(values):
+        return [values[i] for i in rng.integers(0, len(values), count)]
+
+    fert_encoders = handles['fertilizer'].encoders
+    fert_crops = list(fert_encoders['Crop'].classes_) if 'Crop' in fert_encoders else ['Rice']
+    fert_soils = list(fert_encoders['Soil'].classes_) if 'Soil' in fert_encoders else SOIL_TYPES
+    yield_encoders = handles['yield'].encoders
+    yield_crops = list(yield_encoders['Item'].classes_) if 'Item' in yield_encoders else ['Rice']
+    rule_crops = list(YieldEstimator.BASE_YIELDS)
+    rule_fert_crops = list(FertilizerRecommender.FERTILIZER_DATA)
+
+    n, p, k = integers(0, 140), integers(5, 100), integers(5, 200)
+    temperature, humidity, rainfall = uniform(10, 40), uniform(15, 95), uniform(20, 300)
+    ph = uniform(4.5, 8.5)
+    columns = {
+        'crop': dict(n_level=n, p_level=p, k_level=k, temperature=temperature,
+                     humidity=humidity, ph_level=ph, rainfall=rainfall),
+        'fertilizer': dict(soil_type=choice(fert_soils), crop_type=choice(fert_crops), n_level=n,
+                           p_level=p, k_level=k, temperature=temperature, humidity=humidity,
+                           moisture=uniform(10, 80)),
+        'yield': dict(crop_type=choice(yield_crops), area_hectares=uniform(0.5, 20), season=choice(SEASONS),
+                      rainfall=rainfall, temperature=temperature, fertilizer_used=uniform(0, 300)),
+        'rules_crop': dict(soil_type=choice(SOIL_TYPES), n_level=n, p_level=p, k_level=k,
+                           temperature=temperature, humidity=humidity, rainfall=rainfall,
+                           ph_level=ph, region=choice(REGIONS)),
+        'rules_fertilizer': dict(crop_type=choice(rule_fert_crops), current_n=n, current_p=p, current_k=k,
+                                 soil_ph=ph, soil_type=choice(SOIL_TYPES)),
+        'rules_yield': dict(crop_type=choice(rule_crops), season=choice(SEASONS), temperature=temperature,
+                            humidity=humidity, rainfall=rainfall, soil_type=choice(SOIL_TYPES),
+                            soil_ph=ph, n_level=n, p_level=p, k_level=k, region=choice(REGIONS)),
+    }
+    return {
+        name: [dict(zip(fields, values)) for values in zip(*fields.values())]
+        for name, fields in columns.items()
+    }
+
+
+# ==================== Benchmarks ====================
+
+def make_benchmarks(handles: Dict[str, ModelHandle],
+                    samples: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Callable[[int], Any]]:
+    """Benchmark name -> function processing the first n rows of its samples."""
+    crop, fert, yld = handles['crop'], handles['fertilizer'], handles['yield']
+    # Feature matrices for the scaler benchmarks, built once
+    matrices = {name: handles[name].template.matrix(samples[name]) for name in handles}
+    crop_predictor, yield_estimator = CropPredictor(), YieldEstimator()
+    fertilizer_recommender = FertilizerRecommender()
+
+    def each(rows: str, fn: Callable[..., Any]) -> Callable[[int], Any]:
+        """One call per row, the way single-prediction requests arrive."""
+        def run(n):
+            for fields in samples[rows][:n]:
+                fn(**fields)
+        return run
+
+    def whole(rows: str, fn: Callable[[List[Dict[str, Any]]], Any]) -> Callable[[int], Any]:
+        """One call for all n rows."""
+        return lambda n: fn(samples[rows][:n])
+
+    benchmarks = {
+        'crop.predict_crop': each('crop', lambda **f: crop_model_ml.predict_crop(**f, handle=crop)),
+        'crop.predict_crop_batch': whole('crop', lambda s: crop_model_ml.predict_crop_batch(s, handle=crop)),
+        'fertilizer.recommend_fertilizer': each(
+            'fertilizer', lambda **f: fertilizer_model_ml.recommend_fertilizer(**f, handle=fert)),
+        'fertilizer.recommend_fertilizer_batch': whole(
+            'fertilizer', lambda s: fertilizer_model_ml.recommend_fertilizer_batch(s, handle=fert)),
+        'yield.estimate_yield': each('yield', lambda **f: yield_model_ml.estimate_yield(**f, handle=yld)),
+        'yield.estimate_yield_batch': whole('yield', lambda s: yield_model_ml.estimate_yield_batch(s, handle=yld)),
+    }
+    for name, handle in handles.items():
+        template, scaler, X = handle.template, handle.scaler, matrices[name]
+        benchmarks[f'{name}.features.row'] = each(name, template.row)
+        benchmarks[f'{name}.features.matrix'] = whole(name, template.matrix)
+        benchmarks[f'{name}.scaler.transform'] = lambda n, scaler=scaler, X=X: scaler.transform(X[:n])
+    benchmarks['rules.CropPredictor.predict'] = each('rules_crop', crop_predictor.predict)
+    benchmarks['rules.CropPredictor.predict_batch'] = whole('rules_crop', crop_predictor.predict_batch)
+    benchmarks['rules.FertilizerRecommender.recommend'] = each('rules_fertilizer', fertilizer_recommender.recommend)
+    benchmarks['rules.FertilizerRecommender.recommend_batch'] = whole(
+        'rules_fertilizer', fertilizer_recommender.recommend_batch)
+    # Including the dicts built when the results are serialized
+    benchmarks['rules.FertilizerRecommender.recommend_batch.to_list'] = whole(
+        'rules_fertilizer', lambda s: fertilizer_recommender.recommend_batch(s).to_list())
+    benchmarks['rules.YieldEstimator.estimate'] = each('rules_yield', yield_estimator.estimate)
+    benchmarks['rules.YieldEstimator.estimate_batch'] = whole('rules_yield', yield_estimator.estimate_batch)
+    return benchmarks
+
+
+def best_time(fn: Callable[[int], Any], n: int, repeat: int, budget: float) -> Tuple[float, int]:
+    """Best wall time over up to `repeat` runs (fewer once `budget` seconds are spent), and the run count."""
+    times = []
+    spent = 0.0
+    while len(times) < repeat and (not times or spent < budget):
+        start = time.perf_counter()
+        fn(n)
+        times.append(time.perf_counter() - start)
+        spent += times[-1]
+    return min(times), len(times)
+
+
+# ==================== Results ====================
+
+def git_commit() -> Optional[str]:
+    """Short HEAD commit, with "-dirty" when tracked files have uncommitted changes."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(['git', 'diff', '--quiet', 'HEAD'], cwd=BACKEND_DIR).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def previous_run(runs: Dict[str, Any], current: Optional[str]) -> Optional[str]:
+    """Most recently measured commit other than the current one."""
+    others = [(run['meta']['timestamp'], commit) for commit, run in runs.items() if commit != current]
+    return max(others)[1] if others else None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Benchmarks whose time per row grew by more than `threshold`."""
+    regressions = []
+    for key, run in results.items():
+        before = baseline['results'].get(key)
+        if before is None:
+            continue
+        change = run['us_per_row'] / before['us_per_row'] - 1
+        slower = change > threshold
+        marker = '❌' if slower else '✅'
+        print(f"{marker} {key:>60}: {before['us_per_row']:10.3f} -> {run['us_per_row']:10.3f} µs/row "
+              f"({change:+.0%})")
+        if slower:
+            regressions.append(f"{key} {change:+.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=','.join(map(str, BATCH_SIZES)), help='Comma-separated batch sizes')
+    parser.add_argument('--only', default='', help='Comma-separated benchmark name prefixes (e.g. crop.,rules.)')
+    parser.add_argument('--repeat', type=int, default=20, help='Most timed runs per measurement')
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='Stop repeating a measurement after this many seconds (at least one run)')
+    parser.add_argument('--trees', type=int, default=10, help='Trees per benchmark forest')
+    parser.add_argument('--max-depth', type=int, default=12, help='Depth limit of the benchmark forests')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--results', default=RESULTS_FILE, help='JSON file of results keyed by commit')
+    parser.add_argument('--baseline', help='Commit in the results file to compare with (default: the previous one)')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative slowdown (0.10 = 10%%)')
+    parser.add_argument('--no-save', action='store_true', help='Compare only, do not record this run')
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    prefixes = [prefix.strip() for prefix in args.only.split(',') if prefix.strip()]
+
+    # The rule-based engines add random jitter; keep it identical between runs
+    random.seed(args.seed)
+
+    print("=" * 80)
+    print(f"🔬 AgroSmart model micro-benchmarks ({args.trees} trees, max depth {args.max_depth})")
+    print("=" * 80)
+    started = time.perf_counter()
+    handles = train_models(args.trees, args.max_depth, args.seed)
+    samples = make_samples(handles, max(sizes), args.seed)
+    benchmarks = make_benchmarks(handles, samples)
+    if prefixes:
+        benchmarks = {name: fn for name, fn in benchmarks.items() if name.startswith(tuple(prefixes))}
+        if not benchmarks:
+            parser.error(f"no benchmark matches {args.only}")
+    print(f"✓ Trained models and {max(sizes)} input rows in {time.perf_counter() - started:.1f}s\n")
+
+    print(f"{'benchmark':>52} {'rows':>7} {'runs':>5} {'best ms':>11} {'µs/row':>10}")
+    results = {}
+    for name, fn in benchmarks.items():
+        fn(1)  # warm-up
+        for n in sizes:
+            seconds, runs = best_time(fn, n, args.repeat, args.budget)
+            results[f'{name}@{n}'] = {
+                'rows': n,
+                'runs': runs,
+                'best_ms': seconds * 1000,
+                'us_per_row': seconds * 1e6 / n
+            }
+            print(f"{name:>52} {n:>7} {runs:>5} {seconds * 1000:>11.3f} {seconds * 1e6 / n:>10.3f}")
+
+    commit = git_commit()
+    meta = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'commit': commit,
+        'trees': args.trees,
+        'max_depth': args.max_depth,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+    runs = load_results(args.results)
+    failed = False
+    reference = args.baseline or previous_run(runs, commit)
+    if reference is not None:
+        if reference not in runs:
+            parser.error(f"commit {reference} is not in {args.results}")
+        baseline = runs[reference]
+        print(f"\n📏 Against {reference} ({baseline['meta']['timestamp']}, threshold {args.threshold:.0%})")
+        for setting in ('trees', 'max_depth', 'machine', 'cpus'):
+            if baseline['meta'].get(setting) != meta[setting]:
+                print(f"⚠️  {setting} differs: {baseline['meta'].get(setting)} there, {meta[setting]} here")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n❌ Slower: " + "; ".join(regressions))
+            failed = True
+
+    if not args.no_save:
+        # Re-running a commit replaces its results
+        runs[commit or 'unknown'] = {'meta': meta, 'results': results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, 'w') as f:
+            json.dump(runs, f, indent=2)
+        print(f"\n💾 Recorded results for {commit or 'unknown'} in {args.results}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+AgroSmart Forest Parallelism Benchmark
+Compares the training-time n_jobs=-1 setting, serial n_jobs=1 and row-chunked
+parallel inference across batch sizes, and reports where parallel starts to win.
+
+Usage (from backend/, after train_models.py):
+    python benchmarks/bench_parallelism.py [--repeat 5] [--jobs 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import config  # noqa: E402
+from models.parallelism import ParallelismPolicy  # noqa: E402
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'trained_models')
+MODELS = [
+    ('crop', 'crop_model.pkl', 'crop_scaler.pkl', 'predict_proba'),
+    ('fertilizer', 'fertilizer_model.pkl', 'fertilizer_scaler.pkl', 'predict_proba'),
+    ('yield', 'yield_model.pkl', 'yield_scaler.pkl', 'predict'),
+]
+BATCH_SIZES = [1, 8, 64, 512, 2048, 8192, 32768]
+
+
+def best_time(fn, X, repeat):
+    """Best wall time of `repeat` runs, in seconds."""
+    fn(X)  # warm-up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Threads for the parallel path')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    config.MAX_PARALLEL_JOBS = args.jobs
+
+    print("=" * 80)
+    print(f"🌲 Forest parallelism benchmark (cpus={os.cpu_count()}, parallel jobs={args.jobs})")
+    print("=" * 80)
+
+    for name, model_file, scaler_file, method in MODELS:
+        model = joblib.load(os.path.join(MODEL_DIR, model_file))
+        scaler = joblib.load(os.path.join(MODEL_DIR, scaler_file))
+        n_features = scaler.mean_.shape[0]
+
+        # Training-time setting, as pickled
+        model.n_jobs = -1
+        joblib_fn = getattr(model, method)
+
+        serial_model = joblib.load(os.path.join(MODEL_DIR, model_file))
+        serial_model.n_jobs = 1
+        serial_fn = getattr(serial_model, method)
+        chunked = ParallelismPolicy(name, n_jobs=args.jobs, min_parallel_rows=1)
+
+        print(f"\n{name} ({method})")
+        print(f"{'rows':>8} {'n_jobs=-1 ms':>14} {'serial ms':>12} {'chunked ms':>12} {'best':>10}")
+        chunked_wins = []
+        for size in BATCH_SIZES:
+            X = rng.standard_normal((size, n_features))
+            t_joblib = best_time(joblib_fn, X, args.repeat)
+            t_serial = best_time(serial_fn, X, args.repeat)
+            t_chunked = best_time(lambda X: chunked.run(serial_fn, X), X, args.repeat)
+            timings = {'n_jobs=-1': t_joblib, 'serial': t_serial, 'chunked': t_chunked}
+            winner = min(timings, key=timings.get)
+            chunked_wins.append(t_chunked < t_serial)
+            print(f"{size:>8} {t_joblib * 1000:>14.2f} {t_serial * 1000:>12.2f} {t_chunked * 1000:>12.2f} {winner:>10}")
+
+        # Smallest batch size from which the parallel path keeps winning
+        crossover = None
+        for size, wins in reversed(list(zip(BATCH_SIZES, chunked_wins))):
+            if not wins:
+                break
+            crossover = size
+
+        if crossover is None or chunked.n_jobs == 1:
+            print("➡️  Serial wins at every batch size on this host")
+        else:
+            print(f"➡️  Parallel wins from ~{crossover} rows (set AGROSMART_PARALLEL_MIN_ROWS accordingly)")
+
+
+if __name__ == '__main__':
+    main()
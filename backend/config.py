@@ -0,0 +1,263 @@
+"""
+Runtime configuration for the AgroSmart backend.
+Values are read from environment variables, with defaults suited to a single box.
+"""
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean flag from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer from the environment."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float from the environment."""
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int_map(name: str) -> dict:
+    """Read 'key=int,key=int' pairs from the environment."""
+    value = os.getenv(name, '')
+    pairs = [item.split('=', 1) for item in value.split(',') if '=' in item]
+    return {key.strip(): int(number) for key, number in pairs}
+
+
+# ==================== Micro-batching ====================
+
+# Coalesce concurrent single-row requests into one model call
+BATCHING_ENABLED = _env_bool('AGROSMART_BATCHING_ENABLED', True)
+
+# How long the first request in a batch waits for company (milliseconds)
+BATCH_WINDOW_MS = _env_float('AGROSMART_BATCH_WINDOW_MS', 2.0)
+
+# A batch is dispatched as soon as it reaches this many rows
+BATCH_MAX_SIZE = _env_int('AGROSMART_BATCH_MAX_SIZE', 64)
+
+# Pending requests per model before new ones are rejected with 503
+BATCH_QUEUE_SIZE = _env_int('AGROSMART_BATCH_QUEUE_SIZE', 1024)
+
+
+# ==================== Inference executor ====================
+
+# 'thread' shares the loaded models; 'process' sidesteps the GIL at the cost of
+# one model copy per worker process
+EXECUTOR_KIND = os.getenv('AGROSMART_EXECUTOR_KIND', 'thread')
+
+# Worker threads/processes running model calls
+EXECUTOR_WORKERS = _env_int('AGROSMART_EXECUTOR_WORKERS', min(4, os.cpu_count() or 1))
+
+# Model calls allowed to be running or queued before returning 503
+EXECUTOR_MAX_PENDING = _env_int('AGROSMART_EXECUTOR_MAX_PENDING', 256)
+
+
+# ==================== Forest parallelism ====================
+
+# BLAS/OpenMP threads per process (applied with threadpoolctl)
+NATIVE_THREADS = _env_int('AGROSMART_NATIVE_THREADS', 1)
+
+# Upper bound on row-chunk threads any model may use for one batch
+MAX_PARALLEL_JOBS = _env_int('AGROSMART_MAX_PARALLEL_JOBS', os.cpu_count() or 1)
+
+# Row-chunk threads per model for large batches (1 = always serial)
+MODEL_N_JOBS = {
+    name: _env_int(f'AGROSMART_{name.upper()}_N_JOBS', MAX_PARALLEL_JOBS)
+    for name in ('crop', 'fertilizer', 'yield')
+}
+
+# Batches with at least this many rows are split across threads; smaller
+# batches run serially (see benchmarks/bench_parallelism.py for the crossover)
+PARALLEL_MIN_ROWS = _env_int('AGROSMART_PARALLEL_MIN_ROWS', 2048)
+
+
+# ==================== Inference engine ====================
+
+# 'compiled' scores with flat NumPy node arrays (models/compiled_forest.py);
+# 'sklearn' calls the fitted estimators directly
+INFERENCE_ENGINE = os.getenv('AGROSMART_INFERENCE_ENGINE', 'compiled')
+
+# Batches larger than this go to sklearn even with the compiled engine
+COMPILED_MAX_ROWS = _env_int('AGROSMART_COMPILED_MAX_ROWS', 256)
+
+# Fold the fitted StandardScaler into the compiled split thresholds at load
+# time, so raw features skip scaler.transform on the hot path
+FOLD_SCALER = _env_bool('AGROSMART_FOLD_SCALER', True)
+
+
+# ==================== Model files ====================
+
+# 'auto' loads trained_models/<name>_model.bundle when present and the pickle
+# files otherwise; 'bundle' requires the bundle; 'pickle' ignores it
+MODEL_FORMAT = os.getenv('AGROSMART_MODEL_FORMAT', 'auto')
+
+# Memory-map bundle arrays instead of reading them into private memory
+MODEL_MMAP = _env_bool('AGROSMART_MODEL_MMAP', True)
+
+# Check bundle array data against the manifest SHA-256 on load
+MODEL_VERIFY_HASH = _env_bool('AGROSMART_MODEL_VERIFY_HASH', False)
+
+
+# ==================== Model loading ====================
+
+# Load models in background threads after startup so the server accepts
+# traffic immediately (False = startup waits until every model is loaded)
+LOAD_IN_BACKGROUND = _env_bool('AGROSMART_LOAD_IN_BACKGROUND', True)
+
+# Run a few predictions through each model once it is loaded, before it is
+# marked ready, so the first real request does not pay first-call costs
+WARMUP_ENABLED = _env_bool('AGROSMART_WARMUP_ENABLED', True)
+
+# Reload a model automatically when its files in trained_models/ change
+MODEL_WATCH = _env_bool('AGROSMART_MODEL_WATCH', False)
+
+# Seconds between file checks; files must be unchanged for one interval
+# before a reload starts, so a model is not read while it is being written
+MODEL_WATCH_INTERVAL = _env_float('AGROSMART_MODEL_WATCH_INTERVAL', 5.0)
+
+
+# ==================== Rule-based fallback ====================
+
+# Answer with the rule-based engines when an ML model is not ready, fails, is
+# overloaded or misses its deadline; such responses carry "degraded": true
+FALLBACK_ENABLED = _env_bool('AGROSMART_FALLBACK_ENABLED', True)
+
+# Time budget of the model answer per endpoint (milliseconds, 0 = no deadline)
+FALLBACK_DEADLINE_MS = {
+    'crop': _env_float('AGROSMART_CROP_DEADLINE_MS', 500.0),
+    'crop_batch': _env_float('AGROSMART_CROP_BATCH_DEADLINE_MS', 5000.0),
+    'fertilizer': _env_float('AGROSMART_FERTILIZER_DEADLINE_MS', 500.0),
+    'yield': _env_float('AGROSMART_YIELD_DEADLINE_MS', 500.0)
+}
+
+# Consecutive model failures (errors, overload, missed deadlines) that open an
+# endpoint's circuit breaker; its requests then skip the model
+FALLBACK_FAILURE_THRESHOLD = _env_int('AGROSMART_FALLBACK_FAILURE_THRESHOLD', 5)
+
+# Seconds an open breaker waits before one trial request goes to the model again
+FALLBACK_RESET_SECONDS = _env_float('AGROSMART_FALLBACK_RESET_SECONDS', 10.0)
+
+
+# ==================== Single-flight ====================
+
+# Identical prediction requests that arrive while one is being answered share
+# its inference and response instead of running their own
+SINGLEFLIGHT_ENABLED = _env_bool('AGROSMART_SINGLEFLIGHT_ENABLED', True)
+
+
+# ==================== Admin endpoints ====================
+
+# /api/admin/* requires this value in the X-Admin-Token header. Empty (the
+# default) disables the admin endpoints: they answer 404
+ADMIN_TOKEN = os.getenv('AGROSMART_ADMIN_TOKEN', '')
+
+
+# ==================== Metrics ====================
+
+# Record request, stage and prediction metrics and serve them at /metrics.
+# With several worker processes also set PROMETHEUS_MULTIPROC_DIR (serve.py
+# does this itself)
+METRICS_ENABLED = _env_bool('AGROSMART_METRICS_ENABLED', True)
+
+
+# ==================== Request tracing ====================
+
+# Per-stage durations of every request in a Server-Timing response header
+SERVER_TIMING = _env_bool('AGROSMART_SERVER_TIMING', True)
+
+# Requests at least this slow (milliseconds) keep their stage breakdown for
+# GET /api/admin/slow-requests (0 = every request)
+SLOW_REQUEST_MS = _env_float('AGROSMART_SLOW_REQUEST_MS', 100.0)
+
+# Slow requests kept per worker, oldest dropped first (0 = none)
+SLOW_REQUEST_BUFFER = _env_int('AGROSMART_SLOW_REQUEST_BUFFER', 200)
+
+
+# ==================== Profiler ====================
+
+# Allow POST /api/admin/profile (sampling profiler). Off by default; it also
+# needs the admin token, since profiles show stack frames and source paths
+PROFILER_ENABLED = _env_bool('AGROSMART_PROFILER_ENABLED', False)
+
+# Time between stack samples (milliseconds)
+PROFILER_INTERVAL_MS = _env_float('AGROSMART_PROFILER_INTERVAL_MS', 5.0)
+
+# Longest profile a request may ask for (seconds)
+PROFILER_MAX_SECONDS = _env_float('AGROSMART_PROFILER_MAX_SECONDS', 60.0)
+
+
+# ==================== Statistics ====================
+
+# Count predictions for GET /api/statistics
+STATS_ENABLED = _env_bool('AGROSMART_STATS_ENABLED', True)
+
+# Snapshot file shared by all workers, so the totals survive restarts
+# (empty = keep the statistics in memory only)
+STATS_FILE = os.getenv(
+    'AGROSMART_STATS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'statistics.json')
+)
+
+# Seconds between snapshots; other workers' counts lag by up to this much
+STATS_FLUSH_SECONDS = _env_float('AGROSMART_STATS_FLUSH_SECONDS', 10.0)
+
+# Length of the rolling window for recent request counts (minutes)
+STATS_WINDOW_MINUTES = _env_int('AGROSMART_STATS_WINDOW_MINUTES', 60)
+
+# Most recent yield estimates kept for the dashboard
+STATS_RECENT_YIELDS = _env_int('AGROSMART_STATS_RECENT_YIELDS', 20)
+
+
+# ==================== Prediction history ====================
+
+# Keep a record of every answered prediction in SQLite (written in the
+# background, never on the request path)
+HISTORY_ENABLED = _env_bool('AGROSMART_HISTORY_ENABLED', True)
+
+# Database file, shared by all workers
+HISTORY_DB = os.getenv(
+    'AGROSMART_HISTORY_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'history.db')
+)
+
+# Rows per write transaction; a batch is written as soon as it is full
+HISTORY_FLUSH_SIZE = _env_int('AGROSMART_HISTORY_FLUSH_SIZE', 256)
+
+# Seconds a record may wait for a batch to fill before it is written anyway
+HISTORY_FLUSH_INTERVAL = _env_float('AGROSMART_HISTORY_FLUSH_INTERVAL', 1.0)
+
+# Records waiting to be written before new ones are dropped (and counted)
+HISTORY_QUEUE_SIZE = _env_int('AGROSMART_HISTORY_QUEUE_SIZE', 10000)
+
+
+# ==================== Pre-forking server ====================
+
+# Workers forked by serve.py after the models are loaded in the master
+SERVE_WORKERS = _env_int('AGROSMART_WORKERS', os.cpu_count() or 1)
+
+
+# ==================== Prediction cache ====================
+
+# Serve repeated single-row requests from a per-model LRU cache
+CACHE_ENABLED = _env_bool('AGROSMART_CACHE_ENABLED', True)
+
+# Entries per model before the least recently used ones are evicted
+CACHE_MAX_ENTRIES = _env_int('AGROSMART_CACHE_MAX_ENTRIES', 4096)
+
+# Seconds an entry stays valid (0 = until evicted or the model is reloaded)
+CACHE_TTL_SECONDS = _env_float('AGROSMART_CACHE_TTL_SECONDS', 0.0)
+
+# Numeric inputs are rounded to this many decimals for the cache key only
+# (negative = exact); the model always scores the inputs as sent
+CACHE_DECIMALS = _env_int('AGROSMART_CACHE_DECIMALS', 2)
+
+# Per-field overrides, e.g. "rainfall=0,area_hectares=1"
+CACHE_FIELD_DECIMALS = _env_int_map('AGROSMART_CACHE_FIELD_DECIMALS')
@@ -5,8 +5,25 @@ FastAPI application for agricultural predictions and recommendations.
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from api import crop_router, fertilizer_router, yield_router, health_router
+from api import (
+    crop_router,
+    fertilizer_router,
+    yield_router,
+    health_router,
+    admin_router,
+    history_router,
+    metrics_router
+)
+from api.middleware import (
+    MODEL_VERSION_HEADER,
+    SERVER_TIMING_HEADER,
+    ModelVersionMiddleware,
+    ServerTimingMiddleware
+)
+import asyncio
+import config
 import logging
+import signal
 
 # Configure logging
 logging.basicConfig(
@@ -52,8 +69,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=[MODEL_VERSION_HEADER, SERVER_TIMING_HEADER],
 )
 
+# Stage timings (Server-Timing header, slow-request log); added first so it
+# runs inside ModelVersionMiddleware and sees the served model versions
+app.add_middleware(ServerTimingMiddleware)
+
+# Model version header on every response
+app.add_middleware(ModelVersionMiddleware)
+
 
 # Exception handler for validation errors
 @app.exception_handler(ValueError)
@@ -89,6 +114,12 @@ app.include_router(health_router, prefix="/api", tags=["Health"])
 app.include_router(crop_router, prefix="/api", tags=["Crop Prediction"])
 app.include_router(fertilizer_router, prefix="/api", tags=["Fertilizer"])
 app.include_router(yield_router, prefix="/api", tags=["Yield Estimation"])
+app.include_router(history_router, prefix="/api", tags=["History"])
+app.include_router(admin_router, prefix="/api", tags=["Admin"])
+
+# Prometheus scrape endpoint, at the root where Prometheus looks by default
+if config.METRICS_ENABLED:
+    app.include_router(metrics_router)
 
 
 # Root endpoint
@@ -100,8 +131,12 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/api/health",
+        "ready": "/api/ready",
+        "history": "/api/history",
+        "metrics": "/metrics",
         "endpoints": {
             "crop_prediction": "/api/predict-crop",
+            "crop_prediction_batch": "/api/predict-crop/batch",
             "fertilizer_recommendation": "/api/recommend-fertilizer",
             "yield_estimation": "/api/estimate-yield"
         }
@@ -115,19 +150,46 @@ async def startup_event():
     logger.info("🌾 AgroSmart API starting up...")
     logger.info("📊 Loading ML prediction models...")
     
-    # Initialize ML models
+    # Initialize ML models (unless serve.py already loaded them before forking)
     try:
-        from models import initialize_models
-        success = initialize_models()
-        if success:
+        from models import loading, models_loaded
+        if models_loaded():
+            loading.mark_preloaded()
+            logger.info("✅ Using ML models preloaded by the master process")
+        elif config.LOAD_IN_BACKGROUND:
+            # Loads run on background threads; /api/ready reports progress
+            loading.start_loading()
+            logger.info("⏳ Loading ML models in the background, see /api/ready")
+        elif loading.load_all():
             logger.info("✅ All ML models loaded successfully!")
         else:
             logger.warning("⚠️  Some models failed to load, check configuration")
+        
+        # Hot reload: on file changes (optional) and on SIGHUP (serve.py relays it)
+        if config.MODEL_WATCH:
+            loading.start_watching()
+            logger.info(f"👀 Watching model files every {config.MODEL_WATCH_INTERVAL:g}s")
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, loading.start_reload)
+        except (NotImplementedError, RuntimeError, ValueError, AttributeError):
+            pass  # Not on the main thread or not supported on this platform
     except Exception as e:
         logger.error(f"❌ Failed to load ML models: {e}")
-        logger.info("📝 Will use fallback logic if available")
     
-    logger.info("✅ API ready to serve predictions!")
+    # Prediction statistics: load the saved totals, then snapshot periodically
+    from services import statistics
+    await statistics.start()
+    
+    # Prediction history: background writer to SQLite
+    if config.HISTORY_ENABLED:
+        from services import history
+        try:
+            await history.store.start()
+            logger.info(f"🗄️  Recording prediction history in {config.HISTORY_DB}")
+        except Exception as e:
+            logger.error(f"❌ Failed to open prediction history database: {e}")
+    
+    logger.info("✅ API accepting requests")
 
 
 # Shutdown event
@@ -135,6 +197,18 @@ async def startup_event():
 async def shutdown_event():
     """Run on application shutdown."""
     logger.info("👋 AgroSmart API shutting down...")
+    
+    from models import loading
+    loading.stop_watching()
+    
+    from services import statistics
+    await statistics.stop()
+    
+    from services import history
+    await history.store.close()
+    
+    from services.inference import shutdown
+    await shutdown()
 
 
 if __name__ == "__main__":
@@ -3,28 +3,37 @@ Models package for AgroSmart prediction system.
 Now using trained ML models instead of rule-based logic.
 """
 # Import ML-based prediction functions
-from .crop_model_ml import predict_crop, load_models as load_crop_model
-from .fertilizer_model_ml import recommend_fertilizer, load_models as load_fert_model
-from .yield_model_ml import estimate_yield, load_models as load_yield_model
+from .crop_model_ml import predict_crop, predict_crop_batch, load_models as load_crop_model
+from .fertilizer_model_ml import recommend_fertilizer, recommend_fertilizer_batch, load_models as load_fert_model
+from .yield_model_ml import estimate_yield, estimate_yield_batch, load_models as load_yield_model
 
 # Export functions
 __all__ = [
     "predict_crop",
+    "predict_crop_batch",
     "recommend_fertilizer",
+    "recommend_fertilizer_batch",
     "estimate_yield",
+    "estimate_yield_batch",
     "load_crop_model",
     "load_fert_model",
-    "load_yield_model"
+    "load_yield_model",
+    "models_loaded"
 ]
 
+def models_loaded():
+    """Whether all three models are already in memory (e.g. preloaded before fork)"""
+    from . import crop_model_ml, fertilizer_model_ml, yield_model_ml
+    return all(handle is not None for handle in (
+        crop_model_ml.crop_handle, fertilizer_model_ml.fert_handle, yield_model_ml.yield_handle
+    ))
+
 # Load all models on import
 def initialize_models():
-    """Initialize all ML models"""
+    """Initialize all ML models (concurrently) and wait until they are ready"""
+    from .loading import load_all
     try:
-        load_crop_model()
-        load_fert_model()
-        load_yield_model()
-        return True
+        return load_all()
     except Exception as e:
         print(f"Warning: Could not load all models: {e}")
         return False
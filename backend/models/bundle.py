@@ -0,0 +1,493 @@
+"""
+Single-file model bundles.
+One versioned file per model: a JSON manifest (features, encoders, classes,
+scaler, metrics, content hash) followed by uncompressed, 64-byte aligned NumPy
+arrays that can be memory-mapped. The compiled forest runs directly on the
+mapped arrays; the sklearn estimator is only rebuilt if something needs it.
+
+Layout:
+    8 bytes   magic b'AGSBNDL\\x00'
+    8 bytes   manifest length (little-endian uint64)
+    N bytes   manifest (UTF-8 JSON)
+    padding   to a 64-byte boundary, then the array data section
+
+Convert an existing set of pickles with:
+    python -m models.bundle [trained_models_dir]
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+import config
+from .compiled_forest import CompiledForest, probe_inputs, reference_outputs
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'AGSBNDL\x00'
+FORMAT_NAME = 'agrosmart-model-bundle'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Model names used by the loaders and their bundle file names
+BUNDLE_FILES = {
+    'crop': 'crop_model.bundle',
+    'fertilizer': 'fertilizer_model.bundle',
+    'yield': 'yield_model.bundle'
+}
+
+# Per-node sklearn columns the compiled arrays do not already hold
+_EXTRA_NODE_COLUMNS = ('impurity', 'n_node_samples', 'weighted_n_node_samples', 'missing_go_to_left')
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def bundle_path(model_dir: str, name: str) -> str:
+    """Path of the bundle file for one model ('crop', 'fertilizer' or 'yield')."""
+    return os.path.join(model_dir, BUNDLE_FILES[name])
+
+
+# ==================== Writing ====================
+
+def _scaler_manifest(scaler) -> Dict[str, Any]:
+    def as_list(value):
+        return None if value is None else np.asarray(value).tolist()
+
+    return {
+        'with_mean': scaler.with_mean,
+        'with_std': scaler.with_std,
+        'mean': as_list(scaler.mean_),
+        'var': as_list(scaler.var_),
+        'scale': as_list(scaler.scale_),
+        'n_samples_seen': as_list(scaler.n_samples_seen_),
+        'feature_names_in': as_list(getattr(scaler, 'feature_names_in_', None))
+    }
+
+
+def write_bundle(
+    path: str,
+    name: str,
+    model,
+    scaler,
+    features: List[str],
+    encoders: Optional[Mapping[str, Any]] = None,
+    target: Optional[str] = None,
+    metrics: Optional[Mapping[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Write a fitted forest, its scaler and metadata to one bundle file.
+
+    The file is written next to `path` and renamed into place, so a running
+    server never sees a half-written bundle. The bundle is read back and the
+    rebuilt sklearn forest compared tree by tree with `model` before the
+    rename; any difference raises ValueError.
+
+    Returns:
+        The manifest that was written
+    """
+    is_classifier = hasattr(model, 'classes_')
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    nodes = np.concatenate([tree.__getstate__()['nodes'] for tree in trees])
+
+    compiled = CompiledForest.from_sklearn(model)
+    folded = compiled.fold_scaler(scaler)
+    probe = probe_inputs(scaler, compiled.n_features_in_, folded)
+
+    arrays = {
+        'feature': compiled.feature,
+        'threshold': compiled.threshold,
+        'threshold_folded': folded.threshold,
+        'children': compiled.children,
+        'value': compiled.value,
+        'roots': compiled.roots,
+        'probe_X': probe,
+        'probe_expected': reference_outputs(model, scaler, probe)
+    }
+    for column in _EXTRA_NODE_COLUMNS:
+        arrays[column] = np.ascontiguousarray(nodes[column])
+
+    # Array table, offsets relative to the start of the data section
+    table = {}
+    offset = 0
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[key] = array
+        offset = _align(offset)
+        table[key] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    digest = hashlib.sha256()
+    for key, array in arrays.items():
+        digest.update(array.tobytes())
+    sha256 = digest.hexdigest()
+    created = time.gmtime()
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'format_version': FORMAT_VERSION,
+        'name': name,
+        'version': f"{time.strftime('%Y%m%dT%H%M%SZ', created)}-{sha256[:12]}",
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', created),
+        'sha256': sha256,
+        'sklearn_version': __import__('sklearn').__version__,
+        'numpy_version': np.__version__,
+        'estimator': type(model).__name__,
+        'params': model.get_params(),
+        'forest': {
+            'tree_estimator': type(model.estimators_[0]).__name__,
+            'n_features_in': int(model.n_features_in_),
+            'n_samples': int(getattr(model, '_n_samples', 0)),
+            'n_samples_bootstrap': getattr(model, '_n_samples_bootstrap', None),
+            'max_features': [int(estimator.max_features_) for estimator in model.estimators_],
+            'random_state': [int(estimator.random_state) for estimator in model.estimators_],
+            'node_count': [int(tree.node_count) for tree in trees],
+            'max_depth': [int(tree.max_depth) for tree in trees]
+        },
+        'features': list(features),
+        'target': target,
+        'classes': model.classes_.tolist() if is_classifier else None,
+        'encoders': {key: encoder.classes_.tolist() for key, encoder in (encoders or {}).items()},
+        'scaler': _scaler_manifest(scaler),
+        'metrics': {key: float(value) for key, value in (metrics or {}).items()},
+        'arrays': table
+    }
+
+    header = json.dumps(manifest).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack('<Q', len(header)))
+        fh.write(header)
+        for key, array in arrays.items():
+            fh.write(b'\0' * (data_start + table[key]['offset'] - fh.tell()))
+            fh.write(array.tobytes())
+
+    try:
+        _check_round_trip(read_bundle(tmp_path, mmap_mode=None, verify=True), model)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def _check_round_trip(bundle: 'ModelBundle', model) -> None:
+    """Raise ValueError unless the bundle rebuilds exactly `model`'s trees."""
+    rebuilt = bundle.model.model
+    for original, copy in zip(model.estimators_, rebuilt.estimators_):
+        before, after = original.tree_.__getstate__(), copy.tree_.__getstate__()
+        same = (
+            before['max_depth'] == after['max_depth']
+            and np.array_equal(before['nodes'], after['nodes'])
+            and np.array_equal(before['values'], after['values'])
+            and np.array_equal(getattr(original, 'classes_', 0), getattr(copy, 'classes_', 0))
+        )
+        if not same:
+            raise ValueError(f"{bundle.name} bundle does not reproduce the fitted trees")
+    if not np.array_equal(reference_outputs(rebuilt, bundle.scaler, bundle.arrays['probe_X']),
+                          bundle.arrays['probe_expected']):
+        raise ValueError(f"{bundle.name} bundle does not reproduce the fitted forest")
+
+
+# ==================== Reading ====================
+
+class LazyForest:
+    """
+    sklearn forest rebuilt from a bundle on first use.
+
+    Exposes the attributes the loaders need (classes_, n_features_in_,
+    n_jobs) without materializing the per-tree sklearn node arrays; predict
+    and predict_proba build the estimator once, then delegate to it.
+    """
+
+    def __init__(self, bundle: 'ModelBundle'):
+        self._bundle = bundle
+        self._model = None
+        self._lock = threading.Lock()
+        self.classes_ = bundle.classes
+        self.n_features_in_ = bundle.manifest['forest']['n_features_in']
+        self.n_jobs = bundle.manifest['params'].get('n_jobs')
+
+    @property
+    def is_built(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        """The rebuilt sklearn estimator."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    model = _build_forest(self._bundle)
+                    model.n_jobs = self.n_jobs
+                    self._model = model
+                    logger.info(
+                        f"Rebuilt sklearn {self._bundle.name} forest from bundle "
+                        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+                    )
+        return self._model
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(X)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(X)
+
+
+def _build_forest(bundle: 'ModelBundle'):
+    """Reconstruct the fitted sklearn forest from the bundle arrays."""
+    from sklearn import ensemble, tree as sk_tree
+    from sklearn.tree._tree import NODE_DTYPE, TREE_LEAF, TREE_UNDEFINED, Tree
+
+    manifest, arrays = bundle.manifest, bundle.arrays
+    meta = manifest['forest']
+    n_features = meta['n_features_in']
+    classes = bundle.classes
+    n_classes = len(classes) if classes is not None else 1
+
+    forest = getattr(ensemble, manifest['estimator'])(**manifest['params'])
+    tree_cls = getattr(sk_tree, meta['tree_estimator'])
+    tree_params = {param: getattr(forest, param) for param in forest.estimator_params}
+
+    feature, threshold = arrays['feature'], arrays['threshold']
+    children, value = arrays['children'], arrays['value']
+    offsets = arrays['roots']
+
+    estimators = []
+    for i, (offset, count) in enumerate(zip(offsets.tolist(), meta['node_count'])):
+        span = slice(offset, offset + count)
+        own = np.arange(offset, offset + count)
+        left = children[2 * offset:2 * (offset + count):2]
+        right = children[2 * offset + 1:2 * (offset + count):2]
+        is_leaf = left == own
+
+        nodes = np.empty(count, dtype=NODE_DTYPE)
+        nodes['left_child'] = np.where(is_leaf, TREE_LEAF, left - offset)
+        nodes['right_child'] = np.where(is_leaf, TREE_LEAF, right - offset)
+        nodes['feature'] = np.where(is_leaf, TREE_UNDEFINED, feature[span])
+        nodes['threshold'] = np.where(is_leaf, float(TREE_UNDEFINED), threshold[span])
+        for column in _EXTRA_NODE_COLUMNS:
+            nodes[column] = arrays[column][span]
+
+        tree = Tree(n_features, np.array([n_classes], dtype=np.intp), 1)
+        tree.__setstate__({
+            'max_depth': meta['max_depth'][i],
+            'node_count': count,
+            'nodes': nodes,
+            'values': np.ascontiguousarray(value[span], dtype=np.float64).reshape(count, 1, n_classes)
+        })
+
+        estimator = tree_cls(**{**tree_params, 'random_state': meta['random_state'][i]})
+        estimator.n_features_in_ = n_features
+        estimator.n_outputs_ = 1
+        estimator.max_features_ = meta['max_features'][i]
+        if classes is not None:
+            # Forests fit their trees on class indices
+            estimator.classes_ = np.arange(n_classes, dtype=np.float64)
+            estimator.n_classes_ = np.int64(n_classes)
+        estimator.tree_ = tree
+        estimators.append(estimator)
+
+    forest.estimator_ = tree_cls(**tree_params)
+    forest.estimators_ = estimators
+    forest.n_features_in_ = n_features
+    forest.n_outputs_ = 1
+    forest._n_samples = meta['n_samples']
+    forest._n_samples_bootstrap = meta['n_samples_bootstrap']
+    if classes is not None:
+        forest.classes_ = classes
+        forest.n_classes_ = n_classes
+    return forest
+
+
+class BundleScaler:
+    """
+    Fitted StandardScaler parameters from a bundle.
+
+    Computes transform and inverse_transform with the same float64 operations
+    as sklearn, so the serving path never has to import sklearn.
+    """
+
+    def __init__(self, spec: Mapping[str, Any]):
+        def as_array(value):
+            return None if value is None else np.asarray(value, dtype=np.float64)
+
+        self.with_mean = spec['with_mean']
+        self.with_std = spec['with_std']
+        self.mean_ = as_array(spec['mean'])
+        self.var_ = as_array(spec['var'])
+        self.scale_ = as_array(spec['scale'])
+        self.n_features_in_ = len(self.mean_ if self.mean_ is not None else self.scale_)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.with_mean:
+            X -= self.mean_
+        if self.with_std:
+            X /= self.scale_
+        return X
+
+    def inverse_transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        if self.with_std:
+            X *= self.scale_
+        if self.with_mean:
+            X += self.mean_
+        return X
+
+
+class BundleLabels:
+    """Fitted LabelEncoder classes from a bundle."""
+
+    def __init__(self, classes: List[Any]):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._codes = {label: code for code, label in enumerate(classes)}
+
+    def transform(self, labels) -> np.ndarray:
+        try:
+            return np.array([self._codes[label] for label in labels], dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"y contains previously unseen labels: {e.args[0]!r}")
+
+
+class ModelBundle:
+    """A model bundle opened for inference."""
+
+    def __init__(self, path: str, manifest: Dict[str, Any], arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+        self.name = manifest['name']
+        self.version = manifest['version']
+        self.features = manifest['features']
+        self.target = manifest.get('target')
+        self.metrics = manifest.get('metrics', {})
+        classes = manifest.get('classes')
+        self.classes = None if classes is None else np.asarray(classes, dtype=object)
+        self.scaler = BundleScaler(manifest['scaler'])
+        self.encoders = {key: BundleLabels(classes) for key, classes in manifest.get('encoders', {}).items()}
+        self.model = LazyForest(self)
+
+    def compiled_forest(self, max_rows: Optional[int] = None, folded: bool = True) -> CompiledForest:
+        """CompiledForest over the bundle arrays (no copies), optionally with the scaler folded in."""
+        meta = self.manifest['forest']
+        return CompiledForest(
+            feature=self.arrays['feature'],
+            threshold=self.arrays['threshold_folded' if folded else 'threshold'],
+            children=self.arrays['children'],
+            value=self.arrays['value'],
+            roots=self.arrays['roots'],
+            max_depth=max(meta['max_depth']),
+            n_features=meta['n_features_in'],
+            classes=self.classes,
+            fallback=self.model if max_rows is not None else None,
+            max_rows=max_rows,
+            scaler=self.scaler if folded else None
+        )
+
+
+def read_bundle(path: str, mmap_mode: Optional[str] = 'r', verify: bool = False) -> ModelBundle:
+    """
+    Open a bundle file.
+
+    Args:
+        path: Bundle file
+        mmap_mode: 'r' maps the array section read-only (pages are loaded on
+            first touch and shared between processes); None reads it into memory
+        verify: Check the array section against the manifest's SHA-256
+
+    Raises:
+        ValueError: If the file is not a bundle, has an unsupported format
+            version or fails verification
+    """
+    if mmap_mode not in ('r', None):
+        raise ValueError(f"Unsupported mmap_mode: {mmap_mode!r}")
+
+    with open(path, 'rb') as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model bundle")
+        (length,) = struct.unpack('<Q', fh.read(8))
+        manifest = json.loads(fh.read(length).decode('utf-8'))
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported bundle format version {manifest.get('format_version')}")
+        data_start = _align(len(MAGIC) + 8 + length)
+        if mmap_mode == 'r':
+            buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            fh.seek(0)
+            buffer = fh.read()
+
+    arrays = {}
+    for key, spec in manifest['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+        count = int(np.prod(shape)) if shape else 1
+        arrays[key] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec['offset']
+        ).reshape(shape)
+
+    if verify:
+        digest = hashlib.sha256()
+        for key in manifest['arrays']:
+            digest.update(arrays[key].tobytes())
+        if digest.hexdigest() != manifest['sha256']:
+            raise ValueError(f"{path}: array data does not match the manifest hash")
+
+    return ModelBundle(path, manifest, arrays)
+
+
+def open_bundle(model_dir: str, name: str) -> Optional[ModelBundle]:
+    """
+    Open a model's bundle according to AGROSMART_MODEL_FORMAT.
+
+    Returns None when the loader should read the legacy pickle files instead
+    ('pickle', or 'auto' with no bundle on disk).
+    """
+    path = bundle_path(model_dir, name)
+    if config.MODEL_FORMAT == 'pickle':
+        return None
+    if config.MODEL_FORMAT == 'auto' and not os.path.exists(path):
+        return None
+    return read_bundle(
+        path,
+        mmap_mode='r' if config.MODEL_MMAP else None,
+        verify=config.MODEL_VERIFY_HASH
+    )
+
+
+def bundle_from_pickles(model_dir: str, name: str) -> Dict[str, Any]:
+    """Write a bundle from the pickle files train_models.py has always produced."""
+    import joblib
+
+    def load(suffix, default=None):
+        file = os.path.join(model_dir, f'{name}_{suffix}.pkl')
+        return joblib.load(file) if os.path.exists(file) else default
+
+    return write_bundle(
+        bundle_path(model_dir, name),
+        name,
+        model=load('model'),
+        scaler=load('scaler'),
+        features=load('features'),
+        encoders=load('encoders', {}),
+        target=load('target_col', 'label' if name == 'crop' else None)
+    )
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..', 'trained_models')
+    for model_name in BUNDLE_FILES:
+        written = bundle_from_pickles(directory, model_name)
+        print(f"💾 Saved: {BUNDLE_FILES[model_name]} (version {written['version']})")
@@ -0,0 +1,408 @@
+"""
+sklearn-free runtime for the trained random forests.
+Flattens every fitted tree into contiguous NumPy node arrays and walks all trees
+for all rows at once, skipping sklearn's per-call validation and per-estimator
+dispatch. The fitted StandardScaler can be folded into the split thresholds so
+raw features go straight into the forest.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+import config
+from .spans import span
+
+logger = logging.getLogger(__name__)
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _float_to_key(x: np.ndarray) -> np.ndarray:
+    """Map float64 values to int64 keys with the same ordering."""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits >= 0, bits, -(bits & _SIGN_MASK))
+
+
+def _key_to_float(key: np.ndarray) -> np.ndarray:
+    """Inverse of _float_to_key."""
+    magnitude = np.abs(key).astype(np.int64).view(np.float64)
+    return np.where(key >= 0, magnitude, -magnitude)
+
+
+def fold_thresholds(
+    threshold: np.ndarray,
+    feature: np.ndarray,
+    mean: np.ndarray,
+    scale: np.ndarray
+) -> np.ndarray:
+    """
+    Move split thresholds from standardized space into raw feature space.
+
+    sklearn sends a raw value x left when float32((x - mean) / scale) <= t.
+    That test is monotone in x, so for every node we binary-search the float64
+    bit patterns for the largest x that still goes left. Comparing raw inputs
+    against these thresholds gives exactly the same decisions as scaling first.
+    """
+    folded = np.full(threshold.shape, np.inf)
+    split = np.isfinite(threshold)
+    t = threshold[split]
+    m = mean[feature[split]]
+    s = scale[feature[split]]
+
+    # Invariant: lo goes left, hi goes right
+    lo = np.full(t.shape, _float_to_key(np.array(-np.inf)))
+    hi = np.full(t.shape, _float_to_key(np.array(np.inf)))
+    with np.errstate(over='ignore', invalid='ignore'):
+        while True:
+            unresolved = hi > lo + 1
+            if not unresolved.any():
+                break
+            mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+            goes_left = ((_key_to_float(mid) - m) / s).astype(np.float32) <= t
+            lo = np.where(unresolved & goes_left, mid, lo)
+            hi = np.where(unresolved & ~goes_left, mid, hi)
+
+    folded[split] = _key_to_float(lo)
+    return folded
+
+
+class CompiledForest:
+    """
+    Flat node-array form of a fitted RandomForestClassifier/Regressor.
+
+    Node i of the flattened forest tests `X[:, feature[i]] <= threshold[i]` and
+    moves to `children[2 * i]` (left) or `children[2 * i + 1]` (right). Leaves
+    point to themselves with an infinite threshold, so every tree can be stepped
+    `max_depth` times without checking whether it has already finished.
+
+    Predictions reproduce sklearn exactly: inputs are cast to float32 as sklearn
+    does, leaves carry the same per-tree outputs, and tree outputs are
+    accumulated in estimator order before dividing by the tree count.
+
+    Walking all trees in lockstep is fastest for small batches. When `fallback`
+    (the source sklearn estimator) is given, batches larger than `max_rows` are
+    handed to it, since sklearn's per-tree Cython loops win there.
+
+    After `fold_scaler`, the forest takes raw (unscaled) features; `scaler` is
+    then kept only to feed the sklearn fallback.
+
+    `name` is set on the engine a model actually calls, so its stages are
+    reported to models/spans.py; forests wrapped in a ScaledModel stay unnamed.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        classes: Optional[np.ndarray] = None,
+        fallback=None,
+        max_rows: Optional[int] = None,
+        scaler=None
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+        self.classes_ = classes
+        self.n_estimators = len(roots)
+        self.fallback = fallback
+        self.max_rows = max_rows
+        self.scaler = scaler
+        self.name: Optional[str] = None
+
+    @property
+    def is_classifier(self) -> bool:
+        return self.classes_ is not None
+
+    @property
+    def node_count(self) -> int:
+        return self.feature.shape[0]
+
+    @property
+    def raw_input(self) -> bool:
+        """Whether the scaler has been folded into the thresholds."""
+        return self.scaler is not None
+
+    @classmethod
+    def from_sklearn(cls, model, max_rows: Optional[int] = None) -> 'CompiledForest':
+        """Flatten a fitted sklearn forest into node arrays."""
+        is_classifier = hasattr(model, 'classes_')
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        total = int(counts.sum())
+
+        feature = np.zeros(total, dtype=np.intp)
+        threshold = np.full(total, np.inf, dtype=np.float64)
+        children = np.empty(2 * total, dtype=np.intp)
+        if is_classifier:
+            value = np.empty((total, len(model.classes_)), dtype=np.float64)
+        else:
+            value = np.empty(total, dtype=np.float64)
+
+        for tree, offset, count in zip(trees, offsets, counts):
+            nodes = slice(offset, offset + count)
+            own = np.arange(offset, offset + count)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back onto themselves
+            children[2 * offset:2 * (offset + count):2] = np.where(is_leaf, own, tree.children_left + offset)
+            children[2 * offset + 1:2 * (offset + count):2] = np.where(is_leaf, own, tree.children_right + offset)
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+
+            if is_classifier:
+                # sklearn >= 1.4 stores per-node class fractions, which is
+                # exactly what DecisionTreeClassifier.predict_proba returns
+                value[nodes] = tree.value[:, 0, :len(model.classes_)]
+            else:
+                value[nodes] = tree.value[:, 0, 0]
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            children=children,
+            value=value,
+            roots=offsets.astype(np.intp),
+            max_depth=max(tree.max_depth for tree in trees),
+            n_features=model.n_features_in_,
+            classes=np.asarray(model.classes_) if is_classifier else None,
+            fallback=model if max_rows is not None else None,
+            max_rows=max_rows
+        )
+
+    def fold_scaler(self, scaler) -> 'CompiledForest':
+        """Return a copy that takes raw features, with `scaler` folded into the thresholds."""
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(self.n_features_in_)
+        scale = scaler.scale_ if scaler.with_std else np.ones(self.n_features_in_)
+        return CompiledForest(
+            feature=self.feature,
+            threshold=fold_thresholds(self.threshold, self.feature, mean, scale),
+            children=self.children,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            n_features=self.n_features_in_,
+            classes=self.classes_,
+            fallback=self.fallback,
+            max_rows=self.max_rows,
+            scaler=scaler
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached in every tree, shape (n_estimators, n_rows)."""
+        # sklearn evaluates trees on float32 inputs; folded thresholds already
+        # account for that cast, so raw inputs stay in float64
+        dtype = np.float64 if self.raw_input else np.float32
+        X = np.ascontiguousarray(X, dtype=dtype)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows) * n_features)[np.newaxis, :]
+        node = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+
+        for _ in range(self.max_depth):
+            go_right = flat[row_base + self.feature[node]] > self.threshold[node]
+            node = self.children[2 * node + go_right]
+
+        return node
+
+    def _accumulate(self, leaves: np.ndarray) -> np.ndarray:
+        """Average leaf values over trees, in estimator order like sklearn."""
+        out = np.zeros((leaves.shape[1],) + self.value.shape[1:])
+        for tree_leaves in leaves:
+            out += self.value[tree_leaves]
+        out /= self.n_estimators
+        return out
+
+    def _use_fallback(self, X: np.ndarray) -> bool:
+        return self.fallback is not None and X.shape[0] > self.max_rows
+
+    def _fallback_input(self, X: np.ndarray) -> np.ndarray:
+        if not self.raw_input:
+            return X
+        with span(self.name, 'scaling'):
+            return self.scaler.transform(X)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities, identical to the source classifier's predict_proba."""
+        if self._use_fallback(X):
+            X = self._fallback_input(X)
+            with span(self.name, 'inference'):
+                return self.fallback.predict_proba(X)
+        with span(self.name, 'inference'):
+            return self._accumulate(self.apply(X))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predicted class labels (classifier) or values (regressor)."""
+        if self._use_fallback(X):
+            X = self._fallback_input(X)
+            with span(self.name, 'inference'):
+                return self.fallback.predict(X)
+        with span(self.name, 'inference'):
+            averaged = self._accumulate(self.apply(X))
+        if self.is_classifier:
+            return self.classes_.take(np.argmax(averaged, axis=1), axis=0)
+        return averaged
+
+
+class ScaledModel:
+    """
+    Apply a fitted scaler before delegating to a model.
+
+    Gives engines that still expect standardized input the same raw-feature
+    interface as a forest with the scaler folded in.
+    """
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+        self.classes_ = getattr(model, 'classes_', None)
+        self.name: Optional[str] = None
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        with span(self.name, 'scaling'):
+            X = self.scaler.transform(X)
+        with span(self.name, 'inference'):
+            return self.model.predict_proba(X)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        with span(self.name, 'scaling'):
+            X = self.scaler.transform(X)
+        with span(self.name, 'inference'):
+            return self.model.predict(X)
+
+
+def matches_sklearn(engine, model, scaler, X_raw: np.ndarray) -> bool:
+    """Whether `engine` on raw X matches scaler + sklearn model exactly."""
+    X_scaled = scaler.transform(X_raw)
+    if getattr(model, 'classes_', None) is not None:
+        return np.array_equal(engine.predict_proba(X_raw), model.predict_proba(X_scaled))
+    return np.array_equal(engine.predict(X_raw), model.predict(X_scaled))
+
+
+def boundary_probe(engine: CompiledForest, X: np.ndarray, n_nodes: int = 128, seed: int = 0) -> np.ndarray:
+    """
+    Rows of X with one feature moved onto a folded split threshold or just past it.
+
+    These are the inputs where a wrong fold would first change a decision.
+    """
+    rng = np.random.default_rng(seed)
+    splits = np.flatnonzero(np.isfinite(engine.threshold))
+    nodes = rng.choice(splits, size=min(n_nodes, len(splits)), replace=False)
+    rows = X[rng.integers(0, len(X), size=2 * len(nodes))].copy()
+    for i, node in enumerate(nodes):
+        column, at = engine.feature[node], engine.threshold[node]
+        rows[2 * i, column] = at
+        rows[2 * i + 1, column] = np.nextafter(at, np.inf)
+    return rows
+
+
+def probe_inputs(scaler, n_features: int, folded: Optional[CompiledForest] = None, probe_rows: int = 256) -> np.ndarray:
+    """
+    Raw-feature probe batch around the training distribution.
+
+    With a folded forest, rows sitting exactly on (and just past) its folded
+    thresholds are appended.
+    """
+    rng = np.random.default_rng(0)
+    probe = scaler.inverse_transform(rng.standard_normal((probe_rows, n_features)))
+    if folded is not None:
+        probe = np.vstack([probe, boundary_probe(folded, probe)])
+    return probe
+
+
+def reference_outputs(model, scaler, X_raw: np.ndarray) -> np.ndarray:
+    """What scaler + sklearn model return on raw X (probabilities for classifiers)."""
+    X_scaled = scaler.transform(X_raw)
+    if getattr(model, 'classes_', None) is not None:
+        return model.predict_proba(X_scaled)
+    return model.predict(X_scaled)
+
+
+def matches_reference(engine, X_raw: np.ndarray, expected: np.ndarray, max_rows: int) -> bool:
+    """
+    Whether `engine` reproduces `expected` on raw X exactly.
+
+    Checked in chunks of `max_rows`, the batches the compiled path handles
+    itself rather than passing to the sklearn fallback.
+    """
+    is_classifier = getattr(engine, 'classes_', None) is not None
+    n_chunks = max(1, -(-len(X_raw) // max_rows))
+    for rows in np.array_split(np.arange(len(X_raw)), n_chunks):
+        chunk = X_raw[rows]
+        output = engine.predict_proba(chunk) if is_classifier else engine.predict(chunk)
+        if not np.array_equal(output, expected[rows]):
+            return False
+    return True
+
+
+def _named(engine, name: str):
+    """Name the engine a model calls, so its stage timings are reported under `name`."""
+    engine.name = name
+    return engine
+
+
+def compile_for_inference(model, scaler, name: str, probe_rows: int = 256):
+    """
+    Return the object the prediction functions should call on raw features.
+
+    With AGROSMART_INFERENCE_ENGINE=compiled the forest is flattened and, with
+    AGROSMART_FOLD_SCALER, the scaler is folded into its thresholds. The result
+    is checked against scaler + sklearn on a probe batch (including inputs that
+    sit exactly on folded thresholds); if anything differs the sklearn path is
+    used instead so a runtime bug can never change predictions.
+    """
+    sklearn_engine = ScaledModel(model, scaler)
+    if config.INFERENCE_ENGINE != 'compiled':
+        return _named(sklearn_engine, name)
+
+    compiled = CompiledForest.from_sklearn(model, max_rows=config.COMPILED_MAX_ROWS)
+    folded = compiled.fold_scaler(scaler) if config.FOLD_SCALER else None
+    engine = folded if folded is not None else ScaledModel(compiled, scaler)
+
+    probe = probe_inputs(scaler, compiled.n_features_in_, folded, probe_rows)
+    expected = reference_outputs(model, scaler, probe)
+    if not matches_reference(engine, probe, expected, compiled.max_rows):
+        logger.warning(f"Compiled {name} forest disagrees with sklearn, using sklearn engine")
+        return _named(sklearn_engine, name)
+
+    logger.info(
+        f"Compiled {name} forest: {compiled.n_estimators} trees, {compiled.node_count} nodes"
+        f"{', scaler folded' if config.FOLD_SCALER else ''}"
+    )
+    return _named(engine, name)
+
+
+def compile_bundle(bundle, name: str):
+    """
+    compile_for_inference for a model bundle (models/bundle.py).
+
+    The bundle already holds the flattened forest, its folded thresholds and
+    the sklearn outputs for a probe batch, so nothing is rebuilt or re-folded
+    here and the sklearn forest is only reconstructed if it is actually used.
+    """
+    sklearn_engine = ScaledModel(bundle.model, bundle.scaler)
+    if config.INFERENCE_ENGINE != 'compiled':
+        return _named(sklearn_engine, name)
+
+    compiled = bundle.compiled_forest(max_rows=config.COMPILED_MAX_ROWS, folded=config.FOLD_SCALER)
+    engine = compiled if config.FOLD_SCALER else ScaledModel(compiled, bundle.scaler)
+
+    if not matches_reference(engine, bundle.arrays['probe_X'], bundle.arrays['probe_expected'], compiled.max_rows):
+        logger.warning(f"Compiled {name} forest disagrees with its bundle probe, using sklearn engine")
+        return _named(sklearn_engine, name)
+
+    logger.info(
+        f"Loaded {name} bundle {bundle.version}: {compiled.n_estimators} trees, "
+        f"{compiled.node_count} nodes{', scaler folded' if config.FOLD_SCALER else ''}"
+    )
+    return _named(engine, name)
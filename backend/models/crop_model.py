@@ -2,9 +2,88 @@
 Crop prediction model using rule-based logic.
 For demonstration purposes - can be replaced with trained ML models.
 """
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import random
 
+import numpy as np
+
+# Requirement range -> sample field, in the column order of the compiled bounds
+RANGE_FIELDS = (
+    ('n_range', 'n_level'),
+    ('p_range', 'p_level'),
+    ('k_range', 'k_level'),
+    ('ph_range', 'ph_level'),
+    ('temp_range', 'temperature'),
+    ('humidity_range', 'humidity'),
+    ('rainfall_range', 'rainfall')
+)
+
+
+class CompiledCropRules:
+    """
+    Crop requirements compiled into arrays, to score every crop for many
+    samples at once.
+
+    `lower`/`upper` hold the (n_crops x n_ranges) range bounds, and
+    `soil_mask`/`region_mask` say which crops suit each known soil type and
+    region (the last row, for unknown values, suits none). Scores are the
+    same as CropPredictor.calculate_suitability_score.
+    """
+
+    def __init__(self, requirements: Dict[str, Dict[str, Any]]):
+        self.crops = list(requirements)
+        self.lower = np.array(
+            [[req[key][0] for key, _ in RANGE_FIELDS] for req in requirements.values()], dtype=np.float64
+        )
+        self.upper = np.array(
+            [[req[key][1] for key, _ in RANGE_FIELDS] for req in requirements.values()], dtype=np.float64
+        )
+        self.soil_codes, self.soil_mask = self._membership(requirements, 'soil_types')
+        self.region_codes, self.region_mask = self._membership(requirements, 'regions')
+
+    @staticmethod
+    def _membership(requirements: Dict[str, Dict[str, Any]], key: str) -> Tuple[Dict[str, int], np.ndarray]:
+        values = sorted({value for req in requirements.values() for value in req[key]})
+        codes = {value: code for code, value in enumerate(values)}
+        mask = np.zeros((len(values) + 1, len(requirements)), dtype=bool)
+        for crop, req in enumerate(requirements.values()):
+            for value in req[key]:
+                mask[codes[value], crop] = True
+        return codes, mask
+
+    @staticmethod
+    def _encode(values, codes: Dict[str, int], count: int) -> np.ndarray:
+        unknown = len(codes)
+        return np.fromiter((codes.get(value, unknown) for value in values), dtype=np.intp, count=count)
+
+    def scores(
+        self,
+        samples: Sequence[Dict[str, Any]],
+        noise: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        (n_samples x n_crops) suitability scores (0-100).
+
+        `noise` is added before clipping, like the scalar jitter; None scores
+        without it.
+        """
+        n = len(samples)
+        X = np.empty((n, len(RANGE_FIELDS)), dtype=np.float64)
+        for column, (_, field) in enumerate(RANGE_FIELDS):
+            X[:, column] = np.fromiter((sample[field] for sample in samples), dtype=np.float64, count=n)
+        soil = self._encode((sample['soil_type'] for sample in samples), self.soil_codes, n)
+        region = self._encode((sample['region'] for sample in samples), self.region_codes, n)
+
+        # One broadcast comparison: (n, 1, ranges) against (crops, ranges)
+        X = X[:, np.newaxis, :]
+        in_range = ((X >= self.lower) & (X <= self.upper)).sum(axis=2)
+        region_match = self.region_mask[region]
+        score = 2 * self.soil_mask[soil] + in_range + region_match
+        percentage = score / (8 + region_match) * 100
+        if noise is not None:
+            percentage = percentage + noise
+        return np.clip(percentage, 0, 100)
+
 
 class CropPredictor:
     """
@@ -126,6 +205,25 @@ class CropPredictor:
         }
     }
     
+    def __init__(self, jitter: bool = True, seed: Optional[int] = None):
+        """
+        Args:
+            jitter: Add the ±2 point random jitter to every score; without it
+                the same input always gets the same answer (cacheable)
+            seed: Seed a private random generator for reproducible jitter
+                (default: the shared `random` module)
+        """
+        self.jitter = jitter
+        self.random = random.Random(seed) if seed is not None else random
+        self._compiled: Optional[CompiledCropRules] = None
+
+    @property
+    def compiled(self) -> CompiledCropRules:
+        """CROP_REQUIREMENTS as arrays for batch scoring (built on first use)."""
+        if self._compiled is None:
+            self._compiled = CompiledCropRules(self.CROP_REQUIREMENTS)
+        return self._compiled
+
     def calculate_suitability_score(
         self,
         crop_name: str,
@@ -180,7 +278,7 @@ class CropPredictor:
         
         # Convert to percentage and add slight randomness for realism
         percentage = (score / max_score) * 100
-        randomness = random.uniform(-2, 2)
+        randomness = self.random.uniform(-2, 2) if self.jitter else 0
         return max(0, min(100, percentage + randomness))
     
     def predict(
@@ -230,6 +328,49 @@ class CropPredictor:
         ]
         
         return predicted_crop, confidence_score, alternative_crops
+    
+    def predict_batch(
+        self,
+        samples: Sequence[Dict[str, Any]]
+    ) -> List[Tuple[str, float, List[Dict[str, float]]]]:
+        """
+        Predict the best crop for many samples with one vectorized pass.
+        
+        Args:
+            samples: Sequence of dicts keyed like the predict arguments
+                (soil_type, n_level, p_level, k_level, temperature, humidity,
+                rainfall, ph_level, region)
+        
+        Returns:
+            List of (predicted_crop, confidence_score, alternative_crops),
+            one per sample. The jitter is drawn in the same order as calling
+            predict for each sample, so with the same seed the answers match.
+        """
+        if len(samples) == 0:
+            return []
+        
+        compiled = self.compiled
+        noise = None
+        if self.jitter:
+            # random.uniform(-2, 2) is -2 + 4 * random(), one draw per (sample, crop)
+            count = len(samples) * len(compiled.crops)
+            draw = self.random.random
+            noise = -2 + 4 * np.fromiter((draw() for _ in range(count)), dtype=np.float64, count=count)
+            noise = noise.reshape(len(samples), len(compiled.crops))
+        scores = np.round(compiled.scores(samples, noise), 1)
+        
+        # Highest score first; ties keep the CROP_REQUIREMENTS order, like sorted()
+        ranked = np.argsort(-scores, axis=1, kind='stable')[:, :4]
+        top = np.take_along_axis(scores, ranked, axis=1).tolist()
+        crops = compiled.crops
+        return [
+            (
+                crops[order[0]],
+                row[0],
+                [{"crop": crops[crop], "score": score} for crop, score in zip(order[1:], row[1:]) if score > 50]
+            )
+            for order, row in zip(ranked.tolist(), top)
+        ]
 
 
 # Global instance
@@ -257,3 +398,13 @@ def predict_crop(
         soil_type, n_level, p_level, k_level,
         temperature, humidity, rainfall, ph_level, region
     )
+
+
+def predict_crop_batch(samples: Sequence[Dict[str, Any]]) -> List[Tuple[str, float, List[Dict[str, float]]]]:
+    """
+    Batch version of predict_crop (samples keyed like its arguments).
+    
+    Returns:
+        List of (predicted_crop, confidence_score, alternative_crops) tuples
+    """
+    return crop_predictor.predict_batch(samples)
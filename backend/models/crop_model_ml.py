@@ -4,26 +4,89 @@ Uses trained RandomForest model for crop recommendations
 """
 import joblib
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 import os
 
-# Global model objects
-crop_model = None
-crop_scaler = None
-crop_features = None
+from .bundle import open_bundle
+from .compiled_forest import compile_bundle, compile_for_inference
+from .features import FeatureTemplate, Field
+from .handle import MODEL_DIR, ModelHandle, pickle_version
+from .parallelism import policy_for
+from .scoring import ClassIndex, score_classes
+from .spans import span
+
+# Active model version (see models/handle.py): the model, scaler, features,
+# inference engine, class index and feature template of one load, replaced
+# as a unit by activate()
+crop_handle = None
+
+# Inference parallelism policy (overrides the training-time n_jobs=-1)
+crop_policy = policy_for('crop')
+
+# Training column -> predict_crop argument
+# Expected order: ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+FEATURE_SPEC = {
+    'N': Field('n_level'),
+    'P': Field('p_level'),
+    'K': Field('k_level'),
+    'temperature': Field('temperature'),
+    'humidity': Field('humidity'),
+    'ph': Field('ph_level'),
+    'rainfall': Field('rainfall')
+}
+
+def build_handle() -> ModelHandle:
+    """Load the model files into a new handle without activating it"""
+    # Prefer the single-file bundle (memory-mapped, nothing to re-fold)
+    bundle = open_bundle(MODEL_DIR, 'crop')
+    if bundle is not None:
+        version, source = bundle.version, 'bundle'
+        model = crop_policy.apply(bundle.model)
+        scaler = bundle.scaler
+        features = bundle.features
+        engine = compile_bundle(bundle, 'crop')
+    else:
+        version, source = pickle_version('crop'), 'pickle'
+        model = crop_policy.apply(joblib.load(os.path.join(MODEL_DIR, 'crop_model.pkl')))
+        scaler = joblib.load(os.path.join(MODEL_DIR, 'crop_scaler.pkl'))
+        features = joblib.load(os.path.join(MODEL_DIR, 'crop_features.pkl'))
+        engine = compile_for_inference(model, scaler, 'crop')
+    
+    return ModelHandle(
+        'crop', version, source,
+        model=model,
+        scaler=scaler,
+        features=features,
+        engine=engine,
+        classes=ClassIndex(model.classes_),
+        template=FeatureTemplate(features, FEATURE_SPEC)
+    )
+
+def activate(handle: ModelHandle) -> None:
+    """Make a handle the active model version (one atomic assignment)"""
+    global crop_handle
+    crop_handle = handle
+
+def current_handle() -> Optional[ModelHandle]:
+    """Active model version, or None before the first load"""
+    return crop_handle
 
 def load_models():
     """Load trained models into memory"""
-    global crop_model, crop_scaler, crop_features
-    
-    model_dir = os.path.join(os.path.dirname(__file__), '..', 'trained_models')
-    
-    crop_model = joblib.load(os.path.join(model_dir, 'crop_model.pkl'))
-    crop_scaler = joblib.load(os.path.join(model_dir, 'crop_scaler.pkl'))
-    crop_features = joblib.load(os.path.join(model_dir, 'crop_features.pkl'))
-    
+    activate(build_handle())
     return True
 
+def _rank_crops(
+    probabilities: np.ndarray,
+    classes: ClassIndex,
+    top_k: int
+) -> List[Tuple[str, float, List[Dict[str, float]]]]:
+    """Turn a predict_proba matrix into (crop, confidence, alternatives) rows."""
+    return [
+        (crop, confidence, [{'crop': name, 'score': score} for name, score in ranked])
+        for crop, confidence, ranked in score_classes(probabilities, classes, top_k)
+    ]
+
 def predict_crop(
     n_level: int,
     p_level: int,
@@ -31,7 +94,8 @@ def predict_crop(
     temperature: float,
     humidity: float,
     ph_level: float,
-    rainfall: float
+    rainfall: float,
+    handle: Optional[ModelHandle] = None
 ) -> Tuple[str, float, List[Dict[str, float]]]:
     """
     Predict the most suitable crop using trained ML model.
@@ -44,53 +108,65 @@ def predict_crop(
         humidity: Relative humidity (%)
         ph_level: Soil pH level
         rainfall: Rainfall in mm
+        handle: Model version to use (default: the active one)
     
     Returns:
         Tuple of (predicted_crop, confidence, alternative_crops)
     """
-    global crop_model, crop_scaler, crop_features
-    
-    # Load models if not already loaded
-    if crop_model is None:
-        load_models()
-    
-    # Prepare input features in correct order
-    # Expected order: ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    features = {
-        'N': n_level,
-        'P': p_level,
-        'K': k_level,
-        'temperature': temperature,
-        'humidity': humidity,
-        'ph': ph_level,
-        'rainfall': rainfall
-    }
+    # Models are loaded at startup (models/loading.py), never inside a request
+    handle = handle or crop_handle
+    if handle is None:
+        raise RuntimeError("Crop model is not loaded")
     
     # Create feature array in the same order as training
-    X = np.array([[features[feat] for feat in crop_features]])
+    with span('crop', 'features'):
+        X = handle.template.row(
+            n_level=n_level, p_level=p_level, k_level=k_level,
+            temperature=temperature, humidity=humidity,
+            ph_level=ph_level, rainfall=rainfall
+        )
     
-    # Scale features
-    X_scaled = crop_scaler.transform(X)
+    # One forest pass gives the prediction (argmax), its confidence and the
+    # top 3 alternatives; the engine applies or has folded in the scaler
+    probabilities = handle.engine.predict_proba(X)
+    
+    with span('crop', 'postprocess'):
+        return _rank_crops(probabilities, handle.classes, top_k=4)[0]
+
+
+def predict_crop_batch(
+    samples: Sequence[Dict[str, float]],
+    top_k: int = 4,
+    handle: Optional[ModelHandle] = None
+) -> List[Tuple[str, float, List[Dict[str, float]]]]:
+    """
+    Predict the most suitable crop for many samples in one forest call.
     
-    # Get prediction and probabilities
-    predicted_crop = crop_model.predict(X_scaled)[0]
-    probabilities = crop_model.predict_proba(X_scaled)[0]
+    Args:
+        samples: Sequence of dicts keyed like the predict_crop arguments
+            (n_level, p_level, k_level, temperature, humidity, ph_level, rainfall)
+        top_k: Number of ranked crops per sample, including the prediction;
+            capped at the number of crops the model knows
+        handle: Model version to use (default: the active one)
     
-    # Get class names
-    classes = crop_model.classes_
+    Returns:
+        List of (predicted_crop, confidence, alternative_crops) tuples,
+        one per sample and in the same order
+    """
+    # Models are loaded at startup (models/loading.py), never inside a request
+    handle = handle or crop_handle
+    if handle is None:
+        raise RuntimeError("Crop model is not loaded")
     
-    # Get confidence for predicted crop
-    predicted_idx = np.where(classes == predicted_crop)[0][0]
-    confidence = float(probabilities[predicted_idx])
+    if len(samples) == 0:
+        return []
     
-    # Get top 3 alternative crops
-    top_indices = np.argsort(probabilities)[-4:][::-1]  # Top 4 (including predicted)
-    alternatives = []
+    # Build one (N x n_features) matrix in the training feature order
+    with span('crop', 'features'):
+        X = handle.template.matrix(samples)
     
-    for idx in top_indices[1:]:  # Skip first one (it's the prediction)
-        alternatives.append({
-            'crop': str(classes[idx]),
-            'score': float(probabilities[idx])  # Changed from 'probability' to 'score'
-        })
+    # Score every row with a single forest pass
+    probabilities = crop_policy.run(handle.engine.predict_proba, X)
     
-    return predicted_crop, confidence, alternatives
+    with span('crop', 'postprocess'):
+        return _rank_crops(probabilities, handle.classes, min(top_k, len(handle.classes)))
@@ -0,0 +1,95 @@
+"""
+Precompiled feature-vector templates.
+Each model's feature assembly (which request field goes to which training
+column, defaults for columns the API does not provide, categorical encodings)
+is resolved once at load time instead of on every request.
+"""
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+
+class Field:
+    """Numeric column taken from a request field, optionally transformed."""
+
+    def __init__(self, name: str, transform: Optional[Callable] = None):
+        self.name = name
+        self.transform = transform
+
+
+class Encoded:
+    """Categorical column taken from a request field through a LabelEncoder."""
+
+    def __init__(self, name: str, encoder: str, default: float = 0):
+        self.name = name
+        self.encoder = encoder
+        self.default = default
+
+
+class FeatureTemplate:
+    """
+    Builds feature rows in the training column order.
+
+    Constant columns are baked into a preallocated default vector, numeric
+    columns are written by slot index and categorical columns are looked up in
+    a plain dict (unknown labels get the default code, like the old
+    LabelEncoder try/except).
+    """
+
+    def __init__(
+        self,
+        features: Sequence[str],
+        spec: Mapping[str, Any],
+        encoders: Optional[Mapping[str, Any]] = None
+    ):
+        encoders = encoders or {}
+        self.features = list(features)
+        self.defaults = np.zeros(len(self.features), dtype=np.float64)
+        self.numeric = []
+        self.categorical = []
+
+        for slot, feat in enumerate(self.features):
+            entry = spec.get(feat, 0)
+            if isinstance(entry, Field):
+                self.numeric.append((slot, entry.name, entry.transform))
+            elif isinstance(entry, Encoded):
+                if entry.encoder in encoders:
+                    classes = encoders[entry.encoder].classes_.tolist()
+                    codes = {label: code for code, label in enumerate(classes)}
+                    self.categorical.append((slot, entry.name, codes, entry.default))
+                else:
+                    self.defaults[slot] = entry.default
+            else:
+                self.defaults[slot] = entry
+
+    @property
+    def fields(self) -> List[str]:
+        """Request fields the template reads."""
+        return [name for _, name, _ in self.numeric] + [name for _, name, _, _ in self.categorical]
+
+    def row(self, **fields) -> np.ndarray:
+        """Build a (1 x n_features) matrix for one request."""
+        x = self.defaults.copy()
+        for slot, name, transform in self.numeric:
+            value = fields[name]
+            x[slot] = value if transform is None else transform(value)
+        for slot, name, codes, default in self.categorical:
+            x[slot] = codes.get(fields[name], default)
+        return x[np.newaxis, :]
+
+    def matrix(self, samples: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Build an (N x n_features) matrix, one column at a time."""
+        n_rows = len(samples)
+        X = np.empty((n_rows, len(self.features)), dtype=np.float64)
+        X[:] = self.defaults
+        for slot, name, transform in self.numeric:
+            column = np.fromiter((sample[name] for sample in samples), dtype=np.float64, count=n_rows)
+            X[:, slot] = column if transform is None else transform(column)
+        for slot, name, codes, default in self.categorical:
+            lookup = codes.get
+            X[:, slot] = np.fromiter(
+                (lookup(sample[name], default) for sample in samples),
+                dtype=np.float64,
+                count=n_rows
+            )
+        return X
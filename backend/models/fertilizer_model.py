@@ -1,7 +1,139 @@
 """
 Fertilizer recommendation model using rule-based agricultural knowledge.
 """
-from typing import Dict, Tuple
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Notes appended for the soil pH and soil type, by note code (0 = none)
+PH_NOTES = (
+    "",
+    " Soil is acidic - consider lime application before fertilizer.",
+    " Soil is alkaline - use acidic fertilizers. Consider sulfur application."
+)
+SOIL_NOTES = (
+    "",
+    " Clay soil retains nutrients well - split applications recommended.",
+    " Sandy/Laterite soil - apply in smaller, frequent doses to prevent leaching."
+)
+ACIDIC, ALKALINE = 1, 2
+NUTRIENTS = ('n', 'p', 'k')
+
+
+def soil_note_code(soil_type: str) -> int:
+    """SOIL_NOTES entry for a soil type."""
+    if 'Clay' in soil_type:
+        return 1
+    if 'Sandy' in soil_type or 'Laterite' in soil_type:
+        return 2
+    return 0
+
+
+class CompiledFertilizerRules:
+    """
+    FERTILIZER_DATA as arrays indexed by crop code: the (n_crops x 3) target
+    NPK matrix and the base quantity vector, plus the per-crop strings
+    (fertilizer, its alkaline-soil substitute, timing, notes) used when
+    results are serialized.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, Any]]):
+        self.crops = list(data)
+        self.crop_codes = {crop: code for code, crop in enumerate(self.crops)}
+        self.target = np.array(
+            [[entry['target_npk'][nutrient] for nutrient in NUTRIENTS] for entry in data.values()],
+            dtype=np.float64
+        )
+        self.total_target = self.target[:, 0] + self.target[:, 1] + self.target[:, 2]
+        self.base_quantity = np.array([entry['quantity'] for entry in data.values()], dtype=np.float64)
+        self.timing = [entry['timing'] for entry in data.values()]
+        # fertilizer[crop][ph_note] and notes[crop][ph_note][soil_note]: every string a result can hold
+        self.fertilizer = [
+            (entry['fertilizer'], entry['fertilizer'], entry['fertilizer'].replace('Urea', 'Ammonium Sulfate'))
+            for entry in data.values()
+        ]
+        self.notes = [
+            [[entry['notes'] + ph_note + soil_note for soil_note in SOIL_NOTES] for ph_note in PH_NOTES]
+            for entry in data.values()
+        ]
+        self._soil_notes: Dict[str, int] = {}
+
+    def soil_notes(self, soil_types: Sequence[str]) -> np.ndarray:
+        """Soil note code per sample (substring rules evaluated once per distinct soil type)."""
+        cache = self._soil_notes
+        codes = np.empty(len(soil_types), dtype=np.int8)
+        for i, soil_type in enumerate(soil_types):
+            code = cache.get(soil_type)
+            if code is None:
+                code = soil_note_code(soil_type)
+                if len(cache) < 256:  # soil types come from requests; keep the cache bounded
+                    cache[soil_type] = code
+            codes[i] = code
+        return codes
+
+
+class FertilizerRecommendations(SequenceABC):
+    """
+    Batch recommendations kept as arrays: crop codes, the (n x 3) NPK deficit
+    matrix, quantities and pH/soil note codes. Indexing or iterating builds
+    the same dicts as FertilizerRecommender.recommend, one at a time.
+
+    `whole` marks the deficits recommend returns as int: the ones clipped to
+    0 and the ones computed from an int nutrient level.
+    """
+
+    def __init__(
+        self,
+        rules: CompiledFertilizerRules,
+        crop: np.ndarray,
+        deficit: np.ndarray,
+        quantity: np.ndarray,
+        ph_note: np.ndarray,
+        soil_note: np.ndarray,
+        whole: np.ndarray
+    ):
+        self.rules = rules
+        self.crop = crop
+        self.deficit = deficit
+        self.quantity = quantity
+        self.ph_note = ph_note
+        self.soil_note = soil_note
+        self.whole = whole
+
+    def __len__(self) -> int:
+        return len(self.crop)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._build(index)
+        return self._build(slice(index, index + 1 if index != -1 else None))[0]
+
+    def _build(self, rows: slice) -> List[Dict]:
+        fertilizer, timing, notes = self.rules.fertilizer, self.rules.timing, self.rules.notes
+        return [
+            {
+                'recommended_fertilizer': fertilizer[crop][ph_note],
+                'npk_ratio': {
+                    nutrient: int(value) if is_whole else value
+                    for nutrient, value, is_whole in zip(NUTRIENTS, npk, whole)
+                },
+                'quantity_per_hectare': quantity,
+                'application_timing': timing[crop],
+                'notes': notes[crop][ph_note][soil_note]
+            }
+            for crop, npk, whole, quantity, ph_note, soil_note in zip(
+                self.crop[rows].tolist(), self.deficit[rows].tolist(), self.whole[rows].tolist(),
+                self.quantity[rows].tolist(), self.ph_note[rows].tolist(), self.soil_note[rows].tolist()
+            )
+        ]
+
+    def to_list(self) -> List[Dict]:
+        """Every recommendation as a dict."""
+        return self._build(slice(None))
+
+    def __iter__(self):
+        return iter(self.to_list())
 
 
 class FertilizerRecommender:
@@ -84,6 +216,16 @@ class FertilizerRecommender:
         }
     }
     
+    def __init__(self):
+        self._compiled = None
+    
+    @property
+    def compiled(self) -> CompiledFertilizerRules:
+        """FERTILIZER_DATA as arrays for batch recommendations (built on first use)."""
+        if self._compiled is None:
+            self._compiled = CompiledFertilizerRules(self.FERTILIZER_DATA)
+        return self._compiled
+    
     def adjust_for_current_levels(
         self,
         target_npk: Dict[str, float],
@@ -111,11 +253,11 @@ class FertilizerRecommender:
         notes_addition = ""
         
         if soil_ph < 6.0:
-            notes_addition = " Soil is acidic - consider lime application before fertilizer."
+            notes_addition = PH_NOTES[ACIDIC]
             if 'DAP' in fertilizer:
                 fertilizer = fertilizer  # DAP is suitable for acidic soils
         elif soil_ph > 8.0:
-            notes_addition = " Soil is alkaline - use acidic fertilizers. Consider sulfur application."
+            notes_addition = PH_NOTES[ALKALINE]
             if 'Urea' in fertilizer:
                 fertilizer = fertilizer.replace('Urea', 'Ammonium Sulfate')
         
@@ -185,11 +327,7 @@ class FertilizerRecommender:
         )
         
         # Adjust notes for soil type
-        soil_note = ""
-        if 'Clay' in soil_type:
-            soil_note = " Clay soil retains nutrients well - split applications recommended."
-        elif 'Sandy' in soil_type or 'Laterite' in soil_type:
-            soil_note = " Sandy/Laterite soil - apply in smaller, frequent doses to prevent leaching."
+        soil_note = SOIL_NOTES[soil_note_code(soil_type)]
         
         return {
             'recommended_fertilizer': fertilizer,
@@ -198,6 +336,58 @@ class FertilizerRecommender:
             'application_timing': base_data['timing'],
             'notes': base_data['notes'] + ph_note + soil_note
         }
+    
+    def recommend_batch(self, samples: Sequence[Dict[str, Any]]) -> FertilizerRecommendations:
+        """
+        Recommend fertilizer for many fields in one vectorized pass.
+        
+        Args:
+            samples: Sequence of dicts keyed like the recommend arguments
+                (crop_type, current_n, current_p, current_k, soil_ph, soil_type)
+        
+        Returns:
+            FertilizerRecommendations: the results as arrays; indexing or
+            iterating gives the same dicts as recommend
+        """
+        rules = self.compiled
+        n = len(samples)
+        
+        crop_names = [sample['crop_type'] for sample in samples]
+        unknown = len(rules.crops)
+        crop = np.fromiter((rules.crop_codes.get(name, unknown) for name in crop_names), dtype=np.intp, count=n)
+        missing = np.flatnonzero(crop == unknown)
+        if missing.size:
+            raise ValueError(f"No fertilizer data available for {crop_names[missing[0]]}")
+        
+        current = np.empty((n, 3), dtype=np.float64)
+        integral = np.empty((n, 3), dtype=bool)
+        for column, nutrient in enumerate(NUTRIENTS):
+            field = f'current_{nutrient}'
+            current[:, column] = np.fromiter((sample[field] for sample in samples), dtype=np.float64, count=n)
+            integral[:, column] = np.fromiter(
+                (isinstance(sample[field], int) for sample in samples), dtype=bool, count=n
+            )
+        soil_ph = np.fromiter((sample['soil_ph'] for sample in samples), dtype=np.float64, count=n)
+        
+        # Deficit per nutrient, and the base quantity scaled by the share still needed
+        shortfall = rules.target[crop] - current
+        deficit = np.maximum(0, shortfall)
+        # Types as in recommend: max(0, target - level) is the int 0 when
+        # nothing is missing, and int - int stays int
+        whole = (shortfall <= 0) | integral
+        total_target = rules.total_target[crop]
+        needed = deficit[:, 0] + deficit[:, 1] + deficit[:, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            quantity = np.where(
+                total_target == 0,
+                rules.base_quantity[crop],
+                np.round(rules.base_quantity[crop] * (needed / total_target), 0)
+            )
+        
+        ph_note = np.where(soil_ph < 6.0, ACIDIC, np.where(soil_ph > 8.0, ALKALINE, 0)).astype(np.int8)
+        soil_note = rules.soil_notes([sample['soil_type'] for sample in samples])
+        
+        return FertilizerRecommendations(rules, crop, deficit, quantity, ph_note, soil_note, whole)
 
 
 # Global instance
@@ -221,3 +411,13 @@ def recommend_fertilizer(
     return fertilizer_recommender.recommend(
         crop_type, current_n, current_p, current_k, soil_ph, soil_type
     )
+
+
+def recommend_fertilizer_batch(samples: Sequence[Dict[str, Any]]) -> FertilizerRecommendations:
+    """
+    Batch version of recommend_fertilizer (samples keyed like its arguments).
+    
+    Returns:
+        FertilizerRecommendations (a sequence of recommendation dicts)
+    """
+    return fertilizer_recommender.recommend_batch(samples)
@@ -4,28 +4,96 @@ Uses trained RandomForest model for fertilizer recommendations
 """
 import joblib
 import numpy as np
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 import os
 
-# Global model objects
-fert_model = None
-fert_scaler = None
-fert_features = None
-fert_encoders = None
+from .bundle import open_bundle
+from .compiled_forest import compile_bundle, compile_for_inference
+from .features import Encoded, FeatureTemplate, Field
+from .handle import MODEL_DIR, ModelHandle, pickle_version
+from .parallelism import policy_for
+from .scoring import ClassIndex, score_classes
+from .spans import span
+
+# Active model version (see models/handle.py): the model, scaler, features,
+# encoders, inference engine, class index and feature template of one load,
+# replaced as a unit by activate()
+fert_handle = None
+
+# Training column -> request field, or the default used for every request.
+# Feature order from training: Temperature, Moisture, Rainfall, PH, Nitrogen,
+# Phosphorous, Potassium, Carbon, Soil, Crop, Remark
+FEATURE_SPEC = {
+    'Temperature': Field('temperature'),
+    'Moisture': Field('moisture'),
+    'Rainfall': 0,  # Default, not provided in API
+    'PH': 7.0,  # Default neutral pH
+    'Nitrogen': Field('n_level'),
+    'Phosphorous': Field('p_level'),
+    'Potassium': Field('k_level'),
+    'Carbon': 20,  # Default carbon level
+    'Soil': Encoded('soil_type', 'Soil'),
+    'Crop': Encoded('crop_type', 'Crop'),
+    'Remark': 0  # Default
+}
+
+# Inference parallelism policy (overrides the training-time n_jobs=-1)
+fert_policy = policy_for('fertilizer')
+
+def build_handle() -> ModelHandle:
+    """Load the model files into a new handle without activating it"""
+    # Prefer the single-file bundle (memory-mapped, nothing to re-fold)
+    bundle = open_bundle(MODEL_DIR, 'fertilizer')
+    if bundle is not None:
+        version, source = bundle.version, 'bundle'
+        model = fert_policy.apply(bundle.model)
+        scaler = bundle.scaler
+        features = bundle.features
+        encoders = bundle.encoders
+        engine = compile_bundle(bundle, 'fertilizer')
+    else:
+        version, source = pickle_version('fertilizer'), 'pickle'
+        model = fert_policy.apply(joblib.load(os.path.join(MODEL_DIR, 'fertilizer_model.pkl')))
+        scaler = joblib.load(os.path.join(MODEL_DIR, 'fertilizer_scaler.pkl'))
+        features = joblib.load(os.path.join(MODEL_DIR, 'fertilizer_features.pkl'))
+        encoders = joblib.load(os.path.join(MODEL_DIR, 'fertilizer_encoders.pkl'))
+        engine = compile_for_inference(model, scaler, 'fertilizer')
+    
+    return ModelHandle(
+        'fertilizer', version, source,
+        model=model,
+        scaler=scaler,
+        features=features,
+        encoders=encoders,
+        engine=engine,
+        classes=ClassIndex(model.classes_),
+        template=FeatureTemplate(features, FEATURE_SPEC, encoders)
+    )
+
+def activate(handle: ModelHandle) -> None:
+    """Make a handle the active model version (one atomic assignment)"""
+    global fert_handle
+    fert_handle = handle
+
+def current_handle() -> Optional[ModelHandle]:
+    """Active model version, or None before the first load"""
+    return fert_handle
 
 def load_models():
     """Load trained models into memory"""
-    global fert_model, fert_scaler, fert_features, fert_encoders
-    
-    model_dir = os.path.join(os.path.dirname(__file__), '..', 'trained_models')
-    
-    fert_model = joblib.load(os.path.join(model_dir, 'fertilizer_model.pkl'))
-    fert_scaler = joblib.load(os.path.join(model_dir, 'fertilizer_scaler.pkl'))
-    fert_features = joblib.load(os.path.join(model_dir, 'fertilizer_features.pkl'))
-    fert_encoders = joblib.load(os.path.join(model_dir, 'fertilizer_encoders.pkl'))
-    
+    activate(build_handle())
     return True
 
+def _application_rate(n_level: float, p_level: float, k_level: float) -> Tuple[float, str]:
+    """Calculate application rate based on NPK levels."""
+    total_npk = n_level + p_level + k_level
+    if total_npk < 100:
+        return 225.0, "High (200-250 kg/ha)"
+    elif total_npk < 200:
+        return 125.0, "Medium (100-150 kg/ha)"
+    else:
+        return 75.0, "Low (50-100 kg/ha)"
+
 def recommend_fertilizer(
     soil_type: str,
     crop_type: str,
@@ -34,95 +102,87 @@ def recommend_fertilizer(
     k_level: int,
     temperature: float,
     humidity: float,
-    moisture: float
+    moisture: float,
+    handle: Optional[ModelHandle] = None
 ) -> Dict[str, any]:
     """
     Recommend fertilizer using trained ML model.
     
+    Args:
+        handle: Model version to use (default: the active one)
+    
     Returns:
         Dictionary with fertilizer_name and application_rate
     """
-    global fert_model, fert_scaler, fert_features, fert_encoders
+    # Models are loaded at startup (models/loading.py), never inside a request
+    handle = handle or fert_handle
+    if handle is None:
+        raise RuntimeError("Fertilizer model is not loaded")
     
-    # Load models if not already loaded
-    if fert_model is None:
-        load_models()
+    # Create feature array from the precompiled template
+    with span('fertilizer', 'features'):
+        X = handle.template.row(
+            soil_type=soil_type, crop_type=crop_type, n_level=n_level,
+            p_level=p_level, k_level=k_level, temperature=temperature,
+            humidity=humidity, moisture=moisture
+        )
     
-    # Prepare features
-    # Feature order from training: Temperature, Moisture, Rainfall, PH, Nitrogen, Phosphorous, Potassium, Carbon, Soil, Crop, Remark
-    # We'll use what we have and fill missing with defaults
-    features_dict = {}
+    # One forest pass gives the prediction (argmax) and its confidence; the
+    # engine applies or has folded in the scaler
+    probabilities = handle.engine.predict_proba(X)
     
-    for feat in fert_features:
-        if feat == 'Temperature':
-            features_dict[feat] = temperature
-        elif feat == 'Moisture':
-            features_dict[feat] = moisture
-        elif feat == 'Rainfall':
-            features_dict[feat] = 0  # Default, not provided in API
-        elif feat == 'PH':
-            features_dict[feat] = 7.0  # Default neutral pH
-        elif feat == 'Nitrogen':
-            features_dict[feat] = n_level
-        elif feat == 'Phosphorous':
-            features_dict[feat] = p_level
-        elif feat == 'Potassium':
-            features_dict[feat] = k_level
-        elif feat == 'Carbon':
-            features_dict[feat] = 20  # Default carbon level
-        elif feat == 'Soil':
-            # Encode soil type
-            if 'Soil' in fert_encoders:
-                try:
-                    features_dict[feat] = fert_encoders['Soil'].transform([soil_type])[0]
-                except:
-                    features_dict[feat] = 0
-            else:
-                features_dict[feat] = 0
-        elif feat == 'Crop':
-            # Encode crop type
-            if 'Crop' in fert_encoders:
-                try:
-                    features_dict[feat] = fert_encoders['Crop'].transform([crop_type])[0]
-                except:
-                    features_dict[feat] = 0
-            else:
-                features_dict[feat] = 0
-        elif feat == 'Remark':
-            features_dict[feat] = 0  # Default
-        else:
-            features_dict[feat] = 0
+    with span('fertilizer', 'postprocess'):
+        fertilizer_name, confidence, _ = score_classes(probabilities, handle.classes)[0]
+        
+        # Calculate application rate based on NPK levels
+        application_rate, rate_description = _application_rate(n_level, p_level, k_level)
+        
+        return {
+            'fertilizer_name': fertilizer_name,
+            'application_rate': application_rate,
+            'rate_description': rate_description,
+            'confidence': confidence
+        }
+
+def recommend_fertilizer_batch(
+    samples: Sequence[Dict[str, any]],
+    handle: Optional[ModelHandle] = None
+) -> List[Dict[str, any]]:
+    """
+    Recommend fertilizer for many samples with a single forest call.
     
-    # Create feature array
-    X = np.array([[features_dict[feat] for feat in fert_features]])
+    Args:
+        samples: Sequence of dicts keyed like the recommend_fertilizer arguments
+        handle: Model version to use (default: the active one)
     
-    # Scale features
-    X_scaled = fert_scaler.transform(X)
+    Returns:
+        List of recommendation dicts, one per sample and in the same order
+    """
+    # Models are loaded at startup (models/loading.py), never inside a request
+    handle = handle or fert_handle
+    if handle is None:
+        raise RuntimeError("Fertilizer model is not loaded")
     
-    # Predict
-    fertilizer_name = fert_model.predict(X_scaled)[0]
+    if len(samples) == 0:
+        return []
     
-    # Get confidence
-    probabilities = fert_model.predict_proba(X_scaled)[0]
-    classes = fert_model.classes_
-    predicted_idx = np.where(classes == fertilizer_name)[0][0]
-    confidence = float(probabilities[predicted_idx])
+    with span('fertilizer', 'features'):
+        X = handle.template.matrix(samples)
     
-    # Calculate application rate based on NPK levels
-    total_npk = n_level + p_level + k_level
-    if total_npk < 100:
-        application_rate = 225.0  # High (200-250 kg/ha)
-        rate_description = "High (200-250 kg/ha)"
-    elif total_npk < 200:
-        application_rate = 125.0  # Medium (100-150 kg/ha)
-        rate_description = "Medium (100-150 kg/ha)"
-    else:
-        application_rate = 75.0   # Low (50-100 kg/ha)
-        rate_description = "Low (50-100 kg/ha)"
+    # predict() is the argmax of predict_proba, so one pass gives both
+    probabilities = fert_policy.run(handle.engine.predict_proba, X)
+    
+    with span('fertilizer', 'postprocess'):
+        results = []
+        for sample, (fertilizer_name, confidence, _) in zip(samples, score_classes(probabilities, handle.classes)):
+            application_rate, rate_description = _application_rate(
+                sample['n_level'], sample['p_level'], sample['k_level']
+            )
+            results.append({
+                'fertilizer_name': fertilizer_name,
+                'application_rate': application_rate,
+                'rate_description': rate_description,
+                'confidence': confidence
+            })
     
-    return {
-        'fertilizer_name': str(fertilizer_name),
-        'application_rate': application_rate,
-        'rate_description': rate_description,
-        'confidence': confidence
-    }
+    return results
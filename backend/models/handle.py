@@ -0,0 +1,92 @@
+"""
+Versioned model handles.
+A handle holds everything one loaded version of a model needs for inference.
+Reloading builds a complete new handle and swaps it in with a single
+assignment, so a prediction that picked up a handle keeps using that version
+to the end even if a newer one is activated meanwhile.
+"""
+import glob
+import hashlib
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .bundle import BUNDLE_FILES
+
+# Directory written by train_models.py
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'trained_models')
+
+
+class ModelHandle:
+    """One loaded version of a model (never modified after it is built)."""
+
+    __slots__ = (
+        'name', 'version', 'source', 'model', 'scaler', 'features',
+        'encoders', 'engine', 'classes', 'template', 'loaded_at'
+    )
+
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        source: str,
+        model: Any,
+        scaler: Any,
+        features: List[str],
+        engine: Any,
+        template: Any,
+        encoders: Optional[Dict[str, Any]] = None,
+        classes: Any = None
+    ):
+        self.name = name
+        self.version = version
+        self.source = source
+        self.model = model
+        self.scaler = scaler
+        self.features = features
+        self.encoders = encoders
+        self.engine = engine
+        self.classes = classes
+        self.template = template
+        self.loaded_at = time.time()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at
+        }
+
+
+def artifact_paths(name: str, model_dir: str = MODEL_DIR) -> List[str]:
+    """Existing files a model can be loaded from: its bundle and its pickles."""
+    paths = sorted(glob.glob(os.path.join(model_dir, f'{name}_*.pkl')))
+    bundle = os.path.join(model_dir, BUNDLE_FILES[name])
+    if os.path.exists(bundle):
+        paths.append(bundle)
+    return paths
+
+
+def artifact_signature(name: str, model_dir: str = MODEL_DIR) -> Tuple:
+    """(path, size, mtime) of every model file; changes whenever a file is rewritten."""
+    signature = []
+    for path in artifact_paths(name, model_dir):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def pickle_version(name: str, model_dir: str = MODEL_DIR) -> str:
+    """
+    Version string for a model loaded from pickles, in the bundle format
+    (newest file time + short digest of the file names, sizes and times).
+    """
+    signature = tuple(
+        entry for entry in artifact_signature(name, model_dir) if entry[0].endswith('.pkl')
+    )
+    newest = max((entry[2] for entry in signature), default=0) / 1e9
+    digest = hashlib.sha256(repr(signature).encode()).hexdigest()
+    return f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(newest))}-{digest[:12]}"
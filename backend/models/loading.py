@@ -0,0 +1,390 @@
+"""
+Model loading, readiness tracking and hot reload.
+Loads the crop, fertilizer and yield models concurrently (in the background
+when the API starts), smoke-tests each one with a few warm-up predictions and
+records per-model state so requests for a model that is not ready yet can be
+turned away immediately instead of waiting for it.
+
+Reloads build a complete new model handle next to the active one, validate it
+the same way and only then swap it in (models/handle.py), so the API keeps
+serving the old version until the new one is known to work.
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import config
+from . import crop_model_ml, fertilizer_model_ml, yield_model_ml
+from .handle import ModelHandle, artifact_signature
+
+logger = logging.getLogger(__name__)
+
+# Load states, in order
+PENDING = 'pending'
+LOADING = 'loading'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+# Rows in the batch warm-up call
+WARMUP_BATCH_SIZE = 8
+
+# Model name -> (module, single-row predict, batch predict, warm-up sample).
+# Each module provides build_handle(), activate(handle) and current_handle().
+MODELS: Dict[str, tuple] = {
+    'crop': (
+        crop_model_ml,
+        crop_model_ml.predict_crop,
+        crop_model_ml.predict_crop_batch,
+        {
+            'n_level': 80, 'p_level': 40, 'k_level': 50, 'temperature': 25.0,
+            'humidity': 70.0, 'ph_level': 7.0, 'rainfall': 100.0
+        }
+    ),
+    'fertilizer': (
+        fertilizer_model_ml,
+        fertilizer_model_ml.recommend_fertilizer,
+        fertilizer_model_ml.recommend_fertilizer_batch,
+        {
+            'soil_type': 'Loamy Soil', 'crop_type': 'Rice', 'n_level': 50, 'p_level': 30,
+            'k_level': 40, 'temperature': 25.0, 'humidity': 70.0, 'moisture': 50.0
+        }
+    ),
+    'yield': (
+        yield_model_ml,
+        yield_model_ml.estimate_yield,
+        yield_model_ml.estimate_yield_batch,
+        {
+            'crop_type': 'Rice, paddy', 'area_hectares': 1.0, 'season': 'Kharif',
+            'rainfall': 100.0, 'temperature': 25.0, 'fertilizer_used': 100.0
+        }
+    )
+}
+
+
+class ModelState:
+    """Load progress and reload history of one model."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        # Model files the active handle was built from
+        self.signature: tuple = ()
+        self.reloading = False
+        self.reloads = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        handle = current_handle(self.name)
+        return {
+            'state': self.state,
+            'version': handle.version if handle else None,
+            'source': handle.source if handle else None,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'loaded_at': self.loaded_at,
+            'error': self.error,
+            'reloading': self.reloading,
+            'reloads': self.reloads,
+            'last_reload': self.last_reload
+        }
+
+
+states: Dict[str, ModelState] = {name: ModelState(name) for name in MODELS}
+
+# Called as listener(name, handle) after a new handle is activated
+_swap_listeners: List[Callable[[str, ModelHandle], None]] = []
+
+_lock = threading.Lock()
+_futures: List[Future] = []
+_pools: List[ThreadPoolExecutor] = []
+_watcher: Optional[threading.Thread] = None
+_stop_watching = threading.Event()
+
+
+def current_handle(name: str) -> Optional[ModelHandle]:
+    """Active handle of a model, or None before it is loaded."""
+    return MODELS[name][0].current_handle()
+
+
+def active_versions() -> Dict[str, Optional[str]]:
+    """Version of every model's active handle (None if not loaded)."""
+    versions = {}
+    for name in MODELS:
+        handle = current_handle(name)
+        versions[name] = handle.version if handle else None
+    return versions
+
+
+def add_swap_listener(listener: Callable[[str, ModelHandle], None]) -> None:
+    """Register a callback run after a model version is swapped in."""
+    _swap_listeners.append(listener)
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - started, 4)
+
+
+def _finite(value: Any) -> bool:
+    """Whether every number inside a (nested) prediction result is finite."""
+    if isinstance(value, float):
+        return math.isfinite(value)
+    if isinstance(value, dict):
+        return all(_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_finite(item) for item in value)
+    return True
+
+
+def _smoke_test(name: str, handle: ModelHandle) -> None:
+    """
+    Send a single-row and a small batch prediction through a handle.
+
+    Doubles as warm-up. Raises if the outputs are not finite or the batch path
+    disagrees with the single-row path.
+    """
+    _, predict, predict_batch, sample = MODELS[name]
+    single = predict(**sample, handle=handle)
+    batch = predict_batch([sample] * WARMUP_BATCH_SIZE, handle=handle)
+    if not _finite(single):
+        raise ValueError(f"{name} model returned a non-finite prediction: {single}")
+    if len(batch) != WARMUP_BATCH_SIZE or any(row != single for row in batch):
+        raise ValueError(f"{name} model batch predictions differ from single-row predictions")
+
+
+def _activate(name: str, handle: ModelHandle, signature: tuple) -> None:
+    MODELS[name][0].activate(handle)
+    states[name].signature = signature
+    for listener in _swap_listeners:
+        try:
+            listener(name, handle)
+        except Exception as e:
+            logger.error(f"Model swap listener failed for {name}: {e}")
+
+
+def _load(name: str) -> bool:
+    state = states[name]
+    module = MODELS[name][0]
+    state.state = LOADING
+    state.error = None
+    try:
+        signature = artifact_signature(name)
+        started = time.perf_counter()
+        handle = module.build_handle()
+        state.load_seconds = round(time.perf_counter() - started, 4)
+        if config.WARMUP_ENABLED:
+            state.state = WARMING
+            state.warmup_seconds = _timed(lambda: _smoke_test(name, handle))
+        _activate(name, handle, signature)
+    except Exception as e:
+        state.state = FAILED
+        state.error = str(e)
+        logger.error(f"❌ Failed to load {name} model: {e}", exc_info=True)
+        return False
+
+    state.state = READY
+    state.loaded_at = time.time()
+    logger.info(
+        f"✅ {name} model ready, version {handle.version} (load {state.load_seconds:.2f}s, "
+        f"warm-up {state.warmup_seconds or 0:.3f}s)"
+    )
+    return True
+
+
+def _reload(name: str, force: bool = False) -> Dict[str, Any]:
+    """Build, validate and swap in a new version of one model; never raises."""
+    state = states[name]
+    previous = current_handle(name)
+    started = time.perf_counter()
+    result: Dict[str, Any] = {
+        'model': name,
+        'previous_version': previous.version if previous else None,
+        'started_at': time.time()
+    }
+    try:
+        signature = artifact_signature(name)
+        if not force and previous is not None and signature == state.signature:
+            result.update(status='unchanged', version=previous.version)
+        else:
+            handle = MODELS[name][0].build_handle()
+            _smoke_test(name, handle)
+            _activate(name, handle, signature)
+            state.state = READY
+            state.error = None
+            state.loaded_at = time.time()
+            state.reloads += 1
+            result.update(status='swapped', version=handle.version)
+            logger.info(
+                f"🔄 {name} model reloaded: {result['previous_version']} -> {handle.version}"
+            )
+    except Exception as e:
+        # Keep serving the active version
+        result.update(status='failed', version=result['previous_version'], error=str(e))
+        logger.error(f"❌ Reloading {name} model failed, keeping the active version: {e}", exc_info=True)
+    finally:
+        state.reloading = False
+
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    state.last_reload = result
+    return result
+
+
+def _submit(work: Dict[str, Callable[[], Any]]) -> Dict[str, Future]:
+    """Run each callable on its own background thread (caller holds _lock)."""
+    if not work:
+        return {}
+    pool = ThreadPoolExecutor(max_workers=len(work), thread_name_prefix='model-load')
+    futures = {name: pool.submit(fn) for name, fn in work.items()}
+    # Threads exit once their work is done; nothing else is queued
+    pool.shutdown(wait=False)
+    _futures.extend(futures.values())
+    _pools.append(pool)
+    return futures
+
+
+def start_loading(names: Optional[Iterable[str]] = None) -> List[Future]:
+    """
+    Start loading models on background threads, one thread per model.
+
+    Models that are already loading or ready are skipped. Returns the
+    futures of the loads started (each resolves to True on success).
+    """
+    names = list(names or MODELS)
+    with _lock:
+        names = [name for name in names if states[name].state in (PENDING, FAILED)]
+        for name in names:
+            states[name].state = LOADING
+        futures = _submit({name: (lambda name=name: _load(name)) for name in names})
+    return list(futures.values())
+
+
+def start_reload(names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Future]:
+    """
+    Reload models from their current files on background threads.
+
+    Models whose files have not changed since they were loaded are left
+    alone unless `force` is set; models that are already loading or reloading
+    are skipped. Each future resolves to the reload result dict.
+    """
+    names = list(names or MODELS)
+    with _lock:
+        names = [
+            name for name in names
+            if not states[name].reloading and states[name].state in (READY, FAILED)
+        ]
+        for name in names:
+            states[name].reloading = True
+        return _submit({name: (lambda name=name: _reload(name, force)) for name in names})
+
+
+def reload_models(names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Reload models and wait for the results (model name -> reload result)."""
+    futures = start_reload(names, force)
+    results = {name: future.result() for name, future in futures.items()}
+    wait_until_loaded()
+    return results
+
+
+def wait_until_loaded(timeout: Optional[float] = None) -> bool:
+    """Block until every started load or reload has finished; True if all models are ready."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for future in list(_futures):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            future.result(timeout=remaining)
+        except Exception:
+            return False
+    # Join the finished loader threads (serve.py forks right after this)
+    with _lock:
+        for pool in _pools:
+            pool.shutdown(wait=True)
+        _pools.clear()
+        _futures[:] = [future for future in _futures if not future.done()]
+    return all_ready()
+
+
+def load_all() -> bool:
+    """Load every model concurrently and wait for them; True if all are ready."""
+    start_loading()
+    return wait_until_loaded()
+
+
+def mark_preloaded() -> None:
+    """Mark models that were loaded outside this process (e.g. before fork) as ready."""
+    for name, state in states.items():
+        handle = current_handle(name)
+        if handle is not None and state.state != READY:
+            state.state = READY
+            state.loaded_at = handle.loaded_at
+            state.signature = artifact_signature(name)
+
+
+def _watch(interval: float) -> None:
+    """Reload a model once its files have changed and stayed unchanged for one interval."""
+    seen: Dict[str, tuple] = {}
+    attempted: Dict[str, tuple] = {}
+    while not _stop_watching.wait(interval):
+        for name, state in states.items():
+            signature = artifact_signature(name)
+            settled = signature == seen.get(name)
+            seen[name] = signature
+            if (
+                signature and settled and state.state in (READY, FAILED)
+                and signature != state.signature and signature != attempted.get(name)
+            ):
+                attempted[name] = signature
+                logger.info(f"👀 {name} model files changed, reloading")
+                start_reload([name])
+
+
+def start_watching(interval: Optional[float] = None) -> None:
+    """Start the background thread that reloads models when their files change."""
+    global _watcher
+    if _watcher is not None and _watcher.is_alive():
+        return
+    _stop_watching.clear()
+    _watcher = threading.Thread(
+        target=_watch,
+        args=(interval or config.MODEL_WATCH_INTERVAL,),
+        name='model-watch',
+        daemon=True
+    )
+    _watcher.start()
+
+
+def stop_watching() -> None:
+    _stop_watching.set()
+
+
+def is_ready(name: str) -> bool:
+    """Whether a model can serve requests."""
+    return states[name].state == READY
+
+
+def all_ready() -> bool:
+    return all(state.state == READY for state in states.values())
+
+
+def not_ready_reason(name: str) -> str:
+    """Short explanation for a request that reached a model that is not ready."""
+    state = states[name]
+    if state.state == FAILED:
+        return f"{name} model failed to load: {state.error}"
+    return f"{name} model is {state.state}, retry shortly"
+
+
+def readiness() -> Dict[str, Any]:
+    """Overall readiness plus load state, version and timings of every model."""
+    return {
+        'ready': all_ready(),
+        'models': {name: state.as_dict() for name, state in states.items()}
+    }
@@ -0,0 +1,87 @@
+"""
+Inference-time parallelism policy for the trained forests.
+train_models.py fits every RandomForest with n_jobs=-1, which would otherwise make
+even a single-row predict fan out joblib work across every core.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+import config
+
+# Shared pool for row-chunked parallel inference (created on first use)
+_chunk_pool: Optional[ThreadPoolExecutor] = None
+_thread_limits = None
+
+
+def limit_native_threads() -> None:
+    """Cap BLAS/OpenMP thread pools once per process."""
+    global _thread_limits
+    if _thread_limits is None:
+        _thread_limits = threadpool_limits(limits=config.NATIVE_THREADS)
+
+
+def _get_chunk_pool() -> ThreadPoolExecutor:
+    global _chunk_pool
+    if _chunk_pool is None:
+        _chunk_pool = ThreadPoolExecutor(
+            max_workers=config.MAX_PARALLEL_JOBS,
+            thread_name_prefix='forest-chunk'
+        )
+    return _chunk_pool
+
+
+class ParallelismPolicy:
+    """
+    Decide how one model runs a batch.
+
+    The forest itself is always pinned to n_jobs=1, so small batches walk the
+    trees serially on the calling thread with no joblib dispatch. Batches of at
+    least `min_parallel_rows` rows are split into `n_jobs` row chunks scored
+    concurrently (tree traversal releases the GIL). Rows are independent, so
+    both paths return identical results.
+    """
+
+    def __init__(self, name: str, n_jobs: int, min_parallel_rows: int):
+        self.name = name
+        self.n_jobs = max(1, min(n_jobs, config.MAX_PARALLEL_JOBS))
+        self.min_parallel_rows = max(1, min_parallel_rows)
+
+    def apply(self, model):
+        """Override the training-time n_jobs on a freshly loaded model."""
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = 1
+        limit_native_threads()
+        return model
+
+    def is_parallel(self, n_rows: int) -> bool:
+        """Whether a batch of n_rows takes the parallel path."""
+        return self.n_jobs > 1 and n_rows >= self.min_parallel_rows
+
+    def run(self, predict_fn: Callable[[np.ndarray], np.ndarray], X: np.ndarray) -> np.ndarray:
+        """
+        Call predict_fn on X, serially or over parallel row chunks.
+
+        Chunks report their spans to the caller's request trace, so a parallel
+        stage shows the time summed over its chunks.
+        """
+        if not self.is_parallel(X.shape[0]):
+            return predict_fn(X)
+        chunks = np.array_split(X, min(self.n_jobs, X.shape[0]))
+        # One copy of the caller's context per chunk: a context can only be
+        # entered by one thread at a time
+        pool = _get_chunk_pool()
+        futures = [pool.submit(contextvars.copy_context().run, predict_fn, chunk) for chunk in chunks]
+        return np.concatenate([future.result() for future in futures])
+
+
+def policy_for(name: str) -> ParallelismPolicy:
+    """Build the configured policy for one model ('crop', 'fertilizer' or 'yield')."""
+    return ParallelismPolicy(
+        name,
+        n_jobs=config.MODEL_N_JOBS[name],
+        min_parallel_rows=config.PARALLEL_MIN_ROWS
+    )
@@ -0,0 +1,74 @@
+"""
+Shared scoring core for the forest classifiers.
+Turns one predict_proba matrix into the predicted class, its confidence and the
+ranked runner-up classes, so the trees are walked once per request.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+class ClassIndex:
+    """Precomputed class names (as plain str) and their column positions."""
+
+    def __init__(self, classes: Sequence):
+        self.names = [str(name) for name in classes]
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def top_k(probabilities: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the k most probable classes per row, best first.
+
+    Same result as a stable descending argsort cut to k columns (ties go to
+    the lower class index, as with predict()), but only the k winners are
+    selected with argpartition and sorted. Rows where a tie straddles the cut
+    fall back to the full stable sort.
+    """
+    n_classes = probabilities.shape[1]
+    k = max(1, min(k, n_classes))
+    neg = -probabilities
+    if k == n_classes:
+        return np.argsort(neg, axis=1, kind='stable')
+
+    # Positions < k hold the winners, position k the best of the rest
+    part = np.argpartition(neg, k, axis=1)
+    head = part[:, :k]
+    head_vals = np.take_along_axis(neg, head, axis=1)
+    ranked = np.take_along_axis(head, np.lexsort((head, head_vals), axis=1), axis=1)
+
+    last_kept = np.take_along_axis(neg, ranked[:, -1:], axis=1)[:, 0]
+    next_best = np.take_along_axis(neg, part[:, k:k + 1], axis=1)[:, 0]
+    ties = next_best == last_kept
+    if ties.any():
+        ranked[ties] = np.argsort(neg[ties], axis=1, kind='stable')[:, :k]
+    return ranked
+
+
+def score_classes(
+    probabilities: np.ndarray,
+    classes: ClassIndex,
+    k: int = 1
+) -> List[Tuple[str, float, List[Tuple[str, float]]]]:
+    """
+    Rank classes for every row of a predict_proba matrix.
+
+    Returns:
+        One (predicted_class, confidence, [(class, score), ...]) tuple per row,
+        with up to k - 1 runner-up classes. The prediction is the argmax, so it
+        always agrees with predict().
+    """
+    ranked = top_k(probabilities, k)
+    scores = np.take_along_axis(probabilities, ranked, axis=1)
+    names = classes.names
+
+    results = []
+    for row_indices, row_scores in zip(ranked.tolist(), scores.tolist()):
+        alternatives = [
+            (names[idx], score) for idx, score in zip(row_indices[1:], row_scores[1:])
+        ]
+        results.append((names[row_indices[0]], row_scores[0], alternatives))
+    return results
@@ -0,0 +1,116 @@
+"""
+Copy-on-write friendly model memory for pre-forked workers.
+After the master process loads the models (see serve.py), the compiled forest
+arrays are moved into one shared, read-only mapping and the Python heap is
+frozen, so forked workers reuse the master's pages instead of copying them.
+"""
+import gc
+import logging
+import mmap
+from typing import Dict, Iterable
+
+import numpy as np
+
+from .compiled_forest import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = mmap.PAGESIZE
+
+# CompiledForest attributes holding node arrays
+_FOREST_ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+def _page_align(offset: int) -> int:
+    return -(-offset // PAGE_SIZE) * PAGE_SIZE
+
+
+def is_mapped(array: np.ndarray) -> bool:
+    """Whether the array's memory comes from an mmap (a bundle file or a shared arena)."""
+    base = array
+    while base is not None:
+        if isinstance(base, mmap.mmap):
+            return True
+        # np.frombuffer keeps the exporting object behind a memoryview
+        base = base.obj if isinstance(base, memoryview) else getattr(base, 'base', None)
+    return False
+
+
+def pack_shared(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Copy arrays into one anonymous shared mapping and return read-only views.
+
+    Each array starts on its own page, away from any Python object header, so
+    reference counting and garbage collection in a forked worker never write
+    to (and so never copy) a page holding model data.
+    """
+    layout = {}
+    size = 0
+    for key, array in arrays.items():
+        layout[key] = size
+        size = _page_align(size + array.nbytes)
+
+    arena = mmap.mmap(-1, max(size, PAGE_SIZE))
+    packed = {}
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        view = np.frombuffer(arena, dtype=array.dtype, count=array.size, offset=layout[key])
+        view = view.reshape(array.shape)
+        view[...] = array
+        view.flags.writeable = False
+        packed[key] = view
+    return packed
+
+
+def _forests(engine) -> Iterable[CompiledForest]:
+    """CompiledForest objects behind an inference engine (folded or wrapped)."""
+    for candidate in (engine, getattr(engine, 'model', None)):
+        if isinstance(candidate, CompiledForest):
+            yield candidate
+
+
+def share_engine(engine) -> int:
+    """
+    Move a compiled engine's heap-allocated node arrays into a shared mapping.
+
+    Arrays that are already memory-mapped (loaded from a bundle) are left as
+    they are; they are file-backed and shared between processes anyway.
+
+    Returns:
+        Bytes moved
+    """
+    moved = 0
+    for forest in _forests(engine):
+        heap = {
+            key: getattr(forest, key) for key in _FOREST_ARRAYS
+            if not is_mapped(getattr(forest, key))
+        }
+        if not heap:
+            continue
+        for key, view in pack_shared(heap).items():
+            setattr(forest, key, view)
+        moved += sum(array.nbytes for array in heap.values())
+    return moved
+
+
+def prepare_for_fork() -> None:
+    """
+    Make the loaded models safe to share with forked workers.
+
+    Packs compiled forest arrays into shared memory, then collects garbage and
+    freezes every surviving object (gc.freeze) so later collections in the
+    workers do not write to the master's object pages.
+    """
+    from . import crop_model_ml, fertilizer_model_ml, yield_model_ml
+
+    moved = 0
+    for handle in (crop_model_ml.crop_handle, fertilizer_model_ml.fert_handle, yield_model_ml.yield_handle):
+        if handle is not None:
+            moved += share_engine(handle.engine)
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Prepared models for fork: {moved / 2 ** 20:.1f} MB packed into shared memory, "
+        f"{gc.get_freeze_count()} objects frozen"
+    )
@@ -0,0 +1,52 @@
+"""
+Timing hooks for the stages of a model call.
+The prediction functions and inference engines wrap each stage (feature
+assembly, scaling, forest inference, post-processing) in a span; whoever wants
+the timings (Prometheus metrics, request tracing) registers an observer.
+
+With no observer registered a span costs one list check, so the hooks stay in
+the hot path unconditionally.
+"""
+import time
+from typing import Callable, List, Optional
+
+# Called with (model, stage, seconds) when a span finishes
+_observers: List[Callable[[str, str, float], None]] = []
+
+
+def add_observer(fn: Callable[[str, str, float], None]) -> None:
+    """Receive (model, stage, seconds) for every finished span."""
+    _observers.append(fn)
+
+
+def remove_observer(fn: Callable[[str, str, float], None]) -> None:
+    if fn in _observers:
+        _observers.remove(fn)
+
+
+class span:
+    """
+    Time one stage of a model call: `with span('crop', 'features'): ...`
+
+    Spans without a model name are not reported; engines nested inside another
+    engine are unnamed so their work is not counted twice.
+    """
+
+    __slots__ = ('model', 'stage', 'started')
+
+    def __init__(self, model: Optional[str], stage: str):
+        self.model = model
+        self.stage = stage
+        self.started = None
+
+    def __enter__(self) -> 'span':
+        if _observers and self.model:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        if self.started is not None:
+            elapsed = time.perf_counter() - self.started
+            for observer in _observers:
+                observer(self.model, self.stage, elapsed)
+        return False
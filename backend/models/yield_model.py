@@ -1,9 +1,159 @@
 """
 Yield estimation model using rule-based calculations.
 """
-from typing import Dict, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 import random
 
+import numpy as np
+
+_INF = float('inf')
+
+
+def _above(value: float) -> float:
+    """Smallest float greater than `value`: `x > value` as an inclusive lower bound."""
+    return float(np.nextafter(value, _INF))
+
+
+# Crop-group rules of YieldEstimator.calculate_climate_factor as tables:
+# crop -> (good_low, good_high, bonus, bad_low, bad_high, penalty). The bonus
+# applies inside [good_low, good_high]; otherwise the penalty applies below
+# bad_low or above bad_high. Crops not listed are unaffected.
+_WARM = (22, 30, 0.1, 18, 35, -0.2)
+_COOL = (18, 25, 0.1, 12, 30, -0.2)
+TEMPERATURE_RULES = {
+    'Rice': _WARM, 'Maize': _WARM, 'Sugarcane': _WARM,
+    'Wheat': _COOL, 'Chickpea': _COOL, 'Lentil': _COOL
+}
+HUMIDITY_RULES = {
+    'Rice': (_above(70), _INF, 0.05, -_INF, _INF, 0.0),
+    'Wheat': (50, 70, 0.05, -_INF, _INF, 0.0),
+    'Chickpea': (50, 70, 0.05, -_INF, _INF, 0.0)
+}
+RAINFALL_RULES = {
+    'Rice': (_above(100), _INF, 0.1, 80, _INF, -0.15),
+    'Wheat': (60, 100, 0.1, 40, 150, -0.1),
+    'Maize': (60, 100, 0.1, 40, 150, -0.1)
+}
+
+# calculate_soil_factor: soil type bonus and the pH rule (same for every crop)
+SOIL_BONUS = {
+    'Alluvial Soil': 0.1, 'Black Soil': 0.1,
+    'Laterite Soil': 0.05, 'Red Soil': 0.05
+}
+PH_RULE = (6.0, 7.5, 0.05, 5.5, 8.5, -0.1)
+
+
+def _round1(values: np.ndarray) -> np.ndarray:
+    """
+    Round to one decimal exactly like round(value, 1).
+
+    np.round scales by 10 first, which can land on the other side of a tie;
+    the few values that close to one are rounded by Python.
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    close = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(close):
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+
+class CompiledYieldRules:
+    """
+    YieldEstimator's tables and if/elif rules as arrays indexed by crop,
+    season, soil and region code, for estimating many samples at once.
+
+    Adjustments are added in the same order as the scalar methods, so the
+    factors are bit-for-bit the same.
+    """
+
+    def __init__(self, estimator: 'YieldEstimator'):
+        self.crops = list(estimator.BASE_YIELDS)
+        self.crop_codes = {crop: code for code, crop in enumerate(self.crops)}
+        self.base = np.array([estimator.BASE_YIELDS[crop] for crop in self.crops], dtype=np.float64)
+        self.temperature = self._rule_table(TEMPERATURE_RULES)
+        self.humidity = self._rule_table(HUMIDITY_RULES)
+        self.rainfall = self._rule_table(RAINFALL_RULES)
+        self.seasons, self.seasonal = self._lookup(estimator.SEASONAL_FACTORS, 1.0)
+        self.soils, self.soil_bonus = self._lookup(SOIL_BONUS, 0.0)
+        self.regions, self.regional = self._lookup(estimator.REGIONAL_FACTORS, 0.85)
+
+    def _rule_table(self, rules: Dict[str, Tuple[float, ...]]) -> np.ndarray:
+        """(n_crops x 6) rule rows; crops without a rule never match."""
+        none = (_INF, -_INF, 0.0, -_INF, _INF, 0.0)
+        return np.array([rules.get(crop, none) for crop in self.crops], dtype=np.float64)
+
+    @staticmethod
+    def _lookup(values: Dict[str, float], default: float) -> Tuple[Dict[str, int], np.ndarray]:
+        """Codes for the known keys and their values; the last entry is the default."""
+        codes = {key: code for code, key in enumerate(values)}
+        return codes, np.array(list(values.values()) + [default], dtype=np.float64)
+
+    @staticmethod
+    def _adjust(x: np.ndarray, rule: np.ndarray) -> np.ndarray:
+        """Bonus inside the good range, else penalty outside the bad range, else 0."""
+        good_low, good_high, bonus, bad_low, bad_high, penalty = rule.T if rule.ndim > 1 else rule
+        good = (x >= good_low) & (x <= good_high)
+        bad = (x < bad_low) | (x > bad_high)
+        return np.where(good, bonus, np.where(bad, penalty, 0.0))
+
+    @staticmethod
+    def _column(samples: Sequence[Dict[str, Any]], field: str, default: Any = None) -> List[Any]:
+        if default is None:
+            return [sample[field] for sample in samples]
+        return [sample.get(field, default) for sample in samples]
+
+    @staticmethod
+    def _codes(values: List[str], codes: Dict[str, int]) -> np.ndarray:
+        unknown = len(codes)
+        return np.fromiter((codes.get(value, unknown) for value in values), dtype=np.intp, count=len(values))
+
+    def factors(self, samples: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Base yield and climate, soil, seasonal and regional factors per sample.
+
+        Raises ValueError for crops without yield data, like estimate.
+        """
+        n = len(samples)
+
+        def numbers(field):
+            return np.fromiter((sample[field] for sample in samples), dtype=np.float64, count=n)
+
+        crop_names = self._column(samples, 'crop_type')
+        crop = self._codes(crop_names, self.crop_codes)
+        unknown = crop == len(self.crops)
+        if unknown.any():
+            raise ValueError(f"No yield data available for {crop_names[int(np.flatnonzero(unknown)[0])]}")
+
+        # Climate: temperature, humidity, rainfall adjustments, in that order
+        climate = np.full(n, 1.0)
+        climate += self._adjust(numbers('temperature'), self.temperature[crop])
+        climate += self._adjust(numbers('humidity'), self.humidity[crop])
+        climate += self._adjust(numbers('rainfall'), self.rainfall[crop])
+        climate = np.clip(climate, 0.5, 1.2)
+
+        # Soil: type, pH, then the NPK adequacy share
+        soil = np.full(n, 1.0)
+        soil += self.soil_bonus[self._codes(self._column(samples, 'soil_type'), self.soils)]
+        soil += self._adjust(numbers('soil_ph'), np.array(PH_RULE))
+        npk_score = (
+            (numbers('n_level') >= 60).astype(np.int64)
+            + (numbers('p_level') >= 30)
+            + (numbers('k_level') >= 40)
+        )
+        soil += (npk_score / 3) * 0.15
+        soil = np.clip(soil, 0.6, 1.2)
+
+        return {
+            'base': self.base[crop],
+            'climate': climate,
+            'soil': soil,
+            'seasonal': self.seasonal[self._codes(self._column(samples, 'season'), self.seasons)],
+            'regional': self.regional[
+                self._codes(self._column(samples, 'region', 'Central India'), self.regions)
+            ]
+        }
+
 
 class YieldEstimator:
     """
@@ -41,6 +191,25 @@ class YieldEstimator:
         'Zaid': 0.85     # Summer season
     }
     
+    def __init__(self, jitter: bool = True, seed: Optional[int] = None):
+        """
+        Args:
+            jitter: Scale every estimate by a random factor in [0.95, 1.05];
+                without it the same input always gets the same answer
+            seed: Seed a private random generator for reproducible jitter
+                (default: the shared `random` module)
+        """
+        self.jitter = jitter
+        self.random = random.Random(seed) if seed is not None else random
+        self._compiled: Optional[CompiledYieldRules] = None
+
+    @property
+    def compiled(self) -> CompiledYieldRules:
+        """The rules as lookup tables for batch estimates (built on first use)."""
+        if self._compiled is None:
+            self._compiled = CompiledYieldRules(self)
+        return self._compiled
+
     def calculate_climate_factor(
         self,
         crop_type: str,
@@ -193,7 +362,7 @@ class YieldEstimator:
         estimated_yield = base_yield * climate_factor * soil_factor * seasonal_factor
         
         # Add slight randomness for realism
-        randomness = random.uniform(0.95, 1.05)
+        randomness = self.random.uniform(0.95, 1.05) if self.jitter else 1.0
         estimated_yield = round(estimated_yield * randomness, 1)
         
         # Calculate confidence interval
@@ -214,6 +383,58 @@ class YieldEstimator:
             'regional_average': regional_average,
             'optimal_yield': optimal_yield
         }
+    
+    def estimate_batch(self, samples: Sequence[Dict[str, Any]]) -> List[Dict]:
+        """
+        Estimate yields for many samples with whole-array arithmetic.
+        
+        Args:
+            samples: Sequence of dicts keyed like the estimate arguments
+                (region is optional and defaults to 'Central India')
+        
+        Returns:
+            List of estimation dicts as returned by estimate, one per sample.
+            The jitter is drawn in the same order as calling estimate for
+            each sample, so with the same seed the results are identical.
+        """
+        if len(samples) == 0:
+            return []
+        
+        factors = self.compiled.factors(samples)
+        base, climate, soil = factors['base'], factors['climate'], factors['soil']
+        seasonal = factors['seasonal']
+        
+        estimated = base * climate * soil * seasonal
+        if self.jitter:
+            # random.uniform(0.95, 1.05) is 0.95 + (1.05 - 0.95) * random()
+            draw = self.random.random
+            randomness = 0.95 + (1.05 - 0.95) * np.fromiter(
+                (draw() for _ in range(len(samples))), dtype=np.float64, count=len(samples)
+            )
+            estimated = estimated * randomness
+        estimated = _round1(estimated)
+        
+        # Confidence interval: the margin shrinks as conditions improve
+        avg_factor = (climate + soil) / 2
+        margin = estimated * np.where(avg_factor > 1.1, 0.08, np.where(avg_factor > 0.95, 0.12, 0.18))
+        lower = _round1(estimated - margin)
+        upper = _round1(estimated + margin)
+        
+        regional_average = _round1(base * factors['regional'] * seasonal)
+        optimal = _round1(base * 1.15 * seasonal)
+        
+        return [
+            {
+                'estimated_yield': value,
+                'confidence_interval': {'lower': low, 'upper': high},
+                'regional_average': regional_value,
+                'optimal_yield': optimal_value
+            }
+            for value, low, high, regional_value, optimal_value in zip(
+                estimated.tolist(), lower.tolist(), upper.tolist(),
+                regional_average.tolist(), optimal.tolist()
+            )
+        ]
 
 
 # Global instance
@@ -242,3 +463,13 @@ def estimate_yield(
         crop_type, season, temperature, humidity, rainfall,
         soil_type, soil_ph, n_level, p_level, k_level
     )
+
+
+def estimate_yield_batch(samples: Sequence[Dict[str, Any]]) -> List[Dict]:
+    """
+    Batch version of estimate_yield (samples keyed like its arguments).
+    
+    Returns:
+        List of yield estimation dicts
+    """
+    return yield_estimator.estimate_batch(samples)
@@ -4,25 +4,76 @@ Uses trained RandomForest regressor for yield predictions
 """
 import joblib
 import numpy as np
+from typing import Dict, List, Optional, Sequence
 import os
 
-# Global model objects
-yield_model = None
-yield_scaler = None
-yield_features = None
-yield_encoders = None
+from .bundle import open_bundle
+from .compiled_forest import compile_bundle, compile_for_inference
+from .features import Encoded, FeatureTemplate, Field
+from .handle import MODEL_DIR, ModelHandle, pickle_version
+from .parallelism import policy_for
+from .spans import span
+
+# Active model version (see models/handle.py): the model, scaler, features,
+# encoders, inference engine and feature template of one load, replaced as a
+# unit by activate()
+yield_handle = None
+
+# Training column -> request field, or the default used for every request
+# (columns not listed, such as the 'Unnamed: 0' index column, default to 0)
+FEATURE_SPEC = {
+    'Area': Field('area_hectares'),
+    'Item': Encoded('crop_type', 'Item'),
+    'Year': 2025,  # Current year
+    'average_rain_fall_mm_per_year': Field('rainfall', lambda v: v * 10),  # Convert to yearly estimate
+    'pesticides_tonnes': Field('fertilizer_used', lambda v: v / 100),  # Rough conversion
+    'avg_temp': Field('temperature')
+}
+
+# Inference parallelism policy (overrides the training-time n_jobs=-1)
+yield_policy = policy_for('yield')
+
+def build_handle() -> ModelHandle:
+    """Load the model files into a new handle without activating it"""
+    # Prefer the single-file bundle (memory-mapped, nothing to re-fold)
+    bundle = open_bundle(MODEL_DIR, 'yield')
+    if bundle is not None:
+        version, source = bundle.version, 'bundle'
+        model = yield_policy.apply(bundle.model)
+        scaler = bundle.scaler
+        features = bundle.features
+        encoders = bundle.encoders
+        engine = compile_bundle(bundle, 'yield')
+    else:
+        version, source = pickle_version('yield'), 'pickle'
+        model = yield_policy.apply(joblib.load(os.path.join(MODEL_DIR, 'yield_model.pkl')))
+        scaler = joblib.load(os.path.join(MODEL_DIR, 'yield_scaler.pkl'))
+        features = joblib.load(os.path.join(MODEL_DIR, 'yield_features.pkl'))
+        encoders = joblib.load(os.path.join(MODEL_DIR, 'yield_encoders.pkl'))
+        engine = compile_for_inference(model, scaler, 'yield')
+    
+    return ModelHandle(
+        'yield', version, source,
+        model=model,
+        scaler=scaler,
+        features=features,
+        encoders=encoders,
+        engine=engine,
+        template=FeatureTemplate(features, FEATURE_SPEC, encoders)
+    )
+
+def activate(handle: ModelHandle) -> None:
+    """Make a handle the active model version (one atomic assignment)"""
+    global yield_handle
+    yield_handle = handle
+
+def current_handle() -> Optional[ModelHandle]:
+    """Active model version, or None before the first load"""
+    return yield_handle
 
 def load_models():
     """Load trained models into memory"""
-    global yield_model, yield_scaler, yield_features, yield_encoders
-    
-    model_dir = os.path.join(os.path.dirname(__file__), '..', 'trained_models')
-    
-    yield_model = joblib.load(os.path.join(model_dir, 'yield_model.pkl'))
-    yield_scaler = joblib.load(os.path.join(model_dir, 'yield_scaler.pkl'))
-    yield_features = joblib.load(os.path.join(model_dir, 'yield_features.pkl'))
-    yield_encoders = joblib.load(os.path.join(model_dir, 'yield_encoders.pkl'))
-    
+    activate(build_handle())
     return True
 
 def estimate_yield(
@@ -31,60 +82,66 @@ def estimate_yield(
     season: str,
     rainfall: float,
     temperature: float,
-    fertilizer_used: float
+    fertilizer_used: float,
+    handle: Optional[ModelHandle] = None
 ) -> float:
     """
     Estimate crop yield using trained ML model.
     
+    Args:
+        handle: Model version to use (default: the active one)
+    
     Returns:
         Estimated yield in kg/ha
     """
-    global yield_model, yield_scaler, yield_features, yield_encoders
-    
-    # Load models if not already loaded
-    if yield_model is None:
-        load_models()
-    
-    # Prepare features
-    # Feature order from training varies, use what we have
-    features_dict = {}
+    # Models are loaded at startup (models/loading.py), never inside a request
+    handle = handle or yield_handle
+    if handle is None:
+        raise RuntimeError("Yield model is not loaded")
     
-    for feat in yield_features:
-        if feat == 'Area':
-            features_dict[feat] = area_hectares
-        elif feat == 'Item':
-            # Encode crop type
-            if 'Item' in yield_encoders:
-                try:
-                    features_dict[feat] = yield_encoders['Item'].transform([crop_type])[0]
-                except:
-                    features_dict[feat] = 0
-            else:
-                features_dict[feat] = 0
-        elif feat == 'Year':
-            features_dict[feat] = 2025  # Current year
-        elif feat == 'average_rain_fall_mm_per_year':
-            features_dict[feat] = rainfall * 10  # Convert to yearly estimate
-        elif feat == 'pesticides_tonnes':
-            features_dict[feat] = fertilizer_used / 100  # Rough conversion
-        elif feat == 'avg_temp':
-            features_dict[feat] = temperature
-        elif 'Unnamed' in feat:
-            features_dict[feat] = 0  # Index column, use 0
-        else:
-            features_dict[feat] = 0
+    # Create feature array from the precompiled template
+    with span('yield', 'features'):
+        X = handle.template.row(
+            crop_type=crop_type, area_hectares=area_hectares, rainfall=rainfall,
+            temperature=temperature, fertilizer_used=fertilizer_used
+        )
     
-    # Create feature array
-    X = np.array([[features_dict[feat] for feat in yield_features]])
-    
-    # Scale features
-    X_scaled = yield_scaler.transform(X)
-    
-    # Predict yield (in hg/ha, need to convert to kg/ha)
-    yield_hg_ha = yield_model.predict(X_scaled)[0]
+    # Predict yield (in hg/ha, need to convert to kg/ha); the engine applies
+    # or has folded in the scaler
+    yield_hg_ha = handle.engine.predict(X)[0]
     yield_kg_ha = yield_hg_ha / 10  # Convert hectogram to kilogram
     
     # Ensure positive yield
     yield_kg_ha = max(100, yield_kg_ha)  # Minimum 100 kg/ha
     
     return float(yield_kg_ha)
+
+def estimate_yield_batch(
+    samples: Sequence[Dict[str, any]],
+    handle: Optional[ModelHandle] = None
+) -> List[float]:
+    """
+    Estimate yield for many samples with a single forest call.
+    
+    Args:
+        samples: Sequence of dicts keyed like the estimate_yield arguments
+        handle: Model version to use (default: the active one)
+    
+    Returns:
+        List of estimated yields in kg/ha, one per sample and in the same order
+    """
+    # Models are loaded at startup (models/loading.py), never inside a request
+    handle = handle or yield_handle
+    if handle is None:
+        raise RuntimeError("Yield model is not loaded")
+    
+    if len(samples) == 0:
+        return []
+    
+    with span('yield', 'features'):
+        X = handle.template.matrix(samples)
+    
+    # Predict in hg/ha, convert to kg/ha and apply the 100 kg/ha floor
+    yield_kg_ha = np.maximum(100, yield_policy.run(handle.engine.predict, X) / 10)
+    
+    return [float(value) for value in yield_kg_ha]
@@ -5,6 +5,8 @@ from .requests import (
     CropPredictionRequest,
     CropPredictionResponse,
     AlternativeCrop,
+    CropBatchPredictionRequest,
+    CropBatchPredictionResponse,
     FertilizerRequest,
     FertilizerResponse,
     NPKRatio,
@@ -20,6 +22,8 @@ __all__ = [
     "CropPredictionRequest",
     "CropPredictionResponse",
     "AlternativeCrop",
+    "CropBatchPredictionRequest",
+    "CropBatchPredictionResponse",
     "FertilizerRequest",
     "FertilizerResponse",
     "NPKRatio",
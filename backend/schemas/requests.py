@@ -2,7 +2,7 @@
 Pydantic schemas for request validation and response formatting.
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 # ==================== Crop Prediction Schemas ====================
@@ -64,6 +64,7 @@ class CropPredictionResponse(BaseModel):
     predicted_crop: str
     confidence_score: float = Field(..., ge=0, le=100)
     alternative_crops: List[AlternativeCrop]
+    degraded: bool = Field(False, description="Answered by the rule-based engine instead of the ML model")
     
     class Config:
         json_schema_extra = {
@@ -73,11 +74,51 @@ class CropPredictionResponse(BaseModel):
                 "alternative_crops": [
                     {"crop": "Wheat", "score": 89.2},
                     {"crop": "Maize", "score": 85.1}
-                ]
+                ],
+                "degraded": False
             }
         }
 
 
+class CropBatchPredictionRequest(BaseModel):
+    """Request schema for batch crop prediction endpoint."""
+    
+    samples: List[CropPredictionRequest] = Field(
+        ..., min_length=1, max_length=10000, description="Soil samples to score"
+    )
+    top_k: int = Field(
+        4, ge=1, description="Ranked crops per sample, including the prediction (at most every crop the model knows)"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "samples": [
+                    {
+                        "soil_type": "Alluvial Soil",
+                        "n_level": 80,
+                        "p_level": 40,
+                        "k_level": 50,
+                        "temperature": 25,
+                        "humidity": 70,
+                        "rainfall": 100,
+                        "ph_level": 7,
+                        "region": "North India"
+                    }
+                ],
+                "top_k": 4
+            }
+        }
+
+
+class CropBatchPredictionResponse(BaseModel):
+    """Response schema for batch crop prediction."""
+    
+    predictions: List[CropPredictionResponse]
+    count: int
+    degraded: bool = Field(False, description="Answered by the rule-based engine instead of the ML model")
+
+
 # ==================== Fertilizer Recommendation Schemas ====================
 
 class FertilizerRequest(BaseModel):
@@ -124,9 +165,10 @@ class FertilizerResponse(BaseModel):
     
     recommended_fertilizer: str
     npk_ratio: NPKRatio
-    quantity_per_hectare: float = Field(..., gt=0)
+    quantity_per_hectare: float = Field(..., ge=0)
     application_timing: str
     notes: str
+    degraded: bool = Field(False, description="Answered by the rule-based engine instead of the ML model")
     
     class Config:
         json_schema_extra = {
@@ -135,7 +177,8 @@ class FertilizerResponse(BaseModel):
                 "npk_ratio": {"n": 120, "p": 60, "k": 40},
                 "quantity_per_hectare": 220,
                 "application_timing": "Two split applications - 50% at planting, 50% at tillering",
-                "notes": "Apply with adequate water. Avoid excess nitrogen in waterlogged conditions."
+                "notes": "Apply with adequate water. Avoid excess nitrogen in waterlogged conditions.",
+                "degraded": False
             }
         }
 
@@ -195,6 +238,7 @@ class YieldResponse(BaseModel):
     confidence_interval: ConfidenceInterval
     regional_average: float = Field(..., gt=0)
     optimal_yield: float = Field(..., gt=0)
+    degraded: bool = Field(False, description="Answered by the rule-based engine instead of the ML model")
     
     class Config:
         json_schema_extra = {
@@ -202,7 +246,8 @@ class YieldResponse(BaseModel):
                 "estimated_yield": 5.2,
                 "confidence_interval": {"lower": 4.8, "upper": 5.6},
                 "regional_average": 4.9,
-                "optimal_yield": 6.5
+                "optimal_yield": 6.5,
+                "degraded": False
             }
         }
 
@@ -214,6 +259,7 @@ class HealthResponse(BaseModel):
     status: str
     message: str
     version: str = "1.0.0"
+    model_versions: Dict[str, Optional[str]] = {}
 
 
 class ErrorResponse(BaseModel):
@@ -223,9 +269,51 @@ class ErrorResponse(BaseModel):
     error_type: Optional[str] = None
 
 
+class RecentYield(BaseModel):
+    """One recent yield estimate."""
+    timestamp: float
+    crop_type: str
+    estimated_yield: float
+
+
 class StatisticsResponse(BaseModel):
-    """Statistics response (optional)."""
+    """Prediction statistics across all workers, kept across restarts."""
     total_predictions: int
     crops: int
     fertilizers: int
     yields: int
+    endpoints: Dict[str, int] = {}
+    crop_distribution: Dict[str, int] = {}
+    fertilizer_distribution: Dict[str, int] = {}
+    mean_confidence: Dict[str, Optional[float]] = {}
+    mean_yield: Optional[float] = None
+    recent_yields: List[RecentYield] = []
+    window_minutes: int = 0
+    window_requests: Dict[str, int] = {}
+    since: Optional[float] = None
+
+
+# ==================== Prediction History Schemas ====================
+
+class HistoryRecord(BaseModel):
+    """One stored prediction."""
+    id: int
+    timestamp: float
+    endpoint: str
+    predicted: Optional[str] = None
+    confidence: Optional[float] = None
+    value: Optional[float] = None
+    model_version: Optional[str] = None
+    inputs: Dict[str, Any]
+
+
+class HistoryPage(BaseModel):
+    """Newest-first page of stored predictions."""
+    items: List[HistoryRecord]
+    next_cursor: Optional[str] = None
+
+
+class HistoryCounts(BaseModel):
+    """Stored predictions per predicted class."""
+    counts: Dict[str, int]
+    total: int
@@ -0,0 +1,218 @@
+"""
+AgroSmart pre-forking server
+Loads every model once in a master process, then forks the uvicorn workers so
+they share the model memory copy-on-write instead of each loading its own copy.
+
+Usage:
+    python serve.py --workers 4 --host 0.0.0.0 --port 8000
+
+Each worker's shared/private memory is logged shortly after startup and is
+available at GET /api/memory.
+
+`kill -HUP <master pid>` (or POST /api/admin/reload) hot-reloads changed model
+files in every worker and in the master, so workers forked later start with
+the new version too.
+
+Prometheus metrics from all workers are aggregated at GET /metrics through a
+shared PROMETHEUS_MULTIPROC_DIR (a temporary directory unless it is set).
+"""
+import argparse
+import glob
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import uvicorn
+
+import config
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('serve')
+
+# Seconds after the workers start before the memory report is logged
+REPORT_DELAY = 5.0
+
+# Workers that die sooner than this after starting are restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+# Seconds between checks of the supervision loop for dead workers and reloads
+SUPERVISE_INTERVAL = 0.2
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Listening socket created in the master and inherited by every worker."""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_metrics_dir() -> bool:
+    """
+    Point every process at one Prometheus multiprocess directory.
+
+    Must run before prometheus_client is imported. Uses PROMETHEUS_MULTIPROC_DIR
+    if set (emptied first, so counters start from zero) and a new temporary
+    directory otherwise; returns True if the directory was created here.
+    """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for stale in glob.glob(os.path.join(path, '*.db')):
+            os.remove(stale)
+        return False
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='agrosmart-metrics-')
+    return True
+
+
+def run_worker(app, sock: socket.socket, log_level: str) -> None:
+    """Serve on the inherited socket until uvicorn exits (runs in the child)."""
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+    # Not the master's reload; the app installs its own SIGHUP handler at startup
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level, lifespan='on'))
+    server.run(sockets=[sock])
+
+
+def log_memory_report() -> None:
+    """Log shared/private memory of the master and every worker."""
+    from services.memory import child_pids, process_memory
+
+    master = process_memory() or {}
+    logger.info(f"Master {os.getpid()}: rss {master.get('rss', 0):.1f} MB")
+    for pid in child_pids(os.getpid()):
+        usage = process_memory(pid) or {}
+        logger.info(
+            f"Worker {pid}: rss {usage.get('rss', 0):.1f} MB, "
+            f"shared {usage.get('shared', 0):.1f} MB, private {usage.get('private', 0):.1f} MB, "
+            f"pss {usage.get('pss', 0):.1f} MB"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Run the AgroSmart API with models preloaded before fork')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=config.SERVE_WORKERS)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    # Installed first, so a SIGHUP during the model load is not fatal
+    reload_requested = False
+
+    def request_reload(signum, frame) -> None:
+        # Reloading takes seconds; the supervision loop does it
+        nonlocal reload_requested
+        reload_requested = True
+
+    signal.signal(signal.SIGHUP, request_reload)
+
+    sock = bind_socket(args.host, args.port)
+    owns_metrics_dir = prepare_metrics_dir()
+
+    # Load once here; workers inherit the loaded models through fork
+    from models import initialize_models
+    from models.sharing import prepare_for_fork
+    started = time.perf_counter()
+    if not initialize_models():
+        logger.error("❌ Failed to load ML models in the master process")
+        return 1
+    logger.info(f"✅ Models loaded in the master in {time.perf_counter() - started:.2f}s")
+
+    from main import app
+    from prometheus_client import multiprocess
+    from services.memory import MASTER_PID_ENV
+    os.environ[MASTER_PID_ENV] = str(os.getpid())
+    prepare_for_fork()
+
+    workers = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args.log_level)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+        logger.info(f"🚀 Started worker {pid}")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reload() -> None:
+        # Workers reload in the background and keep serving meanwhile
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+        from models import loading
+        results = loading.reload_models()
+        logger.info("🔄 Master reload: " + ", ".join(
+            f"{name} {result['status']}" for name, result in results.items()
+        ))
+        if any(result['status'] == 'swapped' for result in results.values()):
+            prepare_for_fork()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(max(1, args.workers)):
+        spawn()
+    logger.info(f"🌾 Serving on http://{args.host}:{args.port} with {len(workers)} workers")
+
+    report = threading.Timer(REPORT_DELAY, log_memory_report)
+    report.daemon = True
+    report.start()
+
+    # Re-fork workers that die; each one starts with the master's models
+    while workers:
+        if reload_requested and not stopping:
+            reload_requested = False
+            reload()
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(SUPERVISE_INTERVAL)
+            continue
+        started_at = workers.pop(pid, time.monotonic())
+        # Drop the worker's in-flight gauges; its counters keep counting
+        multiprocess.mark_process_dead(pid)
+        if not stopping:
+            logger.warning(f"⚠️  Worker {pid} exited with status {status}, restarting")
+            if time.monotonic() - started_at < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            spawn()
+
+    sock.close()
+    if owns_metrics_dir:
+        shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    logger.info("👋 All workers stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
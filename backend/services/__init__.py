@@ -0,0 +1,49 @@
+"""
+Services package for AgroSmart inference runtime.
+"""
+from .errors import InferenceUnavailableError
+from .inference import (
+    run_crop_prediction,
+    run_crop_prediction_batch,
+    run_fertilizer_recommendation,
+    run_yield_estimation,
+    batching_stats,
+    cache_stats,
+    clear_caches,
+    executor_stats,
+    fallback_stats,
+    is_degraded,
+    model_versions,
+    readiness,
+    record_crop_prediction,
+    record_fertilizer_recommendation,
+    record_yield_estimation,
+    reload_models,
+    track_versions
+)
+from .singleflight import collapse, singleflight_stats
+from .statistics import prediction_statistics
+
+__all__ = [
+    "InferenceUnavailableError",
+    "run_crop_prediction",
+    "run_crop_prediction_batch",
+    "run_fertilizer_recommendation",
+    "run_yield_estimation",
+    "batching_stats",
+    "cache_stats",
+    "clear_caches",
+    "collapse",
+    "executor_stats",
+    "fallback_stats",
+    "is_degraded",
+    "model_versions",
+    "prediction_statistics",
+    "readiness",
+    "record_crop_prediction",
+    "record_fertilizer_recommendation",
+    "record_yield_estimation",
+    "reload_models",
+    "singleflight_stats",
+    "track_versions"
+]
@@ -0,0 +1,226 @@
+"""
+Micro-batching request coalescer.
+Gathers concurrent single-row requests for the same model and scores them together.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from . import tracing
+from .errors import InferenceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class QueueFullError(InferenceUnavailableError):
+    """Raised when a batcher's pending queue is at capacity."""
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Hand a result or error to a caller that is still waiting."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests into one batched model call.
+
+    The first request to arrive opens a window of `max_wait_ms`; every request
+    that arrives before the window closes (or until `max_batch_size` rows are
+    collected) is passed to `batch_fn` in a single call. Each caller awaits its
+    own future and receives the matching element of the returned list. If the
+    batch call fails, its items are scored one by one, so an error (an invalid
+    input, say) only reaches the caller it belongs to.
+
+    `runner` decides where the batch function executes (for example an
+    InferenceExecutor); by default it runs inline on the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[Sequence[Any]], List[Any]],
+        max_wait_ms: float = 2.0,
+        max_batch_size: int = 64,
+        max_queue_size: int = 1024,
+        runner: Optional[Callable[..., Awaitable[Any]]] = None
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.runner = runner
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_queue_size = max(1, max_queue_size)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.requests = 0
+        self.batches = 0
+        self.batched_items = 0
+        self.rejected = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def _ensure_worker(self) -> None:
+        """Start the collector task on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = loop.create_task(self._collect())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        self._ensure_worker()
+
+        if self._queue.full():
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} batch queue is full")
+
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter(), tracing.current()))
+        self.requests += 1
+        return await future
+
+    async def _collect(self) -> None:
+        """Form batches from the queue until cancelled."""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Keep collecting the next batch while this one is scored
+            task = self._loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, items: List[Any]) -> List[Any]:
+        """Run the batch function for one batch of items."""
+        if self.runner is not None:
+            return await self.runner(self.batch_fn, items)
+        return self.batch_fn(items)
+
+    async def _dispatch(self, batch: List[tuple]) -> None:
+        """Score one batch and resolve every caller's future."""
+        # Callers that gave up (e.g. client disconnected) are dropped
+        batch = [entry for entry in batch if not entry[1].done()]
+        if not batch:
+            return
+
+        now = time.perf_counter()
+        traces = []
+        for _, _, enqueued_at, trace in batch:
+            waited = now - enqueued_at
+            self.total_wait += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+            if trace is not None:
+                trace.add('batch_wait', waited)
+                traces.append(trace)
+        self.batches += 1
+        self.batched_items += len(batch)
+        self.size_histogram[self._bucket(len(batch))] += 1
+
+        # The batch's model spans count towards every request in it
+        token = tracing.attach(traces)
+        try:
+            results = await self._run_batch([item for item, _, _, _ in batch])
+        except Exception as e:
+            self.errors += 1
+            if len(batch) == 1:
+                _resolve(batch[0][1], error=e)
+                return
+            logger.warning(f"{self.name} batch of {len(batch)} failed ({e}), scoring its items one by one")
+            results = None
+        finally:
+            tracing.detach(token)
+
+        if results is None:
+            await self._dispatch_each(batch)
+            return
+        for (_, future, _, _), result in zip(batch, results):
+            _resolve(future, result)
+
+    async def _dispatch_each(self, batch: List[tuple]) -> None:
+        """Score the items of a failed batch separately, each with its own trace."""
+        for item, future, _, trace in batch:
+            if future.done():
+                continue
+            token = tracing.attach([trace] if trace is not None else [])
+            try:
+                result = (await self._run_batch([item]))[0]
+            except Exception as e:
+                _resolve(future, error=e)
+            else:
+                _resolve(future, result)
+            finally:
+                tracing.detach(token)
+
+    @staticmethod
+    def _bucket(size: int) -> int:
+        """Index of the histogram bucket for a batch size."""
+        for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= bound:
+                return i
+        return len(BATCH_SIZE_BUCKETS)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of batch-size and wait-time metrics."""
+        histogram = {
+            f"le_{bound}": count
+            for bound, count in zip(BATCH_SIZE_BUCKETS, self.size_histogram)
+        }
+        histogram["gt_" + str(BATCH_SIZE_BUCKETS[-1])] = self.size_histogram[-1]
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "mean_batch_size": self.batched_items / self.batches if self.batches else 0.0,
+            "mean_wait_ms": self.total_wait / self.batched_items * 1000 if self.batched_items else 0.0,
+            "max_wait_ms": self.max_wait_seen * 1000,
+            "batch_size_histogram": histogram,
+            "config": {
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch_size": self.max_batch_size,
+                "max_queue_size": self.max_queue_size
+            }
+        }
+
+    async def close(self) -> None:
+        """Stop the collector task."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        for task in list(self._inflight):
+            task.cancel()
@@ -0,0 +1,144 @@
+"""
+Bounded LRU cache for single-row predictions.
+Requests are keyed on their quantized input fields, so repeated (or nearly
+repeated) soil samples skip the batcher, the executor and the forest entirely.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+# Returned by PredictionCache.get when the key is not cached
+MISSING = object()
+
+
+class PredictionCache:
+    """
+    LRU map from quantized request fields to a model result.
+
+    Numeric fields are rounded to `decimals` places (overridable per field with
+    `field_decimals`; a negative value keeps the field exact) to build the key
+    only. Requests that round to the same key share the answer computed for the
+    first of them, the approximation the rounding accepts. Entries older than
+    `ttl_seconds` are treated as misses (0 disables expiry).
+
+    `version` returns an identity for the currently loaded model (for example
+    its inference engine); when it changes, the cache is cleared, so a model
+    reload never serves results from the previous model.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 4096,
+        ttl_seconds: float = 0.0,
+        decimals: int = 2,
+        field_decimals: Optional[Mapping[str, int]] = None,
+        version: Optional[Callable[[], Any]] = None
+    ):
+        self.name = name
+        self.max_entries = max(0, max_entries)
+        self.ttl = max(0.0, ttl_seconds)
+        self.decimals = decimals
+        self.field_decimals = dict(field_decimals or {})
+        self.version = version or (lambda: None)
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = self.version()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def quantize(self, fields: Mapping[str, Any]) -> Dict[str, Any]:
+        """Round numeric fields to the configured number of decimals (for the key)."""
+        quantized = {}
+        for name, value in fields.items():
+            places = self.field_decimals.get(name, self.decimals)
+            if places >= 0 and isinstance(value, float):
+                value = round(value, places)
+            quantized[name] = value
+        return quantized
+
+    @staticmethod
+    def key(fields: Mapping[str, Any]) -> Hashable:
+        """Hashable key for already quantized fields."""
+        return tuple(sorted(fields.items()))
+
+    def _check_version(self) -> Any:
+        """Drop every entry if the model was reloaded; return the current version."""
+        current = self.version()
+        if current is not self._version:
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = current
+        return current
+
+    def get(self, key: Hashable) -> Any:
+        """Cached result for `key`, or MISSING."""
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: Any = None) -> None:
+        """
+        Store a result, evicting the least recently used entries over the limit.
+
+        `version` is the model version the result was computed with (from
+        `self.version()` before inference); stale results are not stored.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._check_version() is not version:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "config": {
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "decimals": self.decimals,
+                "field_decimals": self.field_decimals
+            }
+        }
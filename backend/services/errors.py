@@ -0,0 +1,11 @@
+"""
+Exceptions raised by the inference services.
+"""
+
+
+class InferenceUnavailableError(RuntimeError):
+    """Inference capacity is temporarily exhausted; the client should retry (HTTP 503)."""
+
+
+class ModelNotReadyError(InferenceUnavailableError):
+    """Raised when a request needs a model that is still loading or failed to load."""
@@ -0,0 +1,122 @@
+"""
+Bounded executor for blocking model inference.
+Keeps sklearn work off the asyncio event loop and sheds load when saturated.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .errors import InferenceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(InferenceUnavailableError):
+    """Raised when the inference executor has no room for more work."""
+
+
+def _init_worker_process() -> None:
+    """Load the models once in each worker process."""
+    from models import initialize_models
+    initialize_models()
+
+
+class InferenceExecutor:
+    """
+    Thread or process pool with a hard cap on outstanding work.
+
+    At most `max_pending` calls may be running or queued at once; any call
+    beyond that fails fast with ExecutorSaturatedError instead of piling up
+    behind a slow model.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 256, kind: str = 'thread'):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._pool: Optional[Executor] = None
+
+        # Metrics (only touched from the event loop thread)
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_time = 0.0
+
+    def _get_pool(self) -> Executor:
+        """Create the pool on first use."""
+        if self._pool is None:
+            if self.kind == 'process':
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker_process
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='inference'
+                )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) in the pool and await its result."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturatedError("Inference capacity exhausted, retry shortly")
+
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            call = functools.partial(fn, *args, **kwargs)
+            if self.kind == 'thread':
+                # Run in the caller's context so the request trace sees the model spans
+                call = functools.partial(contextvars.copy_context().run, call)
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), call)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+            self.busy_time += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue and throughput metrics."""
+        finished = self.completed + self.failed
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "mean_latency_ms": self.busy_time / finished * 1000 if finished else 0.0
+        }
+
+    def recycle(self) -> None:
+        """
+        Send new calls to a fresh pool; calls already running finish in the old
+        one. Process workers load the models when they start, so this is how a
+        model reload reaches them.
+        """
+        old, self._pool = self._pool, None
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        """Release the pool without waiting for queued work."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
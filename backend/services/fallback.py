@@ -0,0 +1,313 @@
+"""
+Rule-based fallback for the ML models.
+Every prediction endpoint has a router with a time budget and a circuit
+breaker. The ML answer is used when it arrives within the budget; when the
+model is not ready, fails, is overloaded or misses the deadline, the request
+is answered by the rule-based engine for the same question (models/crop_model.py,
+fertilizer_model.py, yield_model.py), which takes microseconds, and the
+response is flagged as degraded.
+
+After AGROSMART_FALLBACK_FAILURE_THRESHOLD consecutive failures the breaker
+opens and the endpoint stops calling the model: requests go straight to the
+rules for AGROSMART_FALLBACK_RESET_SECONDS, then a single trial request
+decides whether the model is used again.
+
+A model call that misses its deadline is not cancelled (a running model call
+cannot be interrupted); it finishes in the background and still fills the
+prediction cache.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+from models.crop_model import CropPredictor
+from models.fertilizer_model import FertilizerRecommender
+from models.yield_model import YieldEstimator
+from . import tracing
+from .errors import InferenceUnavailableError, ModelNotReadyError
+from .metrics import count_fallback, set_circuit_open
+
+logger = logging.getLogger(__name__)
+
+# Model version reported (X-Model-Version, prediction history) for rule-based answers
+RULES_VERSION = 'rules'
+
+# Why a request was answered by the rules
+REASONS = ('timeout', 'error', 'overloaded', 'not_ready', 'circuit_open')
+REASON_TEXT = {
+    'timeout': 'missed its deadline',
+    'error': 'failed',
+    'overloaded': 'overloaded',
+    'not_ready': 'not ready',
+    'circuit_open': 'circuit breaker open'
+}
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing model.
+
+    Closed: every request goes to the model. After `threshold` consecutive
+    failures the breaker opens and requests skip the model. Once
+    `reset_seconds` have passed it is half-open: one trial request goes to the
+    model and closes the breaker if it succeeds or reopens it if not. A trial
+    that never reports (its request was cancelled) is replaced by another one
+    after `reset_seconds`.
+    Only touched from the event loop thread.
+    """
+
+    def __init__(self, name: str, threshold: int, reset_seconds: float):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.reset_seconds = max(0.0, reset_seconds)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0  # When it opened, or when the current trial was sent
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Whether this request may call the model."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_seconds:
+            # Open long enough, or the last trial never reported: send a trial
+            self.state = HALF_OPEN
+            self.opened_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"✓ {self.name}: model answering again, circuit closed")
+            set_circuit_open(self.name, False)
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+            if self.state == CLOSED:
+                logger.warning(
+                    f"⚠️ {self.name}: {self.failures} model failures in a row, "
+                    f"answering with the rules for {self.reset_seconds:g}s"
+                )
+                set_circuit_open(self.name, True)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = self.opened_at + self.reset_seconds - time.monotonic() if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "retry_in_seconds": max(0.0, retry_in)
+        }
+
+
+def _discard_result(task: asyncio.Future) -> None:
+    # Late model calls: nobody is waiting, so retrieve the exception here
+    if not task.cancelled():
+        task.exception()
+
+
+class FallbackRouter:
+    """Tries the model within `deadline_ms`, answers with the rules otherwise."""
+
+    def __init__(self, endpoint: str, deadline_ms: float, breaker: CircuitBreaker):
+        self.endpoint = endpoint
+        self.deadline = deadline_ms / 1000 if deadline_ms > 0 else None
+        self.breaker = breaker
+
+        # Metrics
+        self.requests = 0
+        self.fallbacks = {reason: 0 for reason in REASONS}
+        self.fallback_failures = 0
+
+    async def _call_model(self, primary: Callable[[], Awaitable[Any]]) -> Any:
+        if self.deadline is None:
+            return await primary()
+        task = asyncio.ensure_future(primary())
+        try:
+            # Shielded: a late call keeps running and still fills the cache
+            return await asyncio.wait_for(asyncio.shield(task), self.deadline)
+        except asyncio.TimeoutError:
+            task.add_done_callback(_discard_result)
+            raise
+
+    async def run(self, primary: Callable[[], Awaitable[Any]], rules: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Answer with `primary()` (the model) or, if it cannot answer in time,
+        with `rules()`. Returns (result, degraded).
+
+        ValueError from the model (invalid input) is raised as usual. If the
+        rules cannot answer either, InferenceUnavailableError is raised (503),
+        chained to the model's error.
+        """
+        self.requests += 1
+        breaker = self.breaker
+        if not breaker.allow():
+            return self._answer_with_rules('circuit_open', rules, None), True
+
+        try:
+            result = await self._call_model(primary)
+        except ValueError:
+            # The model rejected the input, so it is working
+            breaker.record_success()
+            raise
+        except asyncio.TimeoutError as e:
+            reason, error = 'timeout', e
+        except ModelNotReadyError as e:
+            reason, error = 'not_ready', e
+        except InferenceUnavailableError as e:
+            reason, error = 'overloaded', e
+        except Exception as e:
+            logger.warning(f"⚠️ {self.endpoint}: model failed ({e}), answering with the rules")
+            reason, error = 'error', e
+        else:
+            breaker.record_success()
+            return result, False
+
+        # A model that is still loading is not failing; but a trial request must decide
+        if reason != 'not_ready' or breaker.state == HALF_OPEN:
+            breaker.record_failure()
+        return self._answer_with_rules(reason, rules, error), True
+
+    def _answer_with_rules(self, reason: str, rules: Callable[[], Any], error: Optional[BaseException]) -> Any:
+        started = time.perf_counter()
+        try:
+            result = rules()
+        except Exception as e:
+            # Whatever kept the model from answering, the client may retry (503)
+            self.fallback_failures += 1
+            cause = REASON_TEXT[reason]
+            if error is not None and str(error):
+                cause += f": {error}"
+            raise InferenceUnavailableError(
+                f"The {self.endpoint} model could not answer ({cause}) "
+                f"and the rule-based fallback cannot either: {e}"
+            ) from (error if error is not None else e)
+        self.fallbacks[reason] += 1
+        count_fallback(self.endpoint, reason)
+        trace = tracing.current()
+        if trace is not None:
+            trace.add('fallback', time.perf_counter() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        fallbacks = sum(self.fallbacks.values())
+        return {
+            "requests": self.requests,
+            "fallbacks": fallbacks,
+            "fallback_rate": fallbacks / self.requests if self.requests else 0.0,
+            "reasons": dict(self.fallbacks),
+            "fallback_failures": self.fallback_failures,
+            "circuit": self.breaker.stats(),
+            "deadline_ms": self.deadline * 1000 if self.deadline is not None else 0.0
+        }
+
+
+# ==================== Rule-based answers ====================
+# Same result shapes as the ML entry points. Deterministic engines (no
+# jitter), so a degraded answer is stable across retries.
+
+_crop_rules = CropPredictor(jitter=False)
+_fertilizer_rules = FertilizerRecommender()
+_yield_rules = YieldEstimator(jitter=False)
+
+
+def _fields(inputs: Any) -> Dict[str, Any]:
+    """Request fields of a pydantic request model or a plain mapping."""
+    return inputs.model_dump() if hasattr(inputs, 'model_dump') else dict(inputs)
+
+
+def _crop_answer(
+    crop: str,
+    score: float,
+    alternatives: List[Dict[str, float]],
+    top_k: int = 4
+) -> Tuple[str, float, List[Dict[str, float]]]:
+    """
+    A rule-based answer in the ML model's terms: lowercase labels, as in the
+    training data ("Rice" -> "rice"), and 0-100 suitability scores as 0-1,
+    like the predicted probabilities.
+    """
+    return (
+        crop.lower(),
+        score / 100,
+        [{"crop": alternative["crop"].lower(), "score": alternative["score"] / 100}
+         for alternative in alternatives[:top_k - 1]]
+    )
+
+
+def crop_rules(inputs: Any) -> Tuple[str, float, List[Dict[str, float]]]:
+    """(crop, suitability, alternatives) for a crop prediction request."""
+    return _crop_answer(*_crop_rules.predict(**_fields(inputs)))
+
+
+def crop_batch_rules(samples: Sequence[Any], top_k: int = 4) -> List[Tuple[str, float, List[Dict[str, float]]]]:
+    """Rule-based predict_crop_batch: up to top_k - 1 alternatives per sample."""
+    results = _crop_rules.predict_batch([_fields(sample) for sample in samples])
+    return [_crop_answer(crop, score, alternatives, top_k) for crop, score, alternatives in results]
+
+
+def fertilizer_rules(inputs: Any) -> Dict[str, Any]:
+    """
+    recommend_fertilizer result for a fertilizer request, plus the rule
+    engine's npk_ratio, application_timing and notes. There is no model
+    confidence (None).
+    """
+    recommendation = _fertilizer_rules.recommend(**_fields(inputs))
+    return {
+        'fertilizer_name': recommendation['recommended_fertilizer'],
+        'application_rate': recommendation['quantity_per_hectare'],
+        'rate_description': 'Rule-based quantity for the remaining nutrient deficit',
+        'confidence': None,
+        'npk_ratio': recommendation['npk_ratio'],
+        'application_timing': recommendation['application_timing'],
+        'notes': recommendation['notes']
+    }
+
+
+def yield_rules(inputs: Any) -> float:
+    """Estimated yield in kg/ha, like estimate_yield (the rules work in tonnes/ha)."""
+    fields = _fields(inputs)
+    fields.pop('area_hectares', None)
+    estimate = _yield_rules.estimate(**fields)
+    return max(100.0, estimate['estimated_yield'] * 1000)
+
+
+# Endpoint name -> rule-based answer for one request
+RULES = {
+    'crop': crop_rules,
+    'fertilizer': fertilizer_rules,
+    'yield': yield_rules
+}
+
+# One router per prediction endpoint
+routers: Dict[str, FallbackRouter] = {
+    endpoint: FallbackRouter(
+        endpoint,
+        deadline_ms,
+        CircuitBreaker(endpoint, config.FALLBACK_FAILURE_THRESHOLD, config.FALLBACK_RESET_SECONDS)
+    )
+    for endpoint, deadline_ms in config.FALLBACK_DEADLINE_MS.items()
+}
+
+
+def fallback_stats() -> Dict[str, Any]:
+    """Fallback counts and rates, by reason, and circuit state for every endpoint."""
+    return {
+        "enabled": config.FALLBACK_ENABLED,
+        "endpoints": {endpoint: router.stats() for endpoint, router in routers.items()},
+        "config": {
+            "failure_threshold": config.FALLBACK_FAILURE_THRESHOLD,
+            "reset_seconds": config.FALLBACK_RESET_SECONDS
+        }
+    }
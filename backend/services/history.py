@@ -0,0 +1,332 @@
+"""
+Write-behind prediction history in SQLite.
+Endpoints hand each answered prediction to `record()`, which only appends it to
+an in-memory queue; a background task collects queued records and writes them
+in one transaction per batch on a dedicated database thread. The request path
+never touches the disk, and if the queue is full the record is dropped (and
+counted) rather than slowing the request down.
+
+The database runs in WAL mode, so the query endpoints read while a batch is
+being written, and several worker processes can share one file.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import config
+from .inference import served_versions
+
+logger = logging.getLogger(__name__)
+
+# Endpoint name -> model that answers it
+ENDPOINT_MODELS = {
+    'crop': 'crop',
+    'crop_batch': 'crop',
+    'fertilizer': 'fertilizer',
+    'yield': 'yield'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    endpoint TEXT NOT NULL,
+    predicted TEXT,
+    confidence REAL,
+    value REAL,
+    model_version TEXT,
+    inputs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_endpoint ON predictions (endpoint, timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_predicted ON predictions (predicted, timestamp);
+"""
+
+INSERT = """
+INSERT INTO predictions (timestamp, endpoint, predicted, confidence, value, model_version, inputs)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# (timestamp, endpoint, model version, [(inputs, predicted, confidence, value), ...])
+Record = Tuple[float, str, Optional[str], List[Tuple[Any, Optional[str], Optional[float], Optional[float]]]]
+
+
+def _inputs_json(inputs: Any) -> str:
+    """Request fields as JSON (pydantic models are serialized here, off the request path)."""
+    if hasattr(inputs, 'model_dump_json'):
+        return inputs.model_dump_json()
+    return json.dumps(inputs)
+
+
+class HistoryStore:
+    """
+    Queue of answered predictions and the SQLite database they are written to.
+
+    Records are flushed once `flush_size` rows are queued or `flush_interval`
+    seconds after the first one arrived, whichever comes first. At most
+    `queue_size` records wait in memory.
+    """
+
+    def __init__(self, path: str, flush_size: int = 256, flush_interval: float = 1.0, queue_size: int = 10000):
+        self.path = path
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.queue_size = max(1, queue_size)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._full: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        # One thread owns the connection: every write and query runs on it
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        self._queued_rows = 0
+        # Records taken off the queue for the batch being collected
+        self._pending: List[Record] = []
+
+        # Metrics
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None
+
+    # ----- request path (event loop) -----
+
+    def record(self, endpoint: str, rows: Sequence[Tuple[Any, Optional[str], Optional[float], Optional[float]]]) -> None:
+        """Queue prediction rows (inputs, predicted, confidence, value); never blocks."""
+        if self._queue is None:
+            return
+        versions = served_versions()
+        version = versions.get(ENDPOINT_MODELS.get(endpoint, endpoint)) if versions else None
+        try:
+            self._queue.put_nowait((time.time(), endpoint, version, list(rows)))
+        except asyncio.QueueFull:
+            self.dropped += len(rows)
+            return
+        self.recorded += len(rows)
+        self._queued_rows += len(rows)
+        if self._queued_rows >= self.flush_size:
+            self._full.set()
+
+    # ----- database thread -----
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('PRAGMA busy_timeout=5000')
+        db.executescript(SCHEMA)
+        self._db = db
+
+    def _write(self, records: List[Record]) -> int:
+        rows = [
+            (timestamp, endpoint, predicted, confidence, value, version, _inputs_json(inputs))
+            for timestamp, endpoint, version, items in records
+            for inputs, predicted, confidence, value in items
+        ]
+        with self._db:
+            self._db.execute('BEGIN')
+            self._db.executemany(INSERT, rows)
+        return len(rows)
+
+    def _query(self, sql: str, params: Sequence[Any]) -> List[Dict[str, Any]]:
+        cursor = self._db.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    # ----- background writer -----
+
+    async def _collect(self) -> List[Record]:
+        """Wait for the first record, then for a full batch or the flush interval."""
+        self._pending.append(await self._queue.get())
+        if self._queued_rows < self.flush_size and self.flush_interval > 0:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+        records, self._pending = self._pending + self._drain(), []
+        return records
+
+    def _drain(self) -> List[Record]:
+        records = []
+        while not self._queue.empty():
+            records.append(self._queue.get_nowait())
+        self._queued_rows = 0
+        self._full.clear()
+        return records
+
+    async def _flush(self, records: List[Record]) -> None:
+        if not records:
+            return
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            self.written += await loop.run_in_executor(self._io, self._write, records)
+            self.batches += 1
+        except Exception as e:
+            failed = sum(len(items) for *_, items in records)
+            self.failed += failed
+            logger.error(f"❌ Failed to write {failed} history records: {e}")
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    async def _run(self) -> None:
+        while True:
+            await self._flush(await self._collect())
+
+    async def start(self) -> None:
+        """Open the database and start the background writer."""
+        if self._writer is not None:
+            return
+        await asyncio.get_running_loop().run_in_executor(self._io, self._open)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._full = asyncio.Event()
+        self._writer = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the writer after writing everything still queued."""
+        if self._writer is None:
+            return
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        records, self._pending = self._pending + self._drain(), []
+        await self._flush(records)
+        self._queue = None
+        await asyncio.get_running_loop().run_in_executor(self._io, self._db.close)
+        self._db = None
+
+    # ----- queries -----
+
+    async def query(
+        self,
+        endpoint: Optional[str] = None,
+        predicted: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Newest-first page of predictions matching the filters.
+
+        `cursor` is the `next_cursor` of the previous page ("timestamp:id"), so
+        deep pages cost the same as the first one.
+        """
+        where, params = [], []
+        if endpoint:
+            where.append('endpoint = ?')
+            params.append(endpoint)
+        if predicted:
+            where.append('predicted = ?')
+            params.append(predicted)
+        if since is not None:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('timestamp < ?')
+            params.append(until)
+        if cursor:
+            timestamp, row_id = cursor.split(':', 1)
+            where.append('(timestamp < ? OR (timestamp = ? AND id < ?))')
+            params.extend([float(timestamp), float(timestamp), int(row_id)])
+
+        sql = 'SELECT * FROM predictions'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        rows = await self._run_query(sql, params)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        for row in rows:
+            row['inputs'] = json.loads(row['inputs'])
+        return {
+            'items': rows,
+            'next_cursor': f"{rows[-1]['timestamp']!r}:{rows[-1]['id']}" if more else None
+        }
+
+    async def counts(
+        self,
+        endpoint: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Dict[str, int]:
+        """Number of predictions per predicted class."""
+        where, params = ['predicted IS NOT NULL'], []
+        if endpoint:
+            where.append('endpoint = ?')
+            params.append(endpoint)
+        if since is not None:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('timestamp < ?')
+            params.append(until)
+        sql = (
+            'SELECT predicted, COUNT(*) AS n FROM predictions WHERE ' + ' AND '.join(where) +
+            ' GROUP BY predicted ORDER BY n DESC'
+        )
+        return {row['predicted']: row['n'] for row in await self._run_query(sql, params)}
+
+    async def _run_query(self, sql: str, params: Sequence[Any]) -> List[Dict[str, Any]]:
+        if self._db is None:
+            raise RuntimeError("Prediction history is not enabled")
+        return await asyncio.get_running_loop().run_in_executor(self._io, self._query, sql, params)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.running,
+            "path": self.path,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "last_flush_ms": self.last_flush_ms,
+            "config": {
+                "flush_size": self.flush_size,
+                "flush_interval": self.flush_interval,
+                "queue_size": self.queue_size
+            }
+        }
+
+
+# Shared store; started by the app on startup when history is enabled
+store = HistoryStore(
+    config.HISTORY_DB,
+    flush_size=config.HISTORY_FLUSH_SIZE,
+    flush_interval=config.HISTORY_FLUSH_INTERVAL,
+    queue_size=config.HISTORY_QUEUE_SIZE
+)
+
+
+def record(endpoint: str, inputs: Any, predicted: Optional[str] = None,
+           confidence: Optional[float] = None, value: Optional[float] = None) -> None:
+    """Queue one answered prediction for the history database."""
+    store.record(endpoint, [(inputs, predicted, confidence, value)])
+
+
+def record_many(endpoint: str, rows: Sequence[Tuple[Any, Optional[str], Optional[float], Optional[float]]]) -> None:
+    """Queue the predictions of one batch request as (inputs, predicted, confidence, value) rows."""
+    store.record(endpoint, rows)
+
+
+def history_stats() -> Dict[str, Any]:
+    """Queue, write and drop counters of the history writer."""
+    return store.stats()
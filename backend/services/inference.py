@@ -0,0 +1,330 @@
+"""
+Inference entry points used by the API endpoints.
+Serves repeated single-row requests from the prediction caches, routes the rest
+through the micro-batchers when batching is enabled, and runs every model call
+on the bounded inference executor. Requests that bring the inputs of the
+rule-based engines are answered by them when the model cannot answer in time
+(see services/fallback.py).
+
+Each request picks up the active model handle once, when it arrives, and is
+scored with that handle throughout, so a hot reload never changes the model
+under a request that is already in flight.
+"""
+import functools
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import config
+from models import loading
+from models.handle import ModelHandle
+from models import (
+    predict_crop,
+    predict_crop_batch,
+    recommend_fertilizer,
+    recommend_fertilizer_batch,
+    estimate_yield,
+    estimate_yield_batch
+)
+from .batching import MicroBatcher
+from .cache import MISSING, PredictionCache
+from .errors import ModelNotReadyError
+from .executor import InferenceExecutor
+from .metrics import count_prediction
+from . import fallback, statistics
+
+# Shared pool for all blocking model calls
+executor = InferenceExecutor(
+    max_workers=config.EXECUTOR_WORKERS,
+    max_pending=config.EXECUTOR_MAX_PENDING,
+    kind=config.EXECUTOR_KIND
+)
+
+
+def _run_by_version(batch_fn, items: Sequence[Tuple[Optional[ModelHandle], Dict[str, Any]]]) -> List[Any]:
+    """
+    Score batcher items (handle, fields) with one batch call per model handle.
+
+    Outside a reload every item carries the same handle, so this is one call.
+    """
+    groups: Dict[int, Tuple[Optional[ModelHandle], List[int]]] = {}
+    for position, (handle, _) in enumerate(items):
+        groups.setdefault(id(handle), (handle, []))[1].append(position)
+
+    results: List[Any] = [None] * len(items)
+    for handle, positions in groups.values():
+        scored = batch_fn([items[position][1] for position in positions], handle=handle)
+        for position, result in zip(positions, scored):
+            results[position] = result
+    return results
+
+
+def _make_batcher(name: str, batch_fn) -> MicroBatcher:
+    return MicroBatcher(
+        name,
+        functools.partial(_run_by_version, batch_fn),
+        max_wait_ms=config.BATCH_WINDOW_MS,
+        max_batch_size=config.BATCH_MAX_SIZE,
+        max_queue_size=config.BATCH_QUEUE_SIZE,
+        runner=executor.run
+    )
+
+
+# One coalescer per model
+batchers: Dict[str, MicroBatcher] = {
+    'crop': _make_batcher('crop', predict_crop_batch),
+    'fertilizer': _make_batcher('fertilizer', recommend_fertilizer_batch),
+    'yield': _make_batcher('yield', estimate_yield_batch)
+}
+
+
+def _make_cache(name: str, version) -> PredictionCache:
+    return PredictionCache(
+        name,
+        max_entries=config.CACHE_MAX_ENTRIES,
+        ttl_seconds=config.CACHE_TTL_SECONDS,
+        decimals=config.CACHE_DECIMALS,
+        field_decimals=config.CACHE_FIELD_DECIMALS,
+        version=version
+    )
+
+
+# One result cache per model; the active handle is the model version, so a
+# reload clears the cache
+caches: Dict[str, PredictionCache] = {
+    name: _make_cache(name, functools.partial(loading.current_handle, name))
+    for name in ('crop', 'fertilizer', 'yield')
+}
+
+# Model versions that answered the current request (see track_versions)
+_served_versions: ContextVar[Optional[Dict[str, str]]] = ContextVar('served_versions', default=None)
+
+
+def track_versions() -> Dict[str, str]:
+    """
+    Start collecting the model versions used by the current request.
+
+    Returns the dict that _predict fills in (model name -> version); the
+    response middleware reads it once the endpoint has finished.
+    """
+    served: Dict[str, str] = {}
+    _served_versions.set(served)
+    return served
+
+
+def served_versions() -> Optional[Dict[str, str]]:
+    """Model versions used so far by the current request (None outside a request)."""
+    return _served_versions.get()
+
+
+def _acquire(name: str) -> ModelHandle:
+    """Active handle of a ready model; turns the request away at once (503) otherwise."""
+    handle = loading.current_handle(name)
+    if handle is None or not loading.is_ready(name):
+        raise ModelNotReadyError(loading.not_ready_reason(name))
+    served = _served_versions.get()
+    if served is not None:
+        served[name] = handle.version
+    return handle
+
+
+def _bind(handle: ModelHandle) -> Optional[ModelHandle]:
+    """Handles stay in this process; process-pool workers use their own active model."""
+    return handle if executor.kind == 'thread' else None
+
+
+async def _predict_model(name: str, single_fn, fields: Dict[str, Any]) -> Any:
+    """Answer one request from the cache, the batcher or the executor."""
+    handle = _acquire(name)
+    cache = caches[name] if config.CACHE_ENABLED else None
+    if cache is not None:
+        # Only the key is rounded; the model always sees the request as sent
+        key = cache.key(cache.quantize(fields))
+        result = cache.get(key)
+        if result is not MISSING:
+            return result
+
+    if config.BATCHING_ENABLED:
+        result = await batchers[name].submit((_bind(handle), fields))
+    else:
+        result = await executor.run(single_fn, handle=_bind(handle), **fields)
+
+    if cache is not None:
+        cache.put(key, result, handle)
+    return result
+
+
+async def _route(endpoint: str, model: str, primary, rules) -> Tuple[Any, bool]:
+    """Answer with the model or, failing that, the rules; returns (result, degraded)."""
+    if not config.FALLBACK_ENABLED:
+        return await primary(), False
+    result, degraded = await fallback.routers[endpoint].run(primary, rules)
+    if degraded:
+        served = _served_versions.get()
+        if served is not None:
+            served[model] = fallback.RULES_VERSION
+    return result, degraded
+
+
+async def _predict(name: str, single_fn, fields: Dict[str, Any], fallback_inputs: Any = None) -> Tuple[Any, bool]:
+    """
+    Answer one request; returns (result, degraded).
+
+    With `fallback_inputs` (the request for the rule-based engine) a model
+    that is not ready, fails or misses the endpoint deadline is replaced by
+    the rules.
+    """
+    primary = functools.partial(_predict_model, name, single_fn, fields)
+    if fallback_inputs is None:
+        return await primary(), False
+    return await _route(name, name, primary, functools.partial(fallback.RULES[name], fallback_inputs))
+
+
+def is_degraded(name: str) -> bool:
+    """Whether the current request was answered by the rules instead of model `name`."""
+    served = _served_versions.get()
+    return served is not None and served.get(name) == fallback.RULES_VERSION
+
+
+def _on_model_swap(name: str, handle: ModelHandle) -> None:
+    # Process workers loaded the previous files; start fresh ones
+    if executor.kind == 'process':
+        executor.recycle()
+
+
+loading.add_swap_listener(_on_model_swap)
+
+
+async def run_crop_prediction(fallback_inputs: Any = None, **fields: float) -> Tuple[str, float, List[Dict[str, float]]]:
+    """
+    Predict a crop for one sample (keyword arguments as for predict_crop).
+    
+    `fallback_inputs` is the full request, for the rule-based CropPredictor.
+    The caller records the answer with record_crop_prediction.
+    """
+    result, _ = await _predict('crop', predict_crop, fields, fallback_inputs)
+    return result
+
+
+async def run_crop_prediction_batch(
+    samples: Sequence[Dict[str, float]],
+    top_k: int = 4,
+    fallback_inputs: Optional[Sequence[Any]] = None
+) -> List[Tuple[str, float, List[Dict[str, float]]]]:
+    """
+    Predict crops for an explicit batch of samples (as for predict_crop_batch).
+    
+    `fallback_inputs` are the full samples, for the rule-based CropPredictor.
+    """
+    async def score():
+        handle = _acquire('crop')
+        return await executor.run(predict_crop_batch, samples, top_k=top_k, handle=_bind(handle))
+
+    if fallback_inputs is None:
+        results, degraded = await score(), False
+    else:
+        results, degraded = await _route(
+            'crop_batch', 'crop', score, functools.partial(fallback.crop_batch_rules, fallback_inputs, top_k)
+        )
+    for crop, count in Counter(result[0] for result in results).items():
+        count_prediction('crop', crop, count)
+    statistics.record_crop_batch(results, with_confidence=not degraded)
+    return results
+
+
+async def run_fertilizer_recommendation(fallback_inputs: Any = None, **fields: Any) -> Dict[str, Any]:
+    """
+    Recommend fertilizer for one sample (keyword arguments as for recommend_fertilizer).
+    
+    `fallback_inputs` is the full request, for the rule-based FertilizerRecommender.
+    The caller records the answer with record_fertilizer_recommendation.
+    """
+    result, _ = await _predict('fertilizer', recommend_fertilizer, fields, fallback_inputs)
+    return result
+
+
+async def run_yield_estimation(fallback_inputs: Any = None, **fields: Any) -> float:
+    """
+    Estimate yield for one sample (keyword arguments as for estimate_yield).
+    
+    `fallback_inputs` is the full request, for the rule-based YieldEstimator.
+    The caller records the answer with record_yield_estimation.
+    """
+    result, _ = await _predict('yield', estimate_yield, fields, fallback_inputs)
+    return result
+
+
+# Per-request recording. The run_* functions above may answer several
+# identical requests at once (services/singleflight.py), so each endpoint
+# records its own answer once it has it.
+
+def record_crop_prediction(crop: str, confidence: Optional[float]) -> None:
+    """Count one crop prediction in /metrics and /api/statistics (confidence None if degraded)."""
+    count_prediction('crop', crop)
+    statistics.record_crop(crop, confidence)
+
+
+def record_fertilizer_recommendation(fertilizer: str, confidence: Optional[float]) -> None:
+    """Count one fertilizer recommendation in /metrics and /api/statistics."""
+    count_prediction('fertilizer', fertilizer)
+    statistics.record_fertilizer(fertilizer, confidence)
+
+
+def record_yield_estimation(crop_type: str, estimated_yield: float) -> None:
+    """Count one yield estimate in /api/statistics."""
+    statistics.record_yield(crop_type, estimated_yield)
+
+
+def batching_stats() -> Dict[str, Any]:
+    """Batch-size and wait-time metrics for every model."""
+    return {
+        "enabled": config.BATCHING_ENABLED,
+        "models": {name: batcher.stats() for name, batcher in batchers.items()}
+    }
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters for every prediction cache."""
+    return {
+        "enabled": config.CACHE_ENABLED,
+        "models": {name: cache.stats() for name, cache in caches.items()}
+    }
+
+
+def clear_caches() -> None:
+    """Drop every cached prediction (e.g. after replacing model files)."""
+    for cache in caches.values():
+        cache.clear()
+
+
+def readiness() -> Dict[str, Any]:
+    """Load state, version and timings of every model."""
+    return loading.readiness()
+
+
+def model_versions() -> Dict[str, Optional[str]]:
+    """Active version of every model (None if not loaded)."""
+    return loading.active_versions()
+
+
+def reload_models(names: Optional[Sequence[str]] = None, force: bool = False) -> Dict[str, Any]:
+    """Start a background reload of the given models (default: all)."""
+    started = loading.start_reload(names, force)
+    return {"started": sorted(started), "models": loading.readiness()["models"]}
+
+
+def fallback_stats() -> Dict[str, Any]:
+    """Rule-based fallback rates and circuit breaker state per endpoint."""
+    return fallback.fallback_stats()
+
+
+def executor_stats() -> Dict[str, Any]:
+    """Queue depth and throughput of the inference executor."""
+    return executor.stats()
+
+
+async def shutdown() -> None:
+    """Stop background batch collectors and the inference pool."""
+    for batcher in batchers.values():
+        await batcher.close()
+    executor.shutdown()
@@ -0,0 +1,86 @@
+"""
+Shared vs private memory of the API processes.
+Reads /proc/<pid>/smaps_rollup (Linux) to show how much of each worker's
+resident memory is shared with the master and its siblings.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+# Set by serve.py in the master before workers are forked
+MASTER_PID_ENV = 'AGROSMART_MASTER_PID'
+
+# smaps_rollup fields reported, in kB
+_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty',
+    'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty',
+    'Swap': 'swap'
+}
+
+
+def process_memory(pid: Any = 'self') -> Optional[Dict[str, float]]:
+    """
+    Memory breakdown of one process in MB, or None if it cannot be read.
+
+    `shared` counts pages also mapped by another process (for pre-forked
+    workers: the models inherited from the master); `private` counts pages
+    only this process holds, including copy-on-write copies.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as fh:
+            lines = fh.readlines()
+    except OSError:
+        return None
+
+    kb = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(':') in _FIELDS:
+            kb[_FIELDS[parts[0].rstrip(':')]] = int(parts[1])
+
+    mb = {key: value / 1024 for key, value in kb.items()}
+    mb['shared'] = mb.get('shared_clean', 0.0) + mb.get('shared_dirty', 0.0)
+    mb['private'] = mb.get('private_clean', 0.0) + mb.get('private_dirty', 0.0)
+    return {key: round(value, 2) for key, value in mb.items()}
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct child processes of pid."""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as fh:
+            return [int(child) for child in fh.read().split()]
+    except OSError:
+        return []
+
+
+def memory_report() -> Dict[str, Any]:
+    """
+    Shared/private memory of this worker, and of the master and every worker
+    when running under serve.py.
+    """
+    report: Dict[str, Any] = {
+        'pid': os.getpid(),
+        'preforked': False,
+        'self': process_memory()
+    }
+
+    master = os.getenv(MASTER_PID_ENV)
+    if master and int(master) == os.getppid():
+        master_pid = int(master)
+        master_memory = process_memory(master_pid) or {}
+        workers = [
+            {'pid': pid, **(process_memory(pid) or {})}
+            for pid in child_pids(master_pid)
+        ]
+        report.update({
+            'preforked': True,
+            'master': {'pid': master_pid, **master_memory},
+            'workers': workers,
+            'total_pss': round(
+                master_memory.get('pss', 0.0) + sum(worker.get('pss', 0.0) for worker in workers), 2
+            )
+        })
+    return report
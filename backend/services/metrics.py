@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for the API and the models.
+Request metrics are recorded by api/routing.py, model stage timings arrive
+through the span hooks in models/spans.py, and the inference entry points
+count predicted classes.
+
+With several worker processes (serve.py or `uvicorn --workers`) every process
+writes its samples to PROMETHEUS_MULTIPROC_DIR and /metrics aggregates them.
+The variable must be set before prometheus_client is imported; serve.py sets
+it automatically.
+"""
+import os
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+import config
+from models import spans
+
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+# Predictions take well under a millisecond, so the buckets start at 100 µs
+REQUEST_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+STAGE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+    0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+REQUESTS = Counter(
+    'agrosmart_http_requests_total',
+    'HTTP requests by route and status code',
+    ['route', 'status']
+)
+REQUEST_DURATION = Histogram(
+    'agrosmart_http_request_duration_seconds',
+    'Time from routing to the response body being ready',
+    ['route'],
+    buckets=REQUEST_BUCKETS
+)
+REQUEST_STAGE_DURATION = Histogram(
+    'agrosmart_http_stage_duration_seconds',
+    'Request stages: parse (body parsing and validation), endpoint, serialization',
+    ['route', 'stage'],
+    buckets=STAGE_BUCKETS
+)
+IN_FLIGHT = Gauge(
+    'agrosmart_http_requests_in_flight',
+    'Requests currently being handled',
+    ['route'],
+    multiprocess_mode='livesum'
+)
+ERRORS = Counter(
+    'agrosmart_http_errors_total',
+    'Failed requests by route and error kind',
+    ['route', 'kind']
+)
+MODEL_STAGE_DURATION = Histogram(
+    'agrosmart_model_stage_duration_seconds',
+    'Model call stages: features, scaling, inference, postprocess',
+    ['model', 'stage'],
+    buckets=STAGE_BUCKETS
+)
+PREDICTIONS = Counter(
+    'agrosmart_predictions_total',
+    'Predictions served by model and predicted class',
+    ['model', 'label']
+)
+
+FALLBACKS = Counter(
+    'agrosmart_fallbacks_total',
+    'Requests answered by the rule-based engines, by endpoint and reason',
+    ['endpoint', 'reason']
+)
+COLLAPSED = Counter(
+    'agrosmart_collapsed_requests_total',
+    'Requests answered by an identical request already in flight (single-flight)',
+    ['endpoint']
+)
+CIRCUIT_OPEN = Gauge(
+    'agrosmart_circuit_open',
+    'Whether the endpoint skips its model (circuit breaker open or half-open)',
+    ['endpoint'],
+    multiprocess_mode='max'
+)
+
+
+class RouteMetrics:
+    """Metric children of one route, resolved once instead of per request."""
+
+    __slots__ = ('route', 'duration', 'in_flight', 'parse', 'endpoint', 'serialization', '_responses')
+
+    def __init__(self, route: str):
+        self.route = route
+        self.duration = REQUEST_DURATION.labels(route)
+        self.in_flight = IN_FLIGHT.labels(route)
+        self.parse = REQUEST_STAGE_DURATION.labels(route, 'parse')
+        self.endpoint = REQUEST_STAGE_DURATION.labels(route, 'endpoint')
+        self.serialization = REQUEST_STAGE_DURATION.labels(route, 'serialization')
+        self._responses: Dict[int, Counter] = {}
+
+    def responses(self, status: int) -> Counter:
+        child = self._responses.get(status)
+        if child is None:
+            child = self._responses[status] = REQUESTS.labels(self.route, str(status))
+        return child
+
+    def stage(self, stage: str) -> Histogram:
+        """Histogram child of a request stage: parse, endpoint or serialization."""
+        return getattr(self, stage)
+
+    def error(self, kind: str) -> None:
+        ERRORS.labels(self.route, kind).inc()
+
+
+_model_stages: Dict[Tuple[str, str], Histogram] = {}
+_predictions: Dict[Tuple[str, str], Counter] = {}
+
+
+def _observe_model_stage(model: str, stage: str, seconds: float) -> None:
+    child = _model_stages.get((model, stage))
+    if child is None:
+        child = _model_stages[(model, stage)] = MODEL_STAGE_DURATION.labels(model, stage)
+    child.observe(seconds)
+
+
+def count_prediction(model: str, label: str, count: int = 1) -> None:
+    """Count `count` predictions of class `label` by `model`."""
+    if not config.METRICS_ENABLED:
+        return
+    child = _predictions.get((model, label))
+    if child is None:
+        child = _predictions[(model, label)] = PREDICTIONS.labels(model, label)
+    child.inc(count)
+
+
+def count_fallback(endpoint: str, reason: str) -> None:
+    """Count one request answered by the rules instead of the model."""
+    if config.METRICS_ENABLED:
+        FALLBACKS.labels(endpoint, reason).inc()
+
+
+def count_collapsed(endpoint: str) -> None:
+    """Count one request that shared the answer of an identical one in flight."""
+    if config.METRICS_ENABLED:
+        COLLAPSED.labels(endpoint).inc()
+
+
+def set_circuit_open(endpoint: str, is_open: bool) -> None:
+    if config.METRICS_ENABLED:
+        CIRCUIT_OPEN.labels(endpoint).set(1 if is_open else 0)
+
+
+def is_multiprocess() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, summed over worker processes."""
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+if config.METRICS_ENABLED:
+    spans.add_observer(_observe_model_stage)
@@ -0,0 +1,166 @@
+"""
+On-demand statistical profiler for a running worker.
+A sampler thread wakes up every few milliseconds, reads the current stack of
+every other thread (sys._current_frames) and counts identical stacks. Nothing
+is installed in the profiled code: no tracing hooks and no signal handlers, so
+requests keep running at full speed apart from the GIL time the sampler takes
+(reported as `overhead`).
+
+The result is in the collapsed format read by flamegraph.pl, speedscope and
+inferno: one line per distinct stack, "thread;outer;...;inner <samples>".
+Only one profile runs per worker process at a time.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import config
+
+# Paths in frame labels are shortened to these roots
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_LIBRARY_DIRS = sorted({path + os.sep for path in sys.path if path.endswith('-packages')}, key=len, reverse=True)
+
+
+# Innermost frames of a thread that is blocked waiting for work: (file, function)
+_IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('thread.py', '_worker'),  # concurrent.futures worker blocked on its queue
+}
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running in this process."""
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_BACKEND_DIR):
+        return filename[len(_BACKEND_DIR):]
+    for root in _LIBRARY_DIRS:
+        if filename.startswith(root):
+            return filename[len(root):]
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread in this process for a fixed time."""
+
+    def __init__(self):
+        self.running = False
+        self.profiles = 0
+
+    def _sample(self, seconds: float, interval: float, idle: bool) -> Dict[str, Any]:
+        """Sampler loop (runs on its own thread until `seconds` have passed)."""
+        me = threading.get_ident()
+        labels: Dict[Any, str] = {}
+        idle_codes: Dict[Any, bool] = {}
+        stacks: Dict[Tuple[str, ...], int] = {}
+        samples = 0
+        idle_stacks = 0
+        busy = 0.0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not idle:
+                    leaf = frame.f_code
+                    waiting = idle_codes.get(leaf)
+                    if waiting is None:
+                        waiting = idle_codes[leaf] = (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES
+                    if waiting:
+                        idle_stacks += 1
+                        continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                key = tuple(reversed(stack))
+                stacks[key] = stacks.get(key, 0) + 1
+            samples += 1
+            spent = time.perf_counter() - tick
+            busy += spent
+            time.sleep(max(0.0, interval - spent))
+
+        elapsed = time.perf_counter() - started
+        return {
+            'pid': os.getpid(),
+            'seconds': elapsed,
+            'interval_ms': interval * 1000,
+            'samples': samples,
+            'idle_stacks_skipped': idle_stacks,
+            'overhead': busy / elapsed if elapsed else 0.0,
+            'stacks': {
+                ';'.join(stack): count
+                for stack, count in sorted(stacks.items(), key=lambda item: -item[1])
+            }
+        }
+
+    async def profile(self, seconds: float, interval: float, idle: bool = False) -> Dict[str, Any]:
+        """
+        Sample this process for `seconds`, every `interval` seconds. Threads
+        blocked waiting for work are left out unless `idle` is set.
+
+        The event loop keeps serving requests meanwhile. Raises
+        ProfilerBusyError if a profile is already running here.
+        """
+        # Checked and set on the event loop thread, so no lock is needed
+        if self.running:
+            raise ProfilerBusyError("A profile is already running in this worker")
+        self.running = True
+        loop = asyncio.get_running_loop()
+        done: asyncio.Future = loop.create_future()
+        # Cleared when the sampler stops, even if the caller went away before
+        done.add_done_callback(self._finished)
+
+        def run() -> None:
+            try:
+                result = self._sample(seconds, interval, idle)
+            except BaseException as e:
+                loop.call_soon_threadsafe(done.set_exception, e)
+            else:
+                loop.call_soon_threadsafe(done.set_result, result)
+
+        # A thread of its own: the shared pools may be saturated by the load being profiled
+        try:
+            threading.Thread(target=run, name='profiler', daemon=True).start()
+        except Exception:
+            self.running = False
+            raise
+        return await asyncio.shield(done)
+
+    def _finished(self, done: asyncio.Future) -> None:
+        self.running = False
+        if not done.cancelled() and done.exception() is None:
+            self.profiles += 1
+
+
+def collapsed(result: Dict[str, Any]) -> str:
+    """Stacks in the collapsed ("folded") flame graph format."""
+    return ''.join(f"{stack} {count}\n" for stack, count in result['stacks'].items())
+
+
+# One profiler per worker process
+profiler = SamplingProfiler()
+
+
+async def profile(seconds: float, interval_ms: Optional[float] = None, idle: bool = False) -> Dict[str, Any]:
+    """Profile this worker (see SamplingProfiler.profile); interval defaults to AGROSMART_PROFILER_INTERVAL_MS."""
+    interval_ms = interval_ms if interval_ms is not None else config.PROFILER_INTERVAL_MS
+    return await profiler.profile(seconds, interval_ms / 1000, idle)
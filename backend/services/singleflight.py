@@ -0,0 +1,125 @@
+"""
+Single-flight deduplication of identical prediction requests.
+When a request arrives while an identical one (same endpoint, same validated
+body) is still being answered, it does not start a second inference: it waits
+for the one in flight and gets the same response object. Classrooms and demos
+often send the documented example payload from many clients at once.
+
+Only requests in flight are shared; once answered, repeats go through the
+prediction cache as usual. The inference runs as a task of its own, so the
+shared answer is not lost if the client that started it disconnects.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+import config
+from . import tracing
+from .inference import served_versions
+from .metrics import count_collapsed
+
+
+def request_key(endpoint: str, request: Any) -> Tuple[Hashable, ...]:
+    """
+    Key of a validated request: field values after pydantic coercion, so key
+    order, whitespace and 80 vs 80.0 in the JSON body do not matter.
+    """
+    return (endpoint,) + tuple(request.model_dump().values())
+
+
+class _Flight:
+    __slots__ = ('task', 'served', 'followers')
+
+    def __init__(self, task: asyncio.Task, served):
+        self.task = task
+        self.served = served
+        self.followers = 0
+
+
+class SingleFlight:
+    """Requests in flight by key; only touched from the event loop thread."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+
+        # Metrics, by endpoint
+        self.leaders: Dict[str, int] = {}
+        self.collapsed: Dict[str, int] = {}
+        self.max_followers: Dict[str, int] = {}
+
+    async def run(self, endpoint: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of fn(), shared with every identical request that arrives while it runs."""
+        flight = self._flights.get(key)
+        if flight is not None:
+            return await self._follow(endpoint, flight)
+
+        # The task copies this request's context: its trace and model versions are the leader's
+        task = asyncio.ensure_future(fn())
+        flight = self._flights[key] = _Flight(task, served_versions())
+        task.add_done_callback(lambda _: self._land(endpoint, key, flight))
+        self.leaders[endpoint] = self.leaders.get(endpoint, 0) + 1
+        return await asyncio.shield(task)
+
+    async def _follow(self, endpoint: str, flight: _Flight) -> Any:
+        flight.followers += 1
+        self.collapsed[endpoint] = self.collapsed.get(endpoint, 0) + 1
+        count_collapsed(endpoint)
+        started = time.perf_counter()
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            trace = tracing.current()
+            if trace is not None:
+                trace.add('singleflight', time.perf_counter() - started)
+            # Report the model versions that answered the shared request
+            served = served_versions()
+            if served is not None and flight.served:
+                served.update(flight.served)
+
+    def _land(self, endpoint: str, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.followers > self.max_followers.get(endpoint, 0):
+            self.max_followers[endpoint] = flight.followers
+        # Retrieve the exception here in case every waiting request went away
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = sorted(set(self.leaders) | set(self.collapsed))
+        report = {}
+        for endpoint in endpoints:
+            leaders = self.leaders.get(endpoint, 0)
+            collapsed = self.collapsed.get(endpoint, 0)
+            total = leaders + collapsed
+            report[endpoint] = {
+                "requests": total,
+                "inferences": leaders,
+                "collapsed": collapsed,
+                "collapse_rate": collapsed / total if total else 0.0,
+                "max_collapsed_per_inference": self.max_followers.get(endpoint, 0)
+            }
+        return {
+            "enabled": config.SINGLEFLIGHT_ENABLED,
+            "in_flight": len(self._flights),
+            "endpoints": report
+        }
+
+
+# Requests in flight in this worker
+flights = SingleFlight()
+
+
+async def collapse(endpoint: str, request: Any, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Answer `request` to `endpoint` with fn(), or share the answer of an
+    identical request already in flight.
+    """
+    if not config.SINGLEFLIGHT_ENABLED:
+        return await fn()
+    return await flights.run(endpoint, request_key(endpoint, request), fn)
+
+
+def singleflight_stats() -> Dict[str, Any]:
+    """Requests answered by their own inference and requests collapsed into another one."""
+    return flights.stats()
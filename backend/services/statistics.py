@@ -0,0 +1,290 @@
+"""
+Live prediction statistics for GET /api/statistics (the dashboard counters).
+
+Every worker process keeps its own shard: totals per endpoint, predicted crop
+and fertilizer distributions, confidence and yield sums, per-minute request
+counts and the latest yield estimates. Shards are only updated from the event
+loop thread, so recording a prediction is a few dict increments with no lock.
+
+Every few seconds a worker folds what it recorded since the last flush into
+the snapshot file, under a file lock, and takes the merged totals back. The
+file therefore holds the totals of every worker, past and present, and the
+numbers survive restarts. Other workers' predictions show up after their next
+flush.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = ('crop', 'crop_batch', 'fertilizer', 'yield')
+
+
+class Aggregates:
+    """Counters and windows for one period; shards, snapshots and totals all use this."""
+
+    __slots__ = ('requests', 'labels', 'confidence', 'yields', 'minutes', 'recent_yields', 'since')
+
+    def __init__(self):
+        # endpoint -> requests, model -> label -> predictions
+        self.requests: Dict[str, int] = {}
+        self.labels: Dict[str, Dict[str, int]] = {'crop': {}, 'fertilizer': {}}
+        # model -> [confidence sum, predictions with a confidence]; yields -> [kg/ha sum, estimates]
+        self.confidence: Dict[str, List[float]] = {'crop': [0.0, 0], 'fertilizer': [0.0, 0]}
+        self.yields: List[float] = [0.0, 0]
+        # unix minute -> endpoint -> requests, for the rolling window
+        self.minutes: Dict[int, Dict[str, int]] = {}
+        # [timestamp, crop_type, kg/ha], oldest first
+        self.recent_yields: List[List[Any]] = []
+        self.since: Optional[float] = None
+
+    def is_empty(self) -> bool:
+        return not self.requests
+
+    def count(self, endpoint: str, n: int = 1) -> None:
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + n
+        minute = self.minutes.setdefault(int(time.time() // 60), {})
+        minute[endpoint] = minute.get(endpoint, 0) + n
+        if self.since is None:
+            self.since = time.time()
+
+    def label(self, model: str, label: str, confidence: Optional[float], n: int = 1) -> None:
+        labels = self.labels[model]
+        labels[label] = labels.get(label, 0) + n
+        if confidence is not None:
+            totals = self.confidence[model]
+            totals[0] += confidence
+            totals[1] += n
+
+    def merge(self, other: 'Aggregates') -> 'Aggregates':
+        """Add `other` into this one (returns self)."""
+        for endpoint, n in other.requests.items():
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + n
+        for model, labels in other.labels.items():
+            mine = self.labels.setdefault(model, {})
+            for label, n in labels.items():
+                mine[label] = mine.get(label, 0) + n
+        for model, (total, n) in other.confidence.items():
+            mine = self.confidence.setdefault(model, [0.0, 0])
+            mine[0] += total
+            mine[1] += n
+        self.yields[0] += other.yields[0]
+        self.yields[1] += other.yields[1]
+        for minute, counts in other.minutes.items():
+            mine = self.minutes.setdefault(minute, {})
+            for endpoint, n in counts.items():
+                mine[endpoint] = mine.get(endpoint, 0) + n
+        if other.recent_yields:
+            self.recent_yields = sorted(self.recent_yields + other.recent_yields)[-config.STATS_RECENT_YIELDS:]
+        if other.since is not None:
+            self.since = other.since if self.since is None else min(self.since, other.since)
+        return self
+
+    def prune(self, now: float) -> None:
+        """Drop per-minute counts that have left the window."""
+        oldest = int(now // 60) - config.STATS_WINDOW_MINUTES
+        for minute in [minute for minute in self.minutes if minute <= oldest]:
+            del self.minutes[minute]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'labels': self.labels,
+            'confidence': self.confidence,
+            'yields': self.yields,
+            'minutes': {str(minute): counts for minute, counts in self.minutes.items()},
+            'recent_yields': self.recent_yields,
+            'since': self.since
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Aggregates':
+        aggregates = cls()
+        aggregates.requests = dict(data.get('requests', {}))
+        aggregates.labels.update(data.get('labels', {}))
+        aggregates.confidence.update(data.get('confidence', {}))
+        aggregates.yields = list(data.get('yields', [0.0, 0]))
+        aggregates.minutes = {int(minute): counts for minute, counts in data.get('minutes', {}).items()}
+        aggregates.recent_yields = list(data.get('recent_yields', []))
+        aggregates.since = data.get('since')
+        return aggregates
+
+    def copy(self) -> 'Aggregates':
+        return Aggregates().merge(self)
+
+
+# Merged totals as of the last flush, what was handed to the running flush and
+# what has been recorded since; all three are only touched on the event loop
+_totals = Aggregates()
+_flushing: Optional[Aggregates] = None
+_shard = Aggregates()
+_flusher: Optional[asyncio.Task] = None
+
+
+def record_crop(crop: str, confidence: Optional[float]) -> None:
+    if config.STATS_ENABLED:
+        _shard.count('crop')
+        _shard.label('crop', crop, confidence)
+
+
+def record_crop_batch(results, with_confidence: bool = True) -> None:
+    """
+    Record (crop, confidence, alternatives) rows from one batch request
+    (with_confidence=False leaves them out of the mean confidence).
+    """
+    if config.STATS_ENABLED:
+        _shard.count('crop_batch')
+        for crop, confidence, _ in results:
+            _shard.label('crop', crop, confidence if with_confidence else None)
+
+
+def record_fertilizer(fertilizer: str, confidence: Optional[float]) -> None:
+    if config.STATS_ENABLED:
+        _shard.count('fertilizer')
+        _shard.label('fertilizer', fertilizer, confidence)
+
+
+def record_yield(crop_type: str, estimated_yield: float) -> None:
+    if config.STATS_ENABLED:
+        _shard.count('yield')
+        _shard.yields[0] += estimated_yield
+        _shard.yields[1] += 1
+        recent = _shard.recent_yields
+        recent.append([time.time(), crop_type, estimated_yield])
+        if len(recent) > config.STATS_RECENT_YIELDS:
+            del recent[0]
+
+
+def _read_snapshot(path: str) -> Aggregates:
+    try:
+        with open(path) as f:
+            return Aggregates.from_dict(json.load(f))
+    except FileNotFoundError:
+        return Aggregates()
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️  Ignoring unreadable statistics snapshot {path}: {e}")
+        return Aggregates()
+
+
+def _write_snapshot(path: str, aggregates: Aggregates) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(aggregates.to_dict(), f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def merge_into_snapshot(delta: Aggregates, path: Optional[str] = None) -> Aggregates:
+    """
+    Add `delta` to the snapshot file and return the merged totals.
+
+    Runs under an exclusive lock on `<path>.lock`, so workers flushing at the
+    same time never lose each other's counts. Blocking: call off the event loop.
+    """
+    path = path or config.STATS_FILE
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            totals = _read_snapshot(path).merge(delta)
+            totals.prune(time.time())
+            if not delta.is_empty():
+                _write_snapshot(path, totals)
+            return totals
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+async def flush() -> None:
+    """Fold what this worker recorded since the last flush into the totals."""
+    global _totals, _flushing, _shard
+    if _flushing is not None:
+        return
+    _flushing, _shard = _shard, Aggregates()
+    try:
+        if config.STATS_FILE:
+            _totals = await asyncio.get_running_loop().run_in_executor(None, merge_into_snapshot, _flushing)
+        else:
+            _totals.merge(_flushing).prune(time.time())
+    except Exception as e:
+        # Keep the counts for the next attempt
+        logger.error(f"❌ Failed to save statistics snapshot: {e}")
+        _shard = _flushing.merge(_shard)
+    finally:
+        _flushing = None
+
+
+async def _flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(config.STATS_FLUSH_SECONDS)
+        await flush()
+
+
+async def start() -> None:
+    """Load the saved totals and start the periodic flush (call on the event loop)."""
+    global _flusher
+    if not config.STATS_ENABLED or _flusher is not None:
+        return
+    await flush()
+    _flusher = asyncio.get_running_loop().create_task(_flush_periodically())
+
+
+async def stop() -> None:
+    """Stop the periodic flush and save what is left."""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        _flusher = None
+        await flush()
+
+
+def prediction_statistics() -> Dict[str, Any]:
+    """
+    Totals and rolling-window figures for the dashboard.
+
+    Combines the merged totals from the last flush with this worker's
+    unflushed counts.
+    """
+    current = _totals.copy()
+    if _flushing is not None:
+        current.merge(_flushing)
+    current.merge(_shard)
+    now = time.time()
+    current.prune(now)
+
+    labels = current.labels
+    crops = sum(labels.get('crop', {}).values())
+    fertilizers = sum(labels.get('fertilizer', {}).values())
+    yields = int(current.yields[1])
+
+    window: Dict[str, int] = {}
+    for counts in current.minutes.values():
+        for endpoint, n in counts.items():
+            window[endpoint] = window.get(endpoint, 0) + n
+
+    return {
+        'total_predictions': crops + fertilizers + yields,
+        'crops': crops,
+        'fertilizers': fertilizers,
+        'yields': yields,
+        'endpoints': {endpoint: current.requests.get(endpoint, 0) for endpoint in ENDPOINTS},
+        'crop_distribution': dict(sorted(labels.get('crop', {}).items(), key=lambda item: -item[1])),
+        'fertilizer_distribution': dict(sorted(labels.get('fertilizer', {}).items(), key=lambda item: -item[1])),
+        'mean_confidence': {
+            model: (total / n if n else None) for model, (total, n) in current.confidence.items()
+        },
+        'mean_yield': current.yields[0] / yields if yields else None,
+        'recent_yields': [
+            {'timestamp': timestamp, 'crop_type': crop_type, 'estimated_yield': value}
+            for timestamp, crop_type, value in reversed(current.recent_yields)
+        ],
+        'window_minutes': config.STATS_WINDOW_MINUTES,
+        'window_requests': {endpoint: window.get(endpoint, 0) for endpoint in ENDPOINTS},
+        'since': current.since
+    }
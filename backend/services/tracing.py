@@ -0,0 +1,162 @@
+"""
+Per-request stage timings.
+Every HTTP request gets a Trace (see api/middleware.py) that collects how long
+it spent in each stage: body parsing and validation, waiting for an identical
+request in flight (services/singleflight.py), waiting for a micro-batch, the
+model stages reported through models/spans.py (features, scaling, inference,
+postprocess), the rule-based fallback (services/fallback.py), the endpoint as
+a whole and response serialization. The breakdown is sent back in a
+Server-Timing header, and requests slower than AGROSMART_SLOW_REQUEST_MS keep
+theirs in a bounded in-memory log read by GET /api/admin/slow-requests.
+
+The trace lives in a context variable. The inference executor copies the
+request's context into its worker thread, and the micro-batcher hands the
+spans of a batch to every request in it. Process-pool workers report no
+model stages.
+"""
+import os
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+import config
+from models import spans
+
+# Display order; stages not listed here follow in the order they were recorded
+STAGE_ORDER = (
+    'parse', 'singleflight', 'batch_wait', 'features', 'scaling', 'inference', 'postprocess',
+    'fallback', 'endpoint', 'serialization'
+)
+
+ENABLED = config.SERVER_TIMING or config.SLOW_REQUEST_BUFFER > 0
+
+
+class Trace:
+    """Seconds spent in each stage of one request."""
+
+    __slots__ = ('started', 'stages')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, in display order."""
+        stages = self.stages
+        ordered = [stage for stage in STAGE_ORDER if stage in stages]
+        ordered += [stage for stage in stages if stage not in STAGE_ORDER]
+        return {stage: round(stages[stage] * 1000, 3) for stage in ordered}
+
+
+class _Fanout:
+    """Adds every stage to the traces of all requests scored in one micro-batch."""
+
+    __slots__ = ('traces',)
+
+    def __init__(self, traces: Sequence[Trace]):
+        self.traces = traces
+
+    def add(self, stage: str, seconds: float) -> None:
+        for trace in self.traces:
+            trace.add(stage, seconds)
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar('request_trace', default=None)
+
+
+def start() -> Optional[Trace]:
+    """Start timing the current request (None when tracing is off)."""
+    if not ENABLED:
+        return None
+    trace = Trace()
+    _current.set(trace)
+    return trace
+
+
+def current() -> Optional[Trace]:
+    """Trace of the current request, if it is being traced."""
+    return _current.get()
+
+
+def attach(traces: Sequence[Trace]) -> Token:
+    """Send the spans recorded in this context to `traces` (a micro-batch's requests)."""
+    return _current.set(_Fanout(traces) if traces else None)
+
+
+def detach(token: Token) -> None:
+    _current.reset(token)
+
+
+def _observe_model_stage(model: str, stage: str, seconds: float) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def server_timing(trace: Trace, total: float) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    entries = [f"{stage};dur={ms:.3f}" for stage, ms in trace.breakdown_ms().items()]
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries)
+
+
+class SlowRequestLog:
+    """
+    The most recent requests that took at least `threshold_ms`, with their
+    stage breakdown. Holds at most `capacity` entries (oldest dropped);
+    only touched from the event loop thread.
+    """
+
+    def __init__(self, threshold_ms: float, capacity: int):
+        self.threshold_ms = max(0.0, threshold_ms)
+        self.capacity = max(0, capacity)
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=self.capacity)
+        self.recorded = 0
+
+    def observe(self, method: str, path: str, status: int, total: float, trace: Trace,
+                versions: Optional[Dict[str, str]] = None) -> None:
+        """Keep the request if it was slow."""
+        total_ms = total * 1000
+        if not self.capacity or total_ms < self.threshold_ms:
+            return
+        self.recorded += 1
+        self._entries.append({
+            'timestamp': time.time(),
+            'method': method,
+            'path': path,
+            'status': status,
+            'total_ms': round(total_ms, 3),
+            'stages': trace.breakdown_ms(),
+            'model_versions': dict(versions) if versions else {}
+        })
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Kept requests, newest first."""
+        entries = list(reversed(self._entries))
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'threshold_ms': self.threshold_ms,
+            'capacity': self.capacity,
+            'recorded': self.recorded,
+            'kept': len(self._entries)
+        }
+
+
+# Slow requests seen by this worker
+slow_requests = SlowRequestLog(config.SLOW_REQUEST_MS, config.SLOW_REQUEST_BUFFER)
+
+if ENABLED:
+    spans.add_observer(_observe_model_stage)
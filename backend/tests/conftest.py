@@ -0,0 +1,11 @@
+"""
+Shared setup for the backend tests.
+
+Run from backend/:
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Import the backend modules (config, models, services) as the app does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
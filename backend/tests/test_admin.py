@@ -0,0 +1,60 @@
+"""
+The admin endpoints are closed unless an admin token is configured.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import config
+from api.admin import router
+
+ROUTES = [
+    ('post', '/api/admin/reload'),
+    ('get', '/api/admin/slow-requests'),
+    ('post', '/api/admin/profile?seconds=0.05')
+]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.mark.parametrize('method, path', ROUTES)
+def test_disabled_without_a_token(client, monkeypatch, method, path):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', '')
+    response = getattr(client, method)(path, headers={'X-Admin-Token': ''})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('method, path', ROUTES)
+@pytest.mark.parametrize('token', [None, 'wrong'])
+def test_token_required(client, monkeypatch, method, path, token):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', 'secret')
+    headers = {'X-Admin-Token': token} if token is not None else {}
+    assert getattr(client, method)(path, headers=headers).status_code == 403
+
+
+def test_token_accepted(client, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', 'secret')
+    response = client.get('/api/admin/slow-requests', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert 'requests' in response.json()
+
+
+def test_profiler_disabled(client, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(config, 'PROFILER_ENABLED', False)
+    response = client.post('/api/admin/profile?seconds=0.05', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 404
+
+
+def test_profiler_needs_the_token_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(config, 'PROFILER_ENABLED', True)
+    assert client.post('/api/admin/profile?seconds=0.05').status_code == 403
+    response = client.post('/api/admin/profile?seconds=0.05', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert 'X-Profile-Pid' in response.headers
@@ -0,0 +1,141 @@
+"""
+MicroBatcher: window and size flushes, per-caller errors and the bounded queue.
+"""
+import asyncio
+import time
+
+import pytest
+
+from services.batching import MicroBatcher, QueueFullError
+from services.errors import InferenceUnavailableError
+
+
+class Recorder:
+    """Batch function that doubles its items and remembers every call."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, items):
+        self.batches.append((time.perf_counter(), list(items)))
+        if self.fail_on is not None and self.fail_on in items:
+            raise ValueError(f"bad item {self.fail_on}")
+        return [item * 2 for item in items]
+
+
+def run(batcher, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await batcher.close()
+    return asyncio.run(main())
+
+
+def test_requests_within_the_window_share_one_batch():
+    fn = Recorder()
+    batcher = MicroBatcher('test', fn, max_wait_ms=30, max_batch_size=64)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(5)])
+        return started, results
+
+    started, results = run(batcher, scenario)
+    assert results == [0, 2, 4, 6, 8]
+    assert [items for _, items in fn.batches] == [[0, 1, 2, 3, 4]]
+    # Not full, so the batch waited for the window to close
+    assert fn.batches[0][0] - started >= 0.025
+    stats = batcher.stats()
+    assert (stats['requests'], stats['batches'], stats['mean_batch_size']) == (5, 1, 5.0)
+    assert stats['batch_size_histogram']['le_8'] == 1
+
+
+def test_full_batch_is_flushed_before_the_window_closes():
+    fn = Recorder()
+    batcher = MicroBatcher('test', fn, max_wait_ms=2000, max_batch_size=4)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(8)])
+        return started, results
+
+    started, results = run(batcher, scenario)
+    assert results == [i * 2 for i in range(8)]
+    assert [items for _, items in fn.batches] == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert fn.batches[-1][0] - started < 1
+
+
+def test_separate_windows_make_separate_batches():
+    fn = Recorder()
+    batcher = MicroBatcher('test', fn, max_wait_ms=5, max_batch_size=64)
+
+    async def scenario():
+        first = await batcher.submit(1)
+        second = await batcher.submit(2)
+        return first, second
+
+    assert run(batcher, scenario) == (2, 4)
+    assert [items for _, items in fn.batches] == [[1], [2]]
+
+
+def test_an_error_only_reaches_its_own_caller():
+    fn = Recorder(fail_on=3)
+    batcher = MicroBatcher('test', fn, max_wait_ms=10, max_batch_size=64)
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)], return_exceptions=True)
+
+    results = run(batcher, scenario)
+    assert results[:3] == [0, 2, 4] and results[4] == 8
+    assert isinstance(results[3], ValueError) and str(results[3]) == 'bad item 3'
+    # The failed batch, then each item on its own
+    assert [items for _, items in fn.batches] == [[0, 1, 2, 3, 4], [0], [1], [2], [3], [4]]
+    assert batcher.stats()['errors'] == 1
+
+
+def test_error_of_a_single_item_batch():
+    fn = Recorder(fail_on=1)
+    batcher = MicroBatcher('test', fn, max_wait_ms=1)
+
+    async def scenario():
+        await batcher.submit(1)
+
+    with pytest.raises(ValueError, match='bad item 1'):
+        run(batcher, scenario)
+    assert len(fn.batches) == 1
+
+
+def test_queue_depth_is_bounded():
+    fn = Recorder()
+    batcher = MicroBatcher('test', fn, max_wait_ms=10, max_batch_size=64, max_queue_size=2)
+
+    async def scenario():
+        # All submitted before the collector gets to run
+        return await asyncio.gather(*[batcher.submit(i) for i in range(5)], return_exceptions=True)
+
+    results = run(batcher, scenario)
+    assert results[:2] == [0, 2]
+    assert all(isinstance(result, QueueFullError) for result in results[2:])
+    # A full queue asks the client to retry (503)
+    assert issubclass(QueueFullError, InferenceUnavailableError)
+    stats = batcher.stats()
+    assert (stats['rejected'], stats['requests']) == (3, 2)
+
+
+def test_runner_executes_the_batch():
+    fn = Recorder()
+    ran = []
+
+    async def runner(batch_fn, items):
+        ran.append(list(items))
+        return batch_fn(items)
+
+    batcher = MicroBatcher('test', fn, max_wait_ms=5, runner=runner)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert run(batcher, scenario) == [2, 4]
+    assert ran == [[1, 2]]
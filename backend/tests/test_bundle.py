@@ -0,0 +1,127 @@
+"""
+Model bundles: a forest written with write_bundle and read back through a
+memory map must predict exactly like the fitted sklearn forest.
+"""
+import mmap
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from models.bundle import read_bundle, write_bundle
+
+SCALES = np.array([100.0, 40.0, 1.0, 1000.0])
+OFFSETS = np.array([80.0, 40.0, 7.0, 1200.0])
+FEATURES = ['N', 'P', 'ph', 'rainfall']
+CROPS = np.array(['maize', 'rice', 'wheat'])
+
+
+def _features(rng: np.random.Generator, n_rows: int) -> np.ndarray:
+    return OFFSETS + rng.standard_normal((n_rows, len(SCALES))) * SCALES
+
+
+@pytest.fixture(scope='module', params=['classifier', 'regressor'])
+def fitted(request):
+    rng = np.random.default_rng(0)
+    X = _features(rng, 600)
+    scaler = StandardScaler().fit(X)
+    if request.param == 'classifier':
+        y = CROPS[(X[:, 0] > 80).astype(int) + (X[:, 3] > 1500)]
+        model = RandomForestClassifier(n_estimators=10, max_depth=8, random_state=0)
+    else:
+        y = X[:, 0] * 0.3 + np.sin(X[:, 2]) * 50 + rng.standard_normal(600)
+        model = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=0)
+    return model.fit(scaler.transform(X), y), scaler
+
+
+@pytest.fixture
+def written(fitted, tmp_path):
+    model, scaler = fitted
+    path = str(tmp_path / 'test_model.bundle')
+    encoders = {'soil_type': LabelEncoder().fit(['Clay Soil', 'Sandy Soil'])}
+    manifest = write_bundle(
+        path, 'test', model, scaler, FEATURES, encoders=encoders, target='label', metrics={'accuracy': 0.9}
+    )
+    return path, manifest
+
+
+def reference(fitted, X):
+    model, scaler = fitted
+    return model.predict(scaler.transform(X))
+
+
+def test_mapped_bundle_predicts_like_sklearn(fitted, written):
+    path, _ = written
+    bundle = read_bundle(path, mmap_mode='r', verify=True)
+    X = _features(np.random.default_rng(42), 2000)
+    expected = reference(fitted, X)
+    assert np.array_equal(bundle.compiled_forest().predict(X), expected)
+    # Unfolded thresholds take scaled inputs
+    unfolded = bundle.compiled_forest(folded=False)
+    assert np.array_equal(unfolded.predict(bundle.scaler.transform(X)), expected)
+    # The sklearn estimator rebuilt from the arrays agrees too
+    assert not bundle.model.is_built
+    assert np.array_equal(bundle.model.predict(bundle.scaler.transform(X)), expected)
+
+
+def buffer_of(array: np.ndarray):
+    """The object an array's memory comes from (np.frombuffer wraps it in a memoryview)."""
+    while isinstance(array, np.ndarray):
+        array = array.base
+    return array.obj if isinstance(array, memoryview) else array
+
+
+def test_mapped_arrays_are_file_backed(written):
+    path, _ = written
+    mapped = read_bundle(path, mmap_mode='r')
+    array = mapped.arrays['threshold']
+    assert not array.flags.writeable
+    assert isinstance(buffer_of(array), mmap.mmap)
+
+    in_memory = read_bundle(path, mmap_mode=None)
+    assert isinstance(buffer_of(in_memory.arrays['threshold']), bytes)
+    for key, value in mapped.arrays.items():
+        assert np.array_equal(value, in_memory.arrays[key])
+        assert value.ctypes.data % 64 == 0, key
+
+
+def test_metadata_round_trip(fitted, written):
+    model, scaler = fitted
+    path, manifest = written
+    bundle = read_bundle(path)
+    assert bundle.version == manifest['version']
+    assert bundle.features == FEATURES
+    assert bundle.target == 'label'
+    assert bundle.metrics == {'accuracy': 0.9}
+    assert list(bundle.encoders['soil_type'].classes_) == ['Clay Soil', 'Sandy Soil']
+    assert list(bundle.encoders['soil_type'].transform(['Sandy Soil'])) == [1]
+    if hasattr(model, 'classes_'):
+        assert list(bundle.classes) == list(model.classes_)
+    else:
+        assert bundle.classes is None
+    X = _features(np.random.default_rng(1), 50)
+    assert np.array_equal(bundle.scaler.transform(X), scaler.transform(X))
+
+
+def test_corrupted_arrays_fail_verification(written):
+    path, _ = written
+    with open(path, 'r+b') as fh:
+        fh.seek(-1, 2)
+        last = fh.read(1)
+        fh.seek(-1, 2)
+        fh.write(bytes([last[0] ^ 0xFF]))
+    read_bundle(path)  # not checked unless asked
+    with pytest.raises(ValueError, match='hash'):
+        read_bundle(path, verify=True)
+
+
+def test_not_a_bundle(tmp_path):
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(b'\x80\x04not a bundle')
+    with pytest.raises(ValueError, match='not a model bundle'):
+        read_bundle(str(path))
+
+
+def test_write_leaves_no_temporary_file(written, tmp_path):
+    assert sorted(item.name for item in tmp_path.iterdir()) == ['test_model.bundle']
@@ -0,0 +1,141 @@
+"""
+PredictionCache: LRU eviction, expiry, invalidation on model reload, counters,
+and the rounding that only applies to the key.
+"""
+import asyncio
+
+import pytest
+
+import config
+from services import cache as cache_module
+from services import inference
+from services.cache import MISSING, PredictionCache
+
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+
+def test_hit_and_miss_counters():
+    cache = PredictionCache('test')
+    assert cache.get('a') is MISSING
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('a') == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (2, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache('test', max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')          # b is now the least recently used
+    cache.put('c', 3)
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_zero_entries_disables_the_cache():
+    cache = PredictionCache('test', max_entries=0)
+    cache.put('a', 1)
+    assert not cache.enabled
+    assert cache.get('a') is MISSING
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache('test', ttl_seconds=10)
+    cache.put('a', 1)
+    clock.now += 10
+    assert cache.get('a') == 1
+    clock.now += 0.5
+    assert cache.get('a') is MISSING
+    stats = cache.stats()
+    assert (stats['expirations'], stats['misses'], stats['size']) == (1, 1, 0)
+
+
+def test_no_ttl_means_no_expiry(clock):
+    cache = PredictionCache('test')
+    cache.put('a', 1)
+    clock.now += 1e9
+    assert cache.get('a') == 1
+
+
+def test_model_reload_invalidates_entries():
+    handles = [object()]
+    cache = PredictionCache('test', version=lambda: handles[-1])
+    cache.put('a', 1, handles[-1])
+    handles.append(object())
+    assert cache.get('a') is MISSING
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_results_of_a_replaced_model_are_not_stored():
+    handles = [object()]
+    cache = PredictionCache('test', version=lambda: handles[-1])
+    old = handles[-1]
+    handles.append(object())
+    cache.put('a', 1, old)
+    assert cache.get('a') is MISSING
+    cache.put('a', 2, handles[-1])
+    assert cache.get('a') == 2
+
+
+def test_clear_counts_an_invalidation():
+    cache = PredictionCache('test')
+    cache.put('a', 1)
+    cache.clear()
+    assert cache.get('a') is MISSING
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_quantize_rounds_floats_per_field():
+    cache = PredictionCache('test', decimals=2, field_decimals={'rainfall': 0, 'ph': -1})
+    quantized = cache.quantize({'n': 80.123, 'rainfall': 101.4, 'ph': 6.54321, 'crop': 'Rice', 'k': 40})
+    assert quantized == {'n': 80.12, 'rainfall': 101.0, 'ph': 6.54321, 'crop': 'Rice', 'k': 40}
+    assert cache.key(quantized) == cache.key(dict(reversed(list(quantized.items()))))
+
+
+class FakeHandle:
+    version = 'test-version'
+
+
+def test_model_sees_unrounded_inputs(monkeypatch):
+    handle = FakeHandle()
+    monkeypatch.setattr(config, 'CACHE_ENABLED', True)
+    monkeypatch.setattr(config, 'BATCHING_ENABLED', False)
+    monkeypatch.setattr(inference.loading, 'current_handle', lambda name: handle)
+    monkeypatch.setattr(inference.loading, 'is_ready', lambda name: True)
+    monkeypatch.setitem(inference.caches, 'crop', PredictionCache('crop', decimals=2, version=lambda: handle))
+
+    seen = []
+
+    def predict(handle=None, **fields):
+        seen.append(fields)
+        return fields['n_level']
+
+    async def scenario():
+        first = await inference._predict_model('crop', predict, {'n_level': 80.1234})
+        # Same key once rounded: answered from the cache
+        second = await inference._predict_model('crop', predict, {'n_level': 80.1249})
+        return first, second
+
+    assert asyncio.run(scenario()) == (80.1234, 80.1234)
+    assert seen == [{'n_level': 80.1234}]
+    assert inference.caches['crop'].stats()['hits'] == 1
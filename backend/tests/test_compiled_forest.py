@@ -0,0 +1,155 @@
+"""
+The compiled NumPy forest must give exactly what sklearn gives.
+
+Small forests are trained here on synthetic data whose features differ in scale
+by orders of magnitude, like ppm nutrient levels next to pH, so the tests do
+not depend on trained_models/.
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+import config
+from models.compiled_forest import (
+    CompiledForest,
+    ScaledModel,
+    boundary_probe,
+    compile_for_inference,
+    fold_thresholds,
+    matches_sklearn
+)
+
+SCALES = np.array([100.0, 40.0, 1.0, 0.01, 1000.0])
+OFFSETS = np.array([80.0, 40.0, 7.0, 0.5, 1200.0])
+
+
+def _features(rng: np.random.Generator, n_rows: int) -> np.ndarray:
+    return OFFSETS + rng.standard_normal((n_rows, len(SCALES))) * SCALES
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    rng = np.random.default_rng(0)
+    X = _features(rng, 800)
+    y = (X[:, 0] > 80).astype(int) + 2 * (X[:, 3] > 0.5) + (X[:, 4] > 1500)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=25, max_depth=10, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+@pytest.fixture(scope='module')
+def regressor():
+    rng = np.random.default_rng(1)
+    X = _features(rng, 800)
+    y = X[:, 0] * 0.3 + np.sin(X[:, 2]) * 50 + X[:, 3] * 400 + rng.standard_normal(800)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestRegressor(n_estimators=25, max_depth=10, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+@pytest.fixture(params=['classifier', 'regressor'])
+def forest(request):
+    return request.getfixturevalue(request.param)
+
+
+def random_inputs(scaler, n_rows: int = 3000, seed: int = 42) -> np.ndarray:
+    """Raw inputs spread well beyond the training range."""
+    rng = np.random.default_rng(seed)
+    return scaler.inverse_transform(rng.standard_normal((n_rows, len(SCALES))) * 3)
+
+
+def on_scaled_thresholds(compiled: CompiledForest, X_scaled: np.ndarray, n_nodes: int = 500) -> np.ndarray:
+    """
+    Scaled rows with one feature on a split threshold, as sklearn sees it
+    (float32), and one float32 step either side of it.
+    """
+    rng = np.random.default_rng(7)
+    splits = np.flatnonzero(np.isfinite(compiled.threshold))
+    nodes = rng.choice(splits, size=min(n_nodes, len(splits)), replace=False)
+    rows = X_scaled[rng.integers(0, len(X_scaled), size=3 * len(nodes))].copy()
+    for i, node in enumerate(nodes):
+        at = np.float32(compiled.threshold[node])
+        column = compiled.feature[node]
+        rows[3 * i, column] = at
+        rows[3 * i + 1, column] = np.nextafter(at, np.float32(-np.inf))
+        rows[3 * i + 2, column] = np.nextafter(at, np.float32(np.inf))
+    return rows
+
+
+def test_compiled_matches_sklearn_on_random_inputs(forest):
+    model, scaler = forest
+    engine = ScaledModel(CompiledForest.from_sklearn(model), scaler)
+    assert matches_sklearn(engine, model, scaler, random_inputs(scaler))
+
+
+def test_compiled_matches_sklearn_on_thresholds(forest):
+    model, scaler = forest
+    compiled = CompiledForest.from_sklearn(model)
+    X = on_scaled_thresholds(compiled, scaler.transform(random_inputs(scaler)))
+    if compiled.is_classifier:
+        assert np.array_equal(compiled.predict_proba(X), model.predict_proba(X))
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_large_batches_go_to_sklearn(forest):
+    model, scaler = forest
+    compiled = CompiledForest.from_sklearn(model, max_rows=16)
+    X = scaler.transform(random_inputs(scaler, n_rows=100))
+    assert compiled.fallback is model
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+    assert np.array_equal(compiled.predict(X[:16]), model.predict(X[:16]))
+
+
+def test_folded_thresholds_split_where_scaling_does(classifier):
+    model, scaler = classifier
+    compiled = CompiledForest.from_sklearn(model)
+    split = np.isfinite(compiled.threshold)
+    folded = fold_thresholds(compiled.threshold, compiled.feature, scaler.mean_, scaler.scale_)[split]
+    feature = compiled.feature[split]
+    threshold = compiled.threshold[split]
+
+    def goes_left(x):
+        return ((x - scaler.mean_[feature]) / scaler.scale_[feature]).astype(np.float32) <= threshold
+
+    # The folded threshold is the last raw value sent left
+    assert goes_left(folded).all()
+    assert not goes_left(np.nextafter(folded, np.inf)).any()
+
+
+def test_folded_matches_sklearn(forest):
+    model, scaler = forest
+    folded = CompiledForest.from_sklearn(model).fold_scaler(scaler)
+    X = random_inputs(scaler)
+    assert folded.raw_input
+    assert matches_sklearn(folded, model, scaler, X)
+    assert matches_sklearn(folded, model, scaler, boundary_probe(folded, X, n_nodes=1000))
+
+
+def test_folded_matches_unfolded(forest):
+    model, scaler = forest
+    compiled = CompiledForest.from_sklearn(model)
+    unfolded = ScaledModel(compiled, scaler)
+    folded = compiled.fold_scaler(scaler)
+    X = random_inputs(scaler, seed=3)
+    X = np.vstack([X, boundary_probe(folded, X, n_nodes=1000)])
+    if compiled.is_classifier:
+        assert np.array_equal(folded.predict_proba(X), unfolded.predict_proba(X))
+    assert np.array_equal(folded.predict(X), unfolded.predict(X))
+
+
+@pytest.mark.parametrize('fold', [True, False])
+def test_compile_for_inference_keeps_the_compiled_engine(forest, monkeypatch, fold):
+    model, scaler = forest
+    monkeypatch.setattr(config, 'INFERENCE_ENGINE', 'compiled')
+    monkeypatch.setattr(config, 'FOLD_SCALER', fold)
+    monkeypatch.setattr(config, 'COMPILED_MAX_ROWS', 256)
+    engine = compile_for_inference(model, scaler, 'test')
+
+    # Not the sklearn engine it falls back to when the probe check fails
+    if fold:
+        assert isinstance(engine, CompiledForest) and engine.raw_input
+    else:
+        assert isinstance(engine, ScaledModel) and isinstance(engine.model, CompiledForest)
+    X = random_inputs(scaler, n_rows=256, seed=5)
+    assert matches_sklearn(engine, model, scaler, X)
@@ -0,0 +1,108 @@
+"""
+Batch crop prediction: predict_crop_batch must rank like predict_crop row by
+row, and top_k is limited by the loaded model's classes, not a fixed number.
+"""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from api.crop import router
+from api.middleware import ModelVersionMiddleware
+from models.compiled_forest import compile_for_inference
+from models.crop_model_ml import FEATURE_SPEC, predict_crop, predict_crop_batch
+from models.features import FeatureTemplate
+from models.handle import ModelHandle
+from models.scoring import ClassIndex
+from services import inference
+
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+FIELDS = ['n_level', 'p_level', 'k_level', 'temperature', 'humidity', 'ph_level', 'rainfall']
+LOW = np.array([0, 5, 5, 10, 15, 4, 20], dtype=np.float64)
+HIGH = np.array([140, 100, 200, 40, 100, 9, 300], dtype=np.float64)
+CROPS = np.array(['apple', 'banana', 'chickpea', 'jute', 'maize', 'rice'])
+
+
+def _inputs(rng: np.random.Generator, n_rows: int) -> np.ndarray:
+    return LOW + rng.random((n_rows, len(FEATURES))) * (HIGH - LOW)
+
+
+@pytest.fixture(scope='module')
+def handle():
+    rng = np.random.default_rng(0)
+    X = _inputs(rng, 1500)
+    y = CROPS[((X[:, 0] > 70).astype(int) + 2 * (X[:, 6] > 150) + (X[:, 3] > 30)) % len(CROPS)]
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(scaler.transform(X), y)
+    return ModelHandle(
+        'crop', 'test-version', 'test',
+        model=model,
+        scaler=scaler,
+        features=FEATURES,
+        engine=compile_for_inference(model, scaler, 'crop'),
+        classes=ClassIndex(model.classes_),
+        template=FeatureTemplate(FEATURES, FEATURE_SPEC)
+    )
+
+
+def samples(n: int = 300, seed: int = 1):
+    return [dict(zip(FIELDS, row)) for row in _inputs(np.random.default_rng(seed), n).tolist()]
+
+
+def test_batch_matches_row_by_row(handle):
+    rows = samples()
+    assert predict_crop_batch(rows, top_k=4, handle=handle) == [predict_crop(**row, handle=handle) for row in rows]
+
+
+def test_top_k_is_capped_at_the_class_count(handle):
+    rows = samples(20)
+    everything = predict_crop_batch(rows, top_k=100, handle=handle)
+    assert all(len(alternatives) == len(handle.classes) - 1 for _, _, alternatives in everything)
+    for (crop, score, alternatives), short in zip(everything, predict_crop_batch(rows, top_k=2, handle=handle)):
+        assert (crop, score, alternatives[:1]) == short
+
+
+@pytest.fixture
+def client(handle, monkeypatch):
+    monkeypatch.setattr(inference.loading, 'current_handle', lambda name: handle)
+    monkeypatch.setattr(inference.loading, 'is_ready', lambda name: True)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    # Records which model answered, so degraded answers are reported as such
+    app.add_middleware(ModelVersionMiddleware)
+    return TestClient(app)
+
+
+def body(rows, **extra):
+    return {
+        'samples': [dict(row, soil_type='Alluvial Soil', region='North India') for row in rows],
+        **extra
+    }
+
+
+def test_batch_endpoint_matches_single_predictions(client, handle):
+    rows = samples(25)
+    response = client.post('/api/predict-crop/batch', json=body(rows, top_k=3))
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload['count'] == 25 and not payload['degraded']
+    assert response.headers['X-Model-Version'] == 'crop=test-version'
+    for prediction, row in zip(payload['predictions'], rows):
+        crop, score, alternatives = predict_crop(**row, handle=handle)
+        assert prediction['predicted_crop'] == crop
+        assert prediction['confidence_score'] == pytest.approx(score)
+        assert [item['crop'] for item in prediction['alternative_crops']] == [item['crop'] for item in alternatives[:2]]
+
+
+def test_batch_endpoint_accepts_top_k_above_the_class_count(client, handle):
+    response = client.post('/api/predict-crop/batch', json=body(samples(3), top_k=50))
+    assert response.status_code == 200
+    for prediction in response.json()['predictions']:
+        assert len(prediction['alternative_crops']) == len(handle.classes) - 1
+
+
+@pytest.mark.parametrize('top_k', [0, -1])
+def test_batch_endpoint_rejects_top_k_below_one(client, top_k):
+    assert client.post('/api/predict-crop/batch', json=body(samples(1), top_k=top_k)).status_code == 422
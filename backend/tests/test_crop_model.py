@@ -0,0 +1,74 @@
+"""
+CropPredictor.predict_batch must return what predict returns, sample by sample.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from models.crop_model import RANGE_FIELDS, CropPredictor
+
+SOILS = ['Alluvial Soil', 'Black Soil', 'Laterite Soil', 'Red Soil', 'Clay Soil', 'Sandy Soil']
+REGIONS = ['North India', 'South India', 'East India', 'West India', 'Central India', 'Atlantis']
+RANGES = {
+    'n_level': (0, 200),
+    'p_level': (0, 100),
+    'k_level': (0, 200),
+    'ph_level': (3, 11),
+    'temperature': (0, 50),
+    'humidity': (0, 100),
+    'rainfall': (0, 300)
+}
+# Every requirement bound, where <= and < differ
+EDGES = {
+    field: sorted({bound for req in CropPredictor.CROP_REQUIREMENTS.values() for bound in req[key]})
+    for key, field in RANGE_FIELDS
+}
+
+
+def _value(rng: random.Random, field: str) -> float:
+    if rng.random() < 0.5:
+        edge = float(rng.choice(EDGES[field]))
+        return rng.choice([edge, float(np.nextafter(edge, -np.inf)), float(np.nextafter(edge, np.inf))])
+    return rng.uniform(*RANGES[field])
+
+
+def samples(n: int = 2000, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        {
+            'soil_type': rng.choice(SOILS),
+            'region': rng.choice(REGIONS),
+            **{field: _value(rng, field) for field in RANGES}
+        }
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize('jitter', [False, True])
+def test_batch_matches_single_predictions(jitter):
+    rows = samples()
+    single = CropPredictor(jitter=jitter, seed=7)
+    batch = CropPredictor(jitter=jitter, seed=7)
+    assert batch.predict_batch(rows) == [single.predict(**row) for row in rows]
+
+
+def test_batch_consumes_the_same_random_draws():
+    rows = samples(50)
+    single = CropPredictor(seed=3)
+    batch = CropPredictor(seed=3)
+    batch.predict_batch(rows)
+    for row in rows:
+        single.predict(**row)
+    # Later answers keep matching, so mixing both paths stays reproducible
+    assert batch.predict(**rows[0]) == single.predict(**rows[0])
+
+
+def test_without_jitter_answers_are_repeatable():
+    rows = samples(20)
+    predictor = CropPredictor(jitter=False)
+    assert predictor.predict_batch(rows) == predictor.predict_batch(rows)
+
+
+def test_empty_batch():
+    assert CropPredictor().predict_batch([]) == []
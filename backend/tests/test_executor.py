@@ -0,0 +1,90 @@
+"""
+InferenceExecutor: backpressure, error accounting and context propagation.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from services import tracing
+from services.errors import InferenceUnavailableError
+from services.executor import ExecutorSaturatedError, InferenceExecutor
+from services.inference import served_versions, track_versions
+
+
+@pytest.fixture
+def executor():
+    executor = InferenceExecutor(max_workers=2, max_pending=3)
+    yield executor
+    executor.shutdown()
+
+
+def test_runs_off_the_event_loop_thread(executor):
+    async def scenario():
+        return await executor.run(lambda: threading.current_thread().name)
+
+    name = asyncio.run(scenario())
+    assert name.startswith('inference')
+    assert executor.stats()['completed'] == 1
+
+
+def test_saturated_executor_rejects_with_a_503_error(executor):
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(lambda: None)
+        assert executor.pending == 3
+        release.set()
+        await asyncio.gather(*running)
+        # Room again once the work drains
+        return await executor.run(lambda: 'ok')
+
+    assert asyncio.run(scenario()) == 'ok'
+    assert issubclass(ExecutorSaturatedError, InferenceUnavailableError)
+    stats = executor.stats()
+    assert (stats['rejected'], stats['completed'], stats['peak_pending'], stats['pending']) == (1, 4, 3, 0)
+
+
+def test_errors_are_raised_and_counted(executor):
+    def broken():
+        raise ValueError('bad input')
+
+    async def scenario():
+        await executor.run(broken)
+
+    with pytest.raises(ValueError, match='bad input'):
+        asyncio.run(scenario())
+    assert executor.stats()['failed'] == 1
+    assert executor.pending == 0
+
+
+def test_worker_thread_sees_the_request_context(executor, monkeypatch):
+    monkeypatch.setattr(tracing, 'ENABLED', True)
+
+    def in_worker():
+        # What a model call reads: the request trace and the served versions
+        served_versions()['crop'] = 'v1'
+        tracing.current().add('inference', 0.5)
+        return threading.current_thread().name
+
+    async def request():
+        trace = tracing.start()
+        served = track_versions()
+        name = await executor.run(in_worker)
+        return trace, served, name
+
+    async def scenario():
+        return await asyncio.gather(request(), request())
+
+    for trace, served, name in asyncio.run(scenario()):
+        assert name.startswith('inference')
+        assert served == {'crop': 'v1'}
+        assert trace.stages == {'inference': 0.5}
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        InferenceExecutor(kind='fiber')
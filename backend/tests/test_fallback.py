@@ -0,0 +1,223 @@
+"""
+FallbackRouter and CircuitBreaker: deadlines, breaker states, errors when the
+rules cannot answer either, and the shape of rule-based crop answers.
+"""
+import asyncio
+import time
+
+import pytest
+
+from schemas.requests import AlternativeCrop, CropPredictionRequest, CropPredictionResponse
+from services import fallback
+from services.errors import InferenceUnavailableError, ModelNotReadyError
+from services.fallback import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, FallbackRouter
+
+CROP_REQUEST = CropPredictionRequest(
+    soil_type='Alluvial Soil', n_level=80, p_level=40, k_level=50, temperature=25,
+    humidity=70, rainfall=100, ph_level=7, region='North India'
+)
+
+
+def make_router(deadline_ms: float = 50, threshold: int = 3, reset_seconds: float = 60) -> FallbackRouter:
+    return FallbackRouter('test', deadline_ms, CircuitBreaker('test', threshold, reset_seconds))
+
+
+def answer(value, delay: float = 0.0):
+    async def primary():
+        if delay:
+            await asyncio.sleep(delay)
+        return value
+    return primary
+
+
+def fail(error: BaseException):
+    async def primary():
+        raise error
+    return primary
+
+
+def test_model_answer_within_the_deadline():
+    router = make_router()
+    assert asyncio.run(router.run(answer('model'), lambda: 'rules')) == ('model', False)
+    assert router.stats()['fallbacks'] == 0
+
+
+def test_deadline_miss_is_answered_by_the_rules():
+    router = make_router(deadline_ms=20)
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        finished.append(True)
+        return 'model'
+
+    async def scenario():
+        result = await router.run(slow, lambda: 'rules')
+        # The late model call is not cancelled
+        await asyncio.sleep(0.15)
+        return result
+
+    started = time.perf_counter()
+    assert asyncio.run(scenario()) == ('rules', True)
+    assert finished == [True]
+    assert time.perf_counter() - started < 1
+    assert router.stats()['reasons']['timeout'] == 1
+    assert router.breaker.failures == 1
+
+
+def test_breaker_opens_after_consecutive_failures_and_closes_after_a_probe():
+    router = make_router(threshold=3, reset_seconds=0.05)
+    calls = []
+
+    async def broken():
+        calls.append('model')
+        raise RuntimeError('kaput')
+
+    async def scenario():
+        for _ in range(3):
+            assert await router.run(broken, lambda: 'rules') == ('rules', True)
+        assert router.breaker.state == OPEN
+
+        # Open: the model is not called at all
+        assert await router.run(answer('model'), lambda: 'rules') == ('rules', True)
+        assert router.stats()['reasons']['circuit_open'] == 1
+        assert len(calls) == 3
+
+        # After the reset time one trial request decides
+        await asyncio.sleep(0.06)
+        assert await router.run(answer('model'), lambda: 'rules') == ('model', False)
+        assert router.breaker.state == CLOSED
+        assert router.breaker.failures == 0
+
+    asyncio.run(scenario())
+    assert router.stats()['reasons']['error'] == 3
+    assert router.breaker.opened == 1
+
+
+def test_failed_probe_reopens_the_breaker():
+    router = make_router(threshold=1, reset_seconds=0.05)
+
+    async def scenario():
+        await router.run(fail(RuntimeError('kaput')), lambda: 'rules')
+        assert router.breaker.state == OPEN
+        await asyncio.sleep(0.06)
+        await router.run(fail(RuntimeError('still kaput')), lambda: 'rules')
+        assert router.breaker.state == OPEN
+
+    asyncio.run(scenario())
+    assert router.breaker.opened == 2
+    assert router.stats()['reasons']['error'] == 2
+
+
+def test_only_one_trial_while_half_open():
+    router = make_router(threshold=1, reset_seconds=0.05)
+    calls = []
+
+    async def probe():
+        calls.append('model')
+        await asyncio.sleep(0.01)
+        return 'model'
+
+    async def scenario():
+        await router.run(fail(RuntimeError('kaput')), lambda: 'rules')
+        await asyncio.sleep(0.06)
+        trial = asyncio.ensure_future(router.run(probe, lambda: 'rules'))
+        await asyncio.sleep(0)
+        assert router.breaker.state == HALF_OPEN
+        assert await router.run(probe, lambda: 'rules') == ('rules', True)
+        assert await trial == ('model', False)
+
+    asyncio.run(scenario())
+    assert calls == ['model']
+    assert router.breaker.state == CLOSED
+
+
+def test_cancelled_trial_is_replaced():
+    router = make_router(deadline_ms=0, threshold=1, reset_seconds=0.05)
+
+    async def scenario():
+        await router.run(fail(RuntimeError('kaput')), lambda: 'rules')
+        await asyncio.sleep(0.06)
+        # The trial's client goes away before the model answers
+        trial = asyncio.ensure_future(router.run(answer('model', delay=1), lambda: 'rules'))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        assert router.breaker.state == HALF_OPEN
+        assert await router.run(answer('model'), lambda: 'rules') == ('rules', True)
+        await asyncio.sleep(0.06)
+        assert await router.run(answer('model'), lambda: 'rules') == ('model', False)
+
+    asyncio.run(scenario())
+    assert router.breaker.state == CLOSED
+
+
+def test_a_loading_model_does_not_open_the_breaker():
+    router = make_router(threshold=1)
+    for _ in range(3):
+        result = asyncio.run(router.run(fail(ModelNotReadyError('loading')), lambda: 'rules'))
+        assert result == ('rules', True)
+    assert router.breaker.state == CLOSED
+    assert router.stats()['reasons']['not_ready'] == 3
+
+
+def test_invalid_input_is_not_a_model_failure():
+    router = make_router(threshold=1)
+    with pytest.raises(ValueError):
+        asyncio.run(router.run(fail(ValueError('unknown crop')), lambda: 'rules'))
+    assert router.breaker.state == CLOSED
+    assert router.stats()['fallbacks'] == 0
+
+
+@pytest.mark.parametrize('primary, reason', [
+    (fail(RuntimeError('kaput')), 'failed: kaput'),
+    (answer('model', delay=0.2), 'missed its deadline')
+])
+def test_rules_failure_is_unavailable(primary, reason):
+    router = make_router(deadline_ms=20)
+
+    def rules():
+        raise ValueError('No yield data available for banana')
+
+    with pytest.raises(InferenceUnavailableError) as raised:
+        asyncio.run(router.run(primary, rules))
+    assert reason in str(raised.value)
+    assert 'banana' in str(raised.value)
+    assert raised.value.__cause__ is not None
+    assert router.stats()['fallback_failures'] == 1
+
+
+def test_rules_failure_with_the_circuit_open():
+    router = make_router(threshold=1)
+    asyncio.run(router.run(fail(RuntimeError('kaput')), lambda: 'rules'))
+
+    def rules():
+        raise KeyError('crop')
+
+    with pytest.raises(InferenceUnavailableError, match='circuit breaker open'):
+        asyncio.run(router.run(answer('model'), rules))
+
+
+def test_degraded_crop_answer_fits_the_response_schema():
+    crop, score, alternatives = fallback.crop_rules(CROP_REQUEST)
+    response = CropPredictionResponse(
+        predicted_crop=crop,
+        confidence_score=score,
+        alternative_crops=[AlternativeCrop(**alternative) for alternative in alternatives],
+        degraded=True
+    )
+    # Same label space and scale as the ML model: lowercase names, 0-1 scores
+    assert response.predicted_crop == response.predicted_crop.lower()
+    assert 0 <= response.confidence_score <= 1
+    assert len(response.alternative_crops) == 3
+    for alternative in response.alternative_crops:
+        assert alternative.crop == alternative.crop.lower()
+        assert 0 <= alternative.score <= 1
+
+
+def test_degraded_crop_batch_matches_single_answers():
+    samples = [CROP_REQUEST, CROP_REQUEST.model_copy(update={'temperature': 12.0, 'rainfall': 300.0})]
+    results = fallback.crop_batch_rules(samples, top_k=2)
+    for sample, (crop, score, alternatives) in zip(samples, results):
+        single_crop, single_score, single_alternatives = fallback.crop_rules(sample)
+        assert (crop, score) == (single_crop, single_score)
+        assert alternatives == single_alternatives[:1]
@@ -0,0 +1,85 @@
+"""
+FertilizerRecommender.recommend_batch must return what recommend returns,
+sample by sample, down to the int/float type of every value.
+"""
+import random
+
+import pytest
+
+from models.fertilizer_model import FertilizerRecommender
+
+SOILS = ['Alluvial Soil', 'Black Soil', 'Laterite Soil', 'Red Soil', 'Clay Soil', 'Sandy Soil', 'Sandy Clay']
+LIMITS = {'current_n': 200, 'current_p': 100, 'current_k': 200}
+TARGETS = sorted({
+    value for entry in FertilizerRecommender.FERTILIZER_DATA.values() for value in entry['target_npk'].values()
+})
+
+
+def _level(rng: random.Random, field: str):
+    draw = rng.random()
+    if draw < 0.3:
+        # Exactly on a target: nothing missing
+        return rng.choice([int, float])(rng.choice(TARGETS))
+    if draw < 0.6:
+        return rng.randint(0, LIMITS[field])
+    return rng.uniform(0, LIMITS[field])
+
+
+def samples(n: int = 2000, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        {
+            'crop_type': rng.choice(list(FertilizerRecommender.FERTILIZER_DATA)),
+            **{field: _level(rng, field) for field in LIMITS},
+            'soil_ph': rng.choice([6.0, 8.0, rng.uniform(4, 10), 7]),
+            'soil_type': rng.choice(SOILS)
+        }
+        for _ in range(n)
+    ]
+
+
+def typed(value):
+    """Value with the type of every leaf, so 40 and 40.0 compare different."""
+    if isinstance(value, dict):
+        return {key: typed(item) for key, item in value.items()}
+    return type(value).__name__, value
+
+
+def test_batch_matches_single_recommendations():
+    rows = samples()
+    recommender = FertilizerRecommender()
+    expected = [typed(recommender.recommend(**row)) for row in rows]
+    assert [typed(result) for result in recommender.recommend_batch(rows)] == expected
+
+
+def test_deficit_types_follow_the_inputs():
+    recommender = FertilizerRecommender()
+    row = {'crop_type': 'Rice', 'current_n': 80, 'current_p': 30.5, 'current_k': 90.0,
+           'soil_ph': 7.0, 'soil_type': 'Alluvial Soil'}
+    single = recommender.recommend(**row)['npk_ratio']
+    batch = recommender.recommend_batch([row])[0]['npk_ratio']
+    assert typed(batch) == typed(single) == {'n': ('int', 40), 'p': ('float', 29.5), 'k': ('int', 0)}
+
+
+def test_indexing_and_slicing_build_the_same_dicts():
+    rows = samples(10)
+    results = FertilizerRecommender().recommend_batch(rows)
+    everything = results.to_list()
+    assert len(results) == 10
+    assert results[3] == everything[3]
+    assert results[-1] == everything[-1]
+    assert results[2:5] == everything[2:5]
+    assert list(results) == everything
+
+
+def test_batch_rejects_unknown_crops_like_recommend():
+    rows = samples(5) + [dict(samples(1)[0], crop_type='Banana')]
+    recommender = FertilizerRecommender()
+    with pytest.raises(ValueError, match='Banana'):
+        recommender.recommend(**rows[-1])
+    with pytest.raises(ValueError, match='Banana'):
+        recommender.recommend_batch(rows)
+
+
+def test_empty_batch():
+    assert len(FertilizerRecommender().recommend_batch([])) == 0
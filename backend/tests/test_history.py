@@ -0,0 +1,197 @@
+"""
+HistoryStore: batched write-behind, draining on shutdown, cursor pagination
+and the indexes behind the filters.
+"""
+import asyncio
+
+import pytest
+
+from services.history import HistoryStore
+
+
+def rows(*labels, endpoint_value=None):
+    return [({'n': index}, label, 0.5, endpoint_value) for index, label in enumerate(labels)]
+
+
+def run(store, scenario):
+    async def main():
+        await store.start()
+        try:
+            return await scenario()
+        finally:
+            await store.close()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'history.db')
+
+
+def test_full_batch_is_written_in_one_flush(path):
+    store = HistoryStore(path, flush_size=4, flush_interval=30)
+
+    async def scenario():
+        store.record('crop', rows('rice', 'maize'))
+        store.record('crop', rows('rice', 'jute'))
+        # Flushed on size, long before the interval
+        for _ in range(100):
+            if store.written:
+                break
+            await asyncio.sleep(0.01)
+        return await store.query()
+
+    page = run(store, scenario)
+    assert len(page['items']) == 4
+    assert (store.written, store.batches) == (4, 1)
+
+
+def test_partial_batch_waits_for_the_interval(path):
+    store = HistoryStore(path, flush_size=100, flush_interval=0.05)
+
+    async def scenario():
+        store.record('crop', rows('rice'))
+        await asyncio.sleep(0.02)
+        early = store.written
+        store.record('crop', rows('maize'))
+        await asyncio.sleep(0.1)
+        return early
+
+    assert run(store, scenario) == 0
+    # Both records went out together once the interval passed
+    assert (store.written, store.batches) == (2, 1)
+
+
+def test_queued_records_are_written_on_shutdown(path):
+    store = HistoryStore(path, flush_size=1000, flush_interval=60)
+
+    async def scenario():
+        for _ in range(10):
+            store.record('yield', rows(None, endpoint_value=3.5))
+        await asyncio.sleep(0)
+        return store.written
+
+    assert run(store, scenario) == 0
+    assert store.written == 10
+
+    # A new store on the same file sees every row
+    reopened = HistoryStore(path)
+    page = run(reopened, lambda: reopened.query(endpoint='yield', limit=100))
+    assert len(page['items']) == 10
+    assert page['items'][0]['value'] == 3.5
+    assert page['items'][0]['inputs'] == {'n': 0}
+
+
+def test_full_queue_drops_records(path):
+    store = HistoryStore(path, flush_size=1000, flush_interval=60, queue_size=2)
+
+    async def scenario():
+        for _ in range(5):
+            store.record('crop', rows('rice', 'maize'))
+
+    run(store, scenario)
+    assert (store.recorded, store.dropped, store.written) == (4, 6, 4)
+
+
+def test_record_before_start_is_ignored(path):
+    store = HistoryStore(path)
+    store.record('crop', rows('rice'))
+    assert store.recorded == 0
+
+
+def fill(store, count):
+    async def scenario():
+        # Several rows per record share a timestamp: the id breaks the tie
+        for start in range(0, count, 3):
+            store.record('crop', rows(*[f'crop{index}' for index in range(start, min(start + 3, count))]))
+            await asyncio.sleep(0.001)
+        await store.close()
+        await store.start()
+    return scenario
+
+
+def test_cursor_pages_are_newest_first_and_complete(path):
+    store = HistoryStore(path, flush_size=1000, flush_interval=60)
+
+    async def scenario():
+        await fill(store, 10)()
+        pages, cursor = [], None
+        while True:
+            page = await store.query(cursor=cursor, limit=4)
+            pages.append(page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return pages
+
+    pages = run(store, scenario)
+    assert [len(page) for page in pages] == [4, 4, 2]
+    items = [item for page in pages for item in page]
+    order = [(item['timestamp'], item['id']) for item in items]
+    assert order == sorted(order, reverse=True)
+    assert len({item['id'] for item in items}) == 10
+
+
+def test_cursor_is_stable_while_new_rows_arrive(path):
+    store = HistoryStore(path, flush_size=1000, flush_interval=60)
+
+    async def scenario():
+        await fill(store, 6)()
+        first = await store.query(limit=3)
+        # Newer predictions land between the two page requests
+        store.record('crop', rows('late', 'later'))
+        await store.close()
+        await store.start()
+        second = await store.query(cursor=first['next_cursor'], limit=3)
+        return first, second
+
+    first, second = run(store, scenario)
+    seen = [item['predicted'] for item in first['items'] + second['items']]
+    assert sorted(seen) == sorted(f'crop{index}' for index in range(6))
+    assert second['next_cursor'] is None
+
+
+def test_filters_and_counts(path):
+    store = HistoryStore(path, flush_size=1000, flush_interval=60)
+
+    async def scenario():
+        store.record('crop', rows('rice', 'rice', 'maize'))
+        store.record('crop_batch', rows('rice'))
+        store.record('yield', rows(None, endpoint_value=2.0))
+        await store.close()
+        await store.start()
+        return (
+            await store.query(endpoint='crop'),
+            await store.query(predicted='rice'),
+            await store.query(since=0, until=1),
+            await store.counts(),
+            await store.counts(endpoint='crop')
+        )
+
+    by_endpoint, by_crop, too_old, counts, crop_counts = run(store, scenario)
+    assert len(by_endpoint['items']) == 3
+    assert len(by_crop['items']) == 3
+    assert too_old['items'] == []
+    assert counts == {'rice': 3, 'maize': 1}
+    assert crop_counts == {'rice': 2, 'maize': 1}
+
+
+@pytest.mark.parametrize('where, index', [
+    ("endpoint = 'crop'", 'idx_predictions_endpoint'),
+    ("predicted = 'rice'", 'idx_predictions_predicted'),
+    ('timestamp >= 0', 'idx_predictions_timestamp')
+])
+def test_filters_use_an_index(path, where, index):
+    store = HistoryStore(path)
+
+    async def scenario():
+        sql = f'EXPLAIN QUERY PLAN SELECT * FROM predictions WHERE {where} ORDER BY timestamp DESC, id DESC'
+        return await store._run_query(sql, [])
+
+    plan = ' '.join(row['detail'] for row in run(store, scenario))
+    assert index in plan
+
+
+def test_query_without_a_database(path):
+    store = HistoryStore(path)
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.query())
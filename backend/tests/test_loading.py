@@ -0,0 +1,206 @@
+"""
+Model loading: readiness states and /api/ready, reloads that fail validation,
+and the X-Model-Version header around a swap.
+
+The three models are replaced by fakes whose handles return a fixed number,
+so the tests do not depend on trained_models/.
+"""
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+import config
+from api.health import router as health_router
+from api.middleware import ModelVersionMiddleware
+from models import loading
+from models.handle import ModelHandle
+from services import inference
+from services.errors import ModelNotReadyError
+
+
+class FakeModel:
+    """Module with build_handle/activate/current_handle, as models/loading.py expects."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.active = None
+        self.version = 'v1'
+        self.answer = 1.0
+        self.error = None
+        self.gate = None
+
+    def build_handle(self) -> ModelHandle:
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return ModelHandle(self.name, self.version, 'test', model=self.answer, scaler=None,
+                           features=[], engine=None, template=None)
+
+    def activate(self, handle: ModelHandle) -> None:
+        self.active = handle
+
+    def current_handle(self):
+        return self.active
+
+
+def predict(handle=None, **sample):
+    return {'value': handle.model}
+
+
+def predict_batch(samples, handle=None):
+    return [predict(handle=handle, **sample) for sample in samples]
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    fakes = {name: FakeModel(name) for name in loading.MODELS}
+    monkeypatch.setattr(loading, 'MODELS', {
+        name: (fake, predict, predict_batch, {'x': 1.0}) for name, fake in fakes.items()
+    })
+    monkeypatch.setattr(loading, 'states', {name: loading.ModelState(name) for name in fakes})
+    monkeypatch.setattr(loading, 'artifact_signature', lambda name: (name, fakes[name].version))
+    monkeypatch.setattr(loading, '_futures', [])
+    monkeypatch.setattr(loading, '_pools', [])
+    monkeypatch.setattr(loading, '_swap_listeners', [])
+    monkeypatch.setattr(config, 'WARMUP_ENABLED', True)
+    return fakes
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(health_router, prefix="/api")
+    app.add_middleware(ModelVersionMiddleware)
+    return TestClient(app)
+
+
+def test_ready_only_once_every_model_is_loaded(fakes, client):
+    assert client.get('/api/ready').status_code == 503
+    assert {model['state'] for model in loading.readiness()['models'].values()} == {loading.PENDING}
+
+    gate = threading.Event()
+    fakes['yield'].gate = gate
+    loading.start_loading()
+    assert not loading.wait_until_loaded(0.2)
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    models = response.json()['models']
+    assert models['yield']['state'] == loading.LOADING
+    assert models['crop']['state'] == loading.READY and models['crop']['version'] == 'v1'
+    assert loading.is_ready('crop') and not loading.is_ready('yield')
+
+    gate.set()
+    assert loading.wait_until_loaded(5)
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.json()['ready'] is True
+
+
+def test_requests_to_a_loading_model_are_turned_away(fakes):
+    with pytest.raises(ModelNotReadyError, match='crop model is pending'):
+        inference._acquire('crop')
+
+
+def test_failed_load_is_reported(fakes, client):
+    fakes['fertilizer'].error = OSError('fertilizer_model.bundle: no such file')
+    assert not loading.load_all()
+    state = loading.readiness()['models']['fertilizer']
+    assert state['state'] == loading.FAILED
+    assert 'no such file' in state['error']
+    assert 'failed to load' in loading.not_ready_reason('fertilizer')
+    assert client.get('/api/ready').status_code == 503
+
+    # A failed model can be loaded again once its files are fixed
+    fakes['fertilizer'].error = None
+    assert loading.load_all()
+
+
+def test_model_failing_warm_up_is_not_activated(fakes):
+    fakes['crop'].answer = float('nan')
+    assert not loading.load_all()
+    assert loading.states['crop'].state == loading.FAILED
+    assert loading.current_handle('crop') is None
+
+
+def test_reload_swaps_in_the_new_version(fakes):
+    assert loading.load_all()
+    swaps = []
+    loading.add_swap_listener(lambda name, handle: swaps.append((name, handle.version)))
+
+    # Same files: nothing to do
+    assert loading.reload_models(['crop'])['crop']['status'] == 'unchanged'
+
+    fakes['crop'].version = 'v2'
+    result = loading.reload_models(['crop'])['crop']
+    assert (result['status'], result['previous_version'], result['version']) == ('swapped', 'v1', 'v2')
+    assert loading.current_handle('crop').version == 'v2'
+    assert swaps == [('crop', 'v2')]
+    assert loading.states['crop'].reloads == 1
+
+
+@pytest.mark.parametrize('breakage', ['validation', 'build'])
+def test_failed_reload_keeps_the_active_version(fakes, client, breakage):
+    assert loading.load_all()
+    old = loading.current_handle('crop')
+
+    fakes['crop'].version = 'v2'
+    if breakage == 'validation':
+        fakes['crop'].answer = float('inf')
+    else:
+        fakes['crop'].error = ValueError('truncated bundle')
+    result = loading.reload_models(['crop'])['crop']
+
+    assert result['status'] == 'failed'
+    assert result['version'] == 'v1'
+    assert ('non-finite' if breakage == 'validation' else 'truncated') in result['error']
+    assert loading.current_handle('crop') is old
+    assert loading.is_ready('crop')
+    assert loading.readiness()['models']['crop']['last_reload']['status'] == 'failed'
+    assert client.get('/api/ready').status_code == 200
+    assert 'crop=v1' in client.get('/api/health').headers['X-Model-Version']
+
+
+def test_model_version_header_follows_a_swap(fakes, client):
+    assert loading.load_all()
+    assert client.get('/api/health').headers['X-Model-Version'] == 'crop=v1, fertilizer=v1, yield=v1'
+    fakes['crop'].version = 'v2'
+    loading.reload_models(['crop'])
+    assert client.get('/api/health').headers['X-Model-Version'] == 'crop=v2, fertilizer=v1, yield=v1'
+
+
+def test_request_in_flight_reports_the_version_that_served_it(fakes):
+    assert loading.load_all()
+    acquired = asyncio.Event()
+    release = asyncio.Event()
+    router = APIRouter()
+
+    @router.get('/api/score')
+    async def score():
+        handle = inference._acquire('crop')
+        acquired.set()
+        await release.wait()
+        return {'value': handle.model}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ModelVersionMiddleware)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as http:
+            in_flight = asyncio.ensure_future(http.get('/api/score'))
+            await acquired.wait()
+            fakes['crop'].version = 'v2'
+            await asyncio.to_thread(loading.reload_models, ['crop'])
+            release.set()
+            return await in_flight, await http.get('/api/score')
+
+    before, after = asyncio.run(scenario())
+    # Prediction responses name only the model that answered
+    assert before.headers['X-Model-Version'] == 'crop=v1'
+    assert after.headers['X-Model-Version'] == 'crop=v2'
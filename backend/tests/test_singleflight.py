@@ -0,0 +1,188 @@
+"""
+Single-flight: identical requests in flight share one inference, and every
+request is still counted and recorded on its own.
+"""
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+import api.crop
+import config
+from schemas.requests import CropPredictionRequest
+from services import singleflight
+from services.singleflight import SingleFlight, collapse, request_key
+
+BODY = dict(
+    soil_type='Alluvial Soil', n_level=80, p_level=40, k_level=50, temperature=25,
+    humidity=70, rainfall=100, ph_level=7, region='North India'
+)
+
+
+@pytest.fixture
+def flights(monkeypatch):
+    flights = SingleFlight()
+    monkeypatch.setattr(singleflight, 'flights', flights)
+    monkeypatch.setattr(config, 'SINGLEFLIGHT_ENABLED', True)
+    return flights
+
+
+def counting(calls, result=None, delay=0.02, error=None):
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result if result is not None else object()
+    return fn
+
+
+def test_request_key_ignores_key_order_and_int_vs_float():
+    first = CropPredictionRequest(**BODY)
+    second = CropPredictionRequest(**dict(reversed(list(dict(BODY, n_level=80.0).items()))))
+    assert request_key('crop', first) == request_key('crop', second)
+    assert request_key('crop', first) != request_key('yield', first)
+
+
+def test_identical_requests_share_one_inference(flights):
+    calls = []
+    request = CropPredictionRequest(**BODY)
+
+    async def scenario():
+        fn = counting(calls)
+        return await asyncio.gather(*[collapse('crop', request, fn) for _ in range(10)])
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    stats = flights.stats()['endpoints']['crop']
+    assert (stats['requests'], stats['inferences'], stats['collapsed']) == (10, 1, 9)
+    assert stats['max_collapsed_per_inference'] == 9
+    assert stats['collapse_rate'] == pytest.approx(0.9)
+    assert flights.stats()['in_flight'] == 0
+
+
+def test_different_payloads_do_not_collapse(flights):
+    calls = []
+
+    async def scenario():
+        fn = counting(calls)
+        requests = [CropPredictionRequest(**dict(BODY, n_level=level)) for level in (10, 20, 30)]
+        return await asyncio.gather(*[collapse('crop', request, fn) for request in requests])
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 3
+    assert len({id(result) for result in results}) == 3
+    assert flights.stats()['endpoints']['crop']['collapsed'] == 0
+
+
+def test_sequential_requests_do_not_collapse(flights):
+    calls = []
+    request = CropPredictionRequest(**BODY)
+
+    async def scenario():
+        fn = counting(calls, delay=0)
+        await collapse('crop', request, fn)
+        await collapse('crop', request, fn)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_leader_error_reaches_every_follower(flights):
+    calls = []
+    request = CropPredictionRequest(**BODY)
+
+    async def scenario():
+        failing = counting(calls, error=RuntimeError('kaput'))
+        results = await asyncio.gather(
+            *[collapse('crop', request, failing) for _ in range(5)], return_exceptions=True
+        )
+        # No stale entry: the next request runs its own inference
+        answer = await collapse('crop', request, counting(calls, result='fresh'))
+        return results, answer
+
+    results, answer = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) and str(result) == 'kaput' for result in results)
+    assert answer == 'fresh'
+    assert len(calls) == 2
+    assert flights.stats()['in_flight'] == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers(flights):
+    calls = []
+
+    async def scenario():
+        fn = counting(calls, result='shared', delay=0.05)
+        leader = asyncio.ensure_future(flights.run('crop', 'key', fn))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flights.run('crop', 'key', fn)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(scenario()) == ['shared'] * 3
+    assert len(calls) == 1
+
+
+def collapsed_total() -> float:
+    return REGISTRY.get_sample_value('agrosmart_collapsed_requests_total', {'endpoint': 'crop'}) or 0.0
+
+
+def test_collapsed_requests_are_counted_in_metrics(flights):
+    before = collapsed_total()
+    request = CropPredictionRequest(**BODY)
+
+    async def scenario():
+        fn = counting([])
+        await asyncio.gather(*[collapse('crop', request, fn) for _ in range(4)])
+
+    asyncio.run(scenario())
+    assert collapsed_total() - before == 3
+
+
+def test_disabled_runs_every_request(flights, monkeypatch):
+    monkeypatch.setattr(config, 'SINGLEFLIGHT_ENABLED', False)
+    calls = []
+    request = CropPredictionRequest(**BODY)
+
+    async def scenario():
+        fn = counting(calls)
+        await asyncio.gather(*[collapse('crop', request, fn) for _ in range(3)])
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+    assert flights.stats()['endpoints'] == {}
+
+
+class Recorder:
+    def __init__(self):
+        self.rows = []
+
+    def record(self, *args, **kwargs):
+        self.rows.append(args)
+
+
+def test_every_collapsed_request_is_recorded(flights, monkeypatch):
+    inferences = []
+    recorded = []
+    history = Recorder()
+
+    async def run_crop_prediction(**fields):
+        inferences.append(fields)
+        await asyncio.sleep(0.02)
+        return 'rice', 0.9, [{'crop': 'maize', 'score': 0.05}]
+
+    monkeypatch.setattr(api.crop, 'run_crop_prediction', run_crop_prediction)
+    monkeypatch.setattr(api.crop, 'record_crop_prediction', lambda *args: recorded.append(args))
+    monkeypatch.setattr(api.crop, 'history', history)
+
+    async def scenario():
+        requests = [CropPredictionRequest(**BODY) for _ in range(6)]
+        return await asyncio.gather(*[api.crop.predict_crop_endpoint(request) for request in requests])
+
+    responses = asyncio.run(scenario())
+    assert len(inferences) == 1
+    assert [response.predicted_crop for response in responses] == ['rice'] * 6
+    assert recorded == [('rice', 0.9)] * 6
+    assert len(history.rows) == 6
@@ -0,0 +1,127 @@
+"""
+Prediction statistics: worker shards merged into the locked snapshot file, and
+the totals surviving a restart.
+"""
+import asyncio
+import multiprocessing
+
+import pytest
+
+import config
+from services import statistics
+from services.statistics import Aggregates, merge_into_snapshot
+
+
+@pytest.fixture
+def stats_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'statistics.json')
+    monkeypatch.setattr(config, 'STATS_FILE', path)
+    monkeypatch.setattr(config, 'STATS_ENABLED', True)
+    restart(monkeypatch)
+    return path
+
+
+def restart(monkeypatch):
+    """Fresh module state, as in a newly started worker."""
+    monkeypatch.setattr(statistics, '_totals', Aggregates())
+    monkeypatch.setattr(statistics, '_flushing', None)
+    monkeypatch.setattr(statistics, '_shard', Aggregates())
+    monkeypatch.setattr(statistics, '_flusher', None)
+
+
+def crop_delta(crop: str, n: int, confidence: float) -> Aggregates:
+    delta = Aggregates()
+    delta.count('crop', n)
+    # label() takes the confidence sum of the n predictions
+    delta.label('crop', crop, confidence * n, n)
+    return delta
+
+
+def _worker(path: str, crop: str, flushes: int) -> None:
+    for _ in range(flushes):
+        merge_into_snapshot(crop_delta(crop, 2, 0.5), path)
+
+
+def test_concurrent_workers_do_not_lose_counts(stats_file):
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(target=_worker, args=(stats_file, crop, 25))
+        for crop in ('rice', 'maize', 'rice', 'jute')
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    totals = merge_into_snapshot(Aggregates(), stats_file)
+    assert totals.requests == {'crop': 200}
+    assert totals.labels['crop'] == {'rice': 100, 'maize': 50, 'jute': 50}
+    assert totals.confidence['crop'] == [pytest.approx(100.0), 200]
+
+
+def test_flush_merges_other_workers_totals(stats_file):
+    # Another worker already flushed its shard
+    merge_into_snapshot(crop_delta('maize', 3, 0.9), stats_file)
+
+    async def scenario():
+        statistics.record_crop('rice', 0.6)
+        statistics.record_fertilizer('Urea', 0.7)
+        before = statistics.prediction_statistics()
+        await statistics.flush()
+        return before, statistics.prediction_statistics()
+
+    before, after = asyncio.run(scenario())
+    # Until the flush this worker only sees its own counts
+    assert before['crop_distribution'] == {'rice': 1}
+    assert after['crop_distribution'] == {'maize': 3, 'rice': 1}
+    assert after['endpoints']['crop'] == 4
+    assert after['fertilizers'] == 1
+    assert after['mean_confidence']['crop'] == pytest.approx((2.7 + 0.6) / 4)
+    assert statistics._shard.is_empty()
+
+
+def test_totals_survive_a_restart(stats_file, monkeypatch):
+    async def first_run():
+        await statistics.start()
+        statistics.record_crop('rice', 0.8)
+        statistics.record_crop_batch([('maize', 0.4, []), ('rice', 0.6, [])])
+        statistics.record_yield('wheat', 3200.0)
+        await statistics.stop()
+        return statistics.prediction_statistics()
+
+    saved = asyncio.run(first_run())
+    restart(monkeypatch)
+    assert statistics.prediction_statistics()['total_predictions'] == 0
+
+    async def second_run():
+        await statistics.start()
+        try:
+            return statistics.prediction_statistics()
+        finally:
+            await statistics.stop()
+
+    reloaded = asyncio.run(second_run())
+    assert reloaded == saved
+    assert reloaded['crop_distribution'] == {'rice': 2, 'maize': 1}
+    assert reloaded['endpoints'] == {'crop': 1, 'crop_batch': 1, 'fertilizer': 0, 'yield': 1}
+    assert reloaded['recent_yields'][0]['crop_type'] == 'wheat'
+    assert reloaded['mean_yield'] == 3200.0
+
+
+def test_failed_flush_keeps_the_counts(stats_file, monkeypatch):
+    def broken(delta, path=None):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(statistics, 'merge_into_snapshot', broken)
+    statistics.record_crop('rice', 0.5)
+    asyncio.run(statistics.flush())
+    assert statistics._shard.requests == {'crop': 1}
+    assert statistics.prediction_statistics()['crops'] == 1
+
+
+def test_unreadable_snapshot_starts_from_zero(stats_file):
+    with open(stats_file, 'w') as f:
+        f.write('{not json')
+    totals = merge_into_snapshot(crop_delta('rice', 1, 0.5), stats_file)
+    assert totals.requests == {'crop': 1}
@@ -0,0 +1,78 @@
+"""
+YieldEstimator.estimate_batch must return what estimate returns, sample by sample.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from models.yield_model import YieldEstimator
+
+SEASONS = list(YieldEstimator.SEASONAL_FACTORS) + ['Monsoon']
+SOILS = ['Alluvial Soil', 'Black Soil', 'Laterite Soil', 'Red Soil', 'Clay Soil', 'Sandy Soil']
+REGIONS = list(YieldEstimator.REGIONAL_FACTORS) + ['Atlantis']
+
+# Values on every rule bound, where >= and > differ
+EDGES = {
+    'temperature': [12, 18, 22, 25, 30, 35],
+    'humidity': [50, 70],
+    'rainfall': [40, 60, 80, 100, 150],
+    'soil_ph': [5.5, 6.0, 7.5, 8.5],
+    'n_level': [60],
+    'p_level': [30],
+    'k_level': [40]
+}
+RANGES = {
+    'temperature': (0, 50),
+    'humidity': (0, 100),
+    'rainfall': (0, 300),
+    'soil_ph': (3, 11),
+    'n_level': (0, 200),
+    'p_level': (0, 100),
+    'k_level': (0, 200)
+}
+
+
+def _value(rng: random.Random, field: str) -> float:
+    if rng.random() < 0.5:
+        edge = float(rng.choice(EDGES[field]))
+        return rng.choice([edge, float(np.nextafter(edge, -np.inf)), float(np.nextafter(edge, np.inf))])
+    return rng.uniform(*RANGES[field])
+
+
+def samples(n: int = 2000, seed: int = 0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {
+            'crop_type': rng.choice(list(YieldEstimator.BASE_YIELDS)),
+            'season': rng.choice(SEASONS),
+            'soil_type': rng.choice(SOILS),
+            **{field: _value(rng, field) for field in RANGES}
+        }
+        # region is optional, as in estimate
+        if rng.random() < 0.8:
+            row['region'] = rng.choice(REGIONS)
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize('jitter', [False, True])
+def test_batch_matches_single_estimates(jitter):
+    rows = samples()
+    single = YieldEstimator(jitter=jitter, seed=11)
+    batch = YieldEstimator(jitter=jitter, seed=11)
+    assert batch.estimate_batch(rows) == [single.estimate(**row) for row in rows]
+
+
+def test_batch_rejects_unknown_crops_like_estimate():
+    rows = samples(10) + [dict(samples(1)[0], crop_type='Banana')]
+    estimator = YieldEstimator(jitter=False)
+    with pytest.raises(ValueError, match='Banana'):
+        estimator.estimate(**rows[-1])
+    with pytest.raises(ValueError, match='Banana'):
+        estimator.estimate_batch(rows)
+
+
+def test_empty_batch():
+    assert YieldEstimator().estimate_batch([]) == []
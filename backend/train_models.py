@@ -11,6 +11,8 @@ from sklearn.metrics import accuracy_score, classification_report, mean_squared_
 import joblib
 import os
 
+from models.bundle import write_bundle
+
 # Create directories if they don't exist
 os.makedirs('trained_models', exist_ok=True)
 os.makedirs('data/processed', exist_ok=True)
@@ -82,6 +84,13 @@ joblib.dump(scaler_crop, 'trained_models/crop_scaler.pkl')
 joblib.dump(list(X_crop.columns), 'trained_models/crop_features.pkl')
 print(f"💾 Saved: crop_model.pkl, crop_scaler.pkl, crop_features.pkl")
 
+# Single-file bundle loaded by the API
+crop_manifest = write_bundle(
+    'trained_models/crop_model.bundle', 'crop', crop_model, scaler_crop, list(X_crop.columns),
+    target='label', metrics={'accuracy': crop_accuracy}
+)
+print(f"💾 Saved: crop_model.bundle (version {crop_manifest['version']})")
+
 # =====================================================================
 # 2. FERTILIZER RECOMMENDATION MODEL
 # =====================================================================
@@ -161,6 +170,13 @@ joblib.dump(label_encoders, 'trained_models/fertilizer_encoders.pkl')
 joblib.dump(target_col, 'trained_models/fertilizer_target_col.pkl')
 print(f"💾 Saved: fertilizer_model.pkl, fertilizer_scaler.pkl, fertilizer_features.pkl")
 
+# Single-file bundle loaded by the API
+fert_manifest = write_bundle(
+    'trained_models/fertilizer_model.bundle', 'fertilizer', fert_model, scaler_fert, list(X_fert.columns),
+    encoders=label_encoders, target=target_col, metrics={'accuracy': fert_accuracy}
+)
+print(f"💾 Saved: fertilizer_model.bundle (version {fert_manifest['version']})")
+
 # =====================================================================
 # 3. YIELD ESTIMATION MODEL
 # =====================================================================
@@ -248,6 +264,14 @@ joblib.dump(yield_label_encoders, 'trained_models/yield_encoders.pkl')
 joblib.dump(target_col_yield, 'trained_models/yield_target_col.pkl')
 print(f"💾 Saved: yield_model.pkl, yield_scaler.pkl, yield_features.pkl")
 
+# Single-file bundle loaded by the API
+yield_manifest = write_bundle(
+    'trained_models/yield_model.bundle', 'yield', yield_model, scaler_yield, list(X_yield.columns),
+    encoders=yield_label_encoders, target=target_col_yield,
+    metrics={'r2': yield_r2, 'rmse': yield_rmse, 'mae': yield_mae}
+)
+print(f"💾 Saved: yield_model.bundle (version {yield_manifest['version']})")
+
 # =====================================================================
 # SUMMARY
 # =====================================================================